@@ -0,0 +1,217 @@
+# Copyright 2024 SH
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Background jobs for reports too slow to build inside a request."""
+import asyncio
+import contextlib
+import contextvars
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+from uuid import uuid4
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass(slots=True)
+class JobResult:
+    """The output of a job, written to disk when the job finishes."""
+
+    content: bytes
+    media_type: str
+    filename: str
+
+
+@dataclass(slots=True)
+class Job:
+    """A submitted job and where its result lives once it is done."""
+
+    id: str
+    kind: str
+    owner: str
+    created_at: float
+    status: str = QUEUED
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    path: Optional[str] = None
+    media_type: Optional[str] = None
+    filename: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        """Returns the fields a client may see."""
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "filename": self.filename,
+        }
+
+
+class JobLimitError(Exception):
+    """Raised when an owner already has as many unfinished jobs as allowed."""
+
+
+class JobRunner:
+    """Runs jobs on the event loop with a bounded number at once.
+
+    Each owner may have per_owner jobs queued or running, and at most
+    workers jobs run at a time across owners. Results are written to files
+    in directory and, like the job records, are dropped ttl seconds after
+    the job finishes. Jobs live in process memory, so a client must poll
+    the process that accepted the job.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        workers: Optional[int] = None,
+        per_owner: Optional[int] = None,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Sets limits, reading any not given from the environment."""
+        self.directory = directory or os.getenv(
+            "JOBS_DIRECTORY", os.path.join(tempfile.gettempdir(), "tb-ops-jobs")
+        )
+        self.workers = workers or int(os.getenv("JOB_WORKERS", "2"))
+        self.per_owner = per_owner or int(os.getenv("JOBS_PER_USER", "2"))
+        self.ttl = ttl or float(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+        self._clock = clock
+        self._jobs: dict[str, Job] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._slots = asyncio.Semaphore(self.workers)
+        os.makedirs(self.directory, exist_ok=True)
+        self._remove_stale_files()
+
+    def submit(
+        self, owner: str, kind: str, work: Callable[[], Awaitable[JobResult]]
+    ) -> Job:
+        """Queues work for owner and returns its job without waiting for it."""
+        self.purge_expired()
+        unfinished = sum(
+            1
+            for job in self._jobs.values()
+            if job.owner == owner and job.status in (QUEUED, RUNNING)
+        )
+        if unfinished >= self.per_owner:
+            raise JobLimitError(
+                f"{owner} already has {unfinished} jobs queued or running"
+            )
+        job = Job(id=uuid4().hex, kind=kind, owner=owner, created_at=self._clock())
+        self._jobs[job.id] = job
+        # A task copies the context it is created in, so creating it inside
+        # an empty one keeps request-scoped settings, like pinning reads to
+        # the primary after a POST, from following the job
+        task = contextvars.Context().run(
+            asyncio.get_running_loop().create_task, self._run(job, work)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: Job, work: Callable[[], Awaitable[JobResult]]) -> None:
+        try:
+            async with self._slots:
+                job.status = RUNNING
+                job.started_at = self._clock()
+                try:
+                    result = await work()
+                    job.path = await self._store(job.id, result.content)
+                    job.media_type = result.media_type
+                    job.filename = result.filename
+                    job.status = DONE
+                except Exception as e:
+                    print(f"Job {job.id} ({job.kind}) failed: {e!r}")
+                    job.error = str(e) or type(e).__name__
+                    job.status = FAILED
+        except asyncio.CancelledError:
+            job.error = "Cancelled at shutdown"
+            job.status = FAILED
+            raise
+        finally:
+            job.finished_at = self._clock()
+
+    async def _store(self, job_id: str, content: bytes) -> str:
+        path = os.path.join(self.directory, job_id)
+        writing = asyncio.ensure_future(asyncio.to_thread(_write_file, path, content))
+        try:
+            await asyncio.shield(writing)
+        except asyncio.CancelledError:
+            # A thread cannot be stopped, so let the write finish and remove it
+            with contextlib.suppress(Exception):
+                await writing
+            _remove_file(path)
+            raise
+        return path
+
+    def get(self, job_id: str, owner: str) -> Optional[Job]:
+        """Returns a live job if it belongs to owner."""
+        self.purge_expired()
+        job = self._jobs.get(job_id)
+        return job if job is not None and job.owner == owner else None
+
+    def purge_expired(self) -> None:
+        """Drops finished jobs, and their files, older than the TTL."""
+        cutoff = self._clock() - self.ttl
+        for job in list(self._jobs.values()):
+            if job.finished_at is not None and job.finished_at <= cutoff:
+                del self._jobs[job.id]
+                if job.path:
+                    _remove_file(job.path)
+
+    def _remove_stale_files(self) -> None:
+        # Results left by an earlier process have no job record to reach them
+        cutoff = self._clock() - self.ttl
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.stat().st_mtime <= cutoff:
+                    _remove_file(entry.path)
+
+    async def shutdown(self) -> None:
+        """Cancels unfinished jobs and waits for them to stop.
+
+        Cancelled jobs leave no result files behind.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def _write_file(path: str, content: bytes) -> None:
+    # Written under a temporary name so a reader never sees a partial file
+    partial = f"{path}.partial"
+    try:
+        with open(partial, "wb") as f:
+            f.write(content)
+        os.replace(partial, path)
+    except BaseException:
+        _remove_file(partial)
+        raise
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
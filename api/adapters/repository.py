@@ -15,14 +15,20 @@
 
 from __future__ import annotations
 
+import functools
 import logging
 import os
-from typing import Type
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterator, Optional, Type
 
 import asyncpg
 
 log = logging.getLogger("rr")
 
+_replica_read: ContextVar[bool] = ContextVar("replica_read", default=False)
+_primary_reads: ContextVar[bool] = ContextVar("primary_reads", default=False)
+
 
 def connection_configuration() -> dict:
     """Generates postgresql connection configuration based on the repository."""
@@ -38,10 +44,51 @@ def connection_configuration() -> dict:
     }
 
 
+def replica_connection_configuration() -> Optional[dict]:
+    """Generates read replica connection configuration, if a replica is set up."""
+    dsn = os.getenv("POSTGRES_REPLICA_DSN")
+    if not dsn:
+        return None
+    return {
+        "dsn": dsn,
+        "min_size": int(os.getenv("POSTGRES_REPLICA_MIN_POOL_SIZE", "2")),
+        "max_size": int(os.getenv("POSTGRES_REPLICA_MAX_POOL_SIZE", "10")),
+    }
+
+
+def replica_read(method):
+    """Marks a repository read as safe to serve from the read replica.
+
+    Reads routed this way may lag the primary by the replication delay, so
+    only reporting and summary queries should be marked.
+    """
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        token = _replica_read.set(True)
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            _replica_read.reset(token)
+
+    return wrapper
+
+
+@contextmanager
+def read_your_writes() -> Iterator[None]:
+    """Sends every read made inside the block to the primary."""
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
 class ConnectionPoolManager:
     """Manages the postgresql connection pools for postgresql repositories."""
 
     _pool: asyncpg.Pool | None = None
+    _replica_pool: asyncpg.Pool | None = None
 
     @classmethod
     async def get(cls) -> asyncpg.Pool:
@@ -52,12 +99,26 @@ class ConnectionPoolManager:
             assert cls._pool is not None
         return cls._pool
 
+    @classmethod
+    async def get_replica(cls) -> asyncpg.Pool:
+        """Provides the read replica pool, falling back to the primary pool."""
+        if cls._replica_pool is None:
+            configuration = replica_connection_configuration()
+            if configuration is None:
+                return await cls.get()
+            cls._replica_pool = await asyncpg.create_pool(**configuration)
+            assert cls._replica_pool is not None
+        return cls._replica_pool
+
     @classmethod
     async def close_pool(cls) -> None:
-        """Closes the connection pool."""
+        """Closes the connection pools."""
         if cls._pool:
             log.info("Closing connection pool.")
             await cls._pool.close()
+        if cls._replica_pool:
+            log.info("Closing replica connection pool.")
+            await cls._replica_pool.close()
 
 
 class KeyValueStoreManager:
@@ -77,8 +138,37 @@ class PostgresMixin:
     """Adds functionality to obtain a pool from the connection pool manager."""
 
     async def _get_pool(self) -> asyncpg.Pool:
+        if _replica_read.get() and not _primary_reads.get():
+            return await ConnectionPoolManager.get_replica()
         return await ConnectionPoolManager.get()
 
+    async def _fetch(self, query: str, *args) -> list[asyncpg.Record]:
+        """Runs a single-statement read without an explicit transaction.
+
+        A lone SELECT already sees a consistent snapshot, so wrapping it in
+        BEGIN/COMMIT only adds two round trips.
+        """
+        pool = await self._get_pool()
+        async with pool.acquire() as con:
+            return await con.fetch(query, *args)
+
+    async def _fetchrow(self, query: str, *args) -> Optional[asyncpg.Record]:
+        """Runs a single-row read without an explicit transaction."""
+        pool = await self._get_pool()
+        async with pool.acquire() as con:
+            return await con.fetchrow(query, *args)
+
+    @asynccontextmanager
+    async def _read_snapshot(self) -> AsyncIterator[asyncpg.Connection]:
+        """Provides a connection inside a read-only REPEATABLE READ transaction.
+
+        Use only when several statements must read the same snapshot.
+        """
+        pool = await self._get_pool()
+        async with pool.acquire() as con:
+            async with con.transaction(isolation="repeatable_read", readonly=True):
+                yield con
+
 
 class KeyValueStoreMixin:
     """Adds a key value store at `self._repo` to serve as the storage layer."""
@@ -14,26 +14,35 @@
 
 """REST API entrypoint code for TB Operations."""
 # from urllib import parse
+from contextlib import asynccontextmanager
 from datetime import timedelta, datetime, date
-from typing import Sequence, Iterable, Optional, List, Union
+import hashlib
+import json
+import time
+from typing import Awaitable, Callable, Sequence, Iterable, Optional, List, Union
 from uuid import UUID
 from fastapi import FastAPI, Depends, Request, HTTPException, status, Query
 
 # from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.param_functions import Form
 
 from jose import JWTError, jwt
+from api.adapters.cache import TTLCache
+from api.adapters.jobs import DONE, FAILED, JobLimitError, JobResult, JobRunner
+from api.adapters.repository import read_your_writes
 from api.services.auth.models import User
 from api.services.audit.service import AuditService
 from api.services.audit.models import AuditLog
 from api.services.auth.models import UserSummary
-from api.services.auth.service import AuthService
+from api.services.auth.service import AuthService, LoginThrottledError
 from api.services.clients.service import ClientService
 from api.services.clients.models import (
     ClientSummary,
+    ReferralLineage,
     ReferralMatch,
     ReferralNode,
     PatchClientRequest,
@@ -77,6 +86,13 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 VERSION = "v1.0.6"
 
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+EXPORT_FILENAME = "accommodation_logs_report.xlsx"
+
+# Decoded JWT payloads keyed by a hash of the token, each kept until the token
+# expires, so repeat requests with the same token skip signature checks
+token_cache = TTLCache(maxsize=4096, ttl=3600)
+
 
 def get_auth_service() -> AuthService:
     """Dependency provider for AuthService."""
@@ -84,6 +100,19 @@ def get_auth_service() -> AuthService:
     raise NotImplementedError
 
 
+def decode_token(token: str, auth_svc: AuthService) -> dict:
+    """Decodes and verifies a JWT, reusing the result for repeat tokens."""
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = jwt.decode(
+            token, auth_svc.SECRET_KEY, algorithms=[auth_svc.ALGORITHM]
+        )
+        if "exp" in payload:
+            token_cache.set(key, payload, ttl=payload["exp"] - time.time())
+    return payload
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     auth_svc: AuthService = Depends(get_auth_service),
@@ -95,9 +124,7 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(
-            token, auth_svc.SECRET_KEY, algorithms=[auth_svc.ALGORITHM]
-        )
+        payload = decode_token(token, auth_svc)
         email: Optional[str] = payload.get("sub")
         if email is None:
             raise credentials_exception
@@ -118,9 +145,19 @@ def make_app(
     client_svc: ClientService,
     reservation_svc: ReservationService,
     currency_svc: CurrencyService,
+    job_runner: Optional[JobRunner] = None,
 ) -> FastAPI:
     """Function to build FastAPI app."""
+    job_runner = job_runner or JobRunner()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        # Stop jobs while the event loop is still running so they clean up
+        await job_runner.shutdown()
+
     app = FastAPI(
+        lifespan=lifespan,
         title="roam_and_report_api_layer",
         version=VERSION,
         docs_url="/docs",
@@ -150,6 +187,15 @@ def make_app(
         allow_headers=["*"],
     )
 
+    @app.middleware("http")
+    async def route_reads(request: Request, call_next):
+        # Requests that write, or clients that just wrote and ask for it, must
+        # not read from a replica that may lag behind the primary.
+        if request.method != "GET" or request.headers.get("X-Read-Your-Writes"):
+            with read_your_writes():
+                return await call_next(request)
+        return await call_next(request)
+
     # Provide the actual AuthService instance
     def get_auth_service_override() -> AuthService:
         return auth_svc
@@ -163,7 +209,15 @@ def make_app(
 
     @app.post("/token")
     async def login_for_access_token(email: str = Form(...), password: str = Form(...)):
-        user = await auth_svc.authenticate_user(email, password)
+        try:
+            user = await auth_svc.authenticate_user(email, password)
+        except LoginThrottledError:
+            print(f"User login for {email} throttled.")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts in progress, try again shortly",
+                headers={"Retry-After": "1"},
+            )
 
         if not user:
             print(f"User login for {email} failed.")
@@ -261,11 +315,15 @@ def make_app(
     async def get_related_entries(
         identifier: UUID,
         identifier_type: str,
+        sample_size: int = Query(25, ge=0, le=500),
         current_user: User = Depends(get_current_user),
     ) -> JSONResponse:
-        related_records = await summary_svc.get_related_records_summary(
-            identifier, identifier_type
-        )
+        try:
+            related_records = await summary_svc.get_related_records_summary(
+                identifier, identifier_type, sample_size
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         return JSONResponse(content=related_records)
 
     @app.get("/v1/overlaps", tags=["accommodation_logs"])
@@ -277,6 +335,19 @@ def make_app(
         overlaps = await summary_svc.get_overlaps(start_date, end_date)
         return JSONResponse(content=overlaps)
 
+    @app.get("/v1/potential_duplicates", tags=["accommodation_logs"])
+    async def get_potential_duplicates(
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        current_user: User = Depends(get_current_user),
+    ) -> StreamingResponse:
+        """Streams logs double-booking a traveler as newline-delimited JSON."""
+        duplicates = await summary_svc.get_potential_duplicates(start_date, end_date)
+        return StreamingResponse(
+            (duplicate.to_json() + "\n" for duplicate in duplicates),
+            media_type="application/x-ndjson",
+        )
+
     @app.delete(
         "/v1/accommodation_logs/{log_id}",
         operation_id="delete_accommodation_log",
@@ -734,18 +805,7 @@ def make_app(
         report_data = await summary_svc.get_bed_night_report(query_params)
         return report_data
 
-    @app.get(
-        "/v1/export_bed_night_report",
-        operation_id="export_bed_night_report",
-        response_class=StreamingResponse,  # Specify the type of response you expect to send
-        response_model=None,
-        tags=["bed_night_report"],
-    )
-    async def export_bed_night_report(
-        request: Request,
-        current_user: User = Depends(get_current_user),
-    ) -> StreamingResponse | HTTPException:
-        """Exports an excel file of a bed night report."""
+    def bed_night_export_params(request: Request) -> tuple[dict, Optional[list]]:
         query_params = dict(request.query_params)
         print("Query Params in API call:")
         print(query_params)
@@ -759,7 +819,31 @@ def make_app(
         property_names = query_params.get("property_names", "")
         if property_names:
             query_params["property_names"] = property_names.split("|")
+        return query_params, exclude_columns
+
+    def custom_export_params(request: Request) -> dict:
+        query_params = dict(request.query_params)
+        print("Query Params in API call:")
+        print(query_params)
+
+        property_names = query_params.get("property_names", "")
+        if property_names:
+            query_params["property_names"] = property_names.split("|")
+        return query_params
 
+    @app.get(
+        "/v1/export_bed_night_report",
+        operation_id="export_bed_night_report",
+        response_class=StreamingResponse,  # Specify the type of response you expect to send
+        response_model=None,
+        tags=["bed_night_report"],
+    )
+    async def export_bed_night_report(
+        request: Request,
+        current_user: User = Depends(get_current_user),
+    ) -> StreamingResponse | HTTPException:
+        """Exports an excel file of a bed night report."""
+        query_params, exclude_columns = bed_night_export_params(request)
         try:
             excel_stream = await summary_svc.generate_excel_file(
                 labels=query_params,
@@ -767,11 +851,11 @@ def make_app(
                 report_title=query_params["report_title"],
             )
             headers = {
-                "Content-Disposition": 'attachment; filename="accommodation_logs_report.xlsx"'
+                "Content-Disposition": f'attachment; filename="{EXPORT_FILENAME}"'
             }
             return StreamingResponse(
                 excel_stream,
-                media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                media_type=XLSX_MEDIA_TYPE,
                 headers=headers,
             )
         except ValueError as e:
@@ -788,24 +872,17 @@ def make_app(
         request: Request,
         current_user: User = Depends(get_current_user),
     ) -> StreamingResponse | HTTPException:
-        query_params = dict(request.query_params)
-        print("Query Params in API call:")
-        print(query_params)
-
-        property_names = query_params.get("property_names", "")
-        if property_names:
-            query_params["property_names"] = property_names.split("|")
-
+        query_params = custom_export_params(request)
         try:
             excel_stream = await summary_svc.generate_custom_excel_file(
                 query_params=query_params, report_title=query_params["report_title"]
             )
             headers = {
-                "Content-Disposition": 'attachment; filename="accommodation_logs_report.xlsx"'
+                "Content-Disposition": f'attachment; filename="{EXPORT_FILENAME}"'
             }
             return StreamingResponse(
                 excel_stream,
-                media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                media_type=XLSX_MEDIA_TYPE,
                 headers=headers,
             )
         except ValueError as e:
@@ -893,6 +970,7 @@ def make_app(
         is_deleted = await travel_svc.delete_trip(trip_id, current_user.email)
         if not is_deleted:
             raise HTTPException(status_code=404, detail="Trip not found")
+        quality_svc.invalidate_progress()
         return JSONResponse(
             content={"message": "Trip deleted successfully"},
             status_code=200,
@@ -925,6 +1003,148 @@ def make_app(
             raise HTTPException(status_code=404, detail="Report data not found")
         return progress
 
+    def submit_job(
+        current_user: User, kind: str, work: Callable[[], Awaitable[JobResult]]
+    ) -> JSONResponse:
+        try:
+            job = job_runner.submit(current_user.email, kind, work)
+        except JobLimitError as e:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=str(e),
+                headers={"Retry-After": "10"},
+            )
+        return JSONResponse(
+            content=job.to_dict(),
+            status_code=status.HTTP_202_ACCEPTED,
+            headers={"Location": f"/v1/jobs/{job.id}"},
+        )
+
+    def json_result(content, filename: str) -> JobResult:
+        return JobResult(
+            content=json.dumps(jsonable_encoder(content)).encode("utf-8"),
+            media_type="application/json",
+            filename=filename,
+        )
+
+    @app.post(
+        "/v1/jobs/export_bed_night_report",
+        operation_id="submit_export_bed_night_report",
+        tags=["jobs"],
+    )
+    async def submit_export_bed_night_report(
+        request: Request,
+        current_user: User = Depends(get_current_user),
+    ) -> JSONResponse:
+        """Queues a bed night report export; poll /v1/jobs/{job_id} for it."""
+        query_params, exclude_columns = bed_night_export_params(request)
+        if "report_title" not in query_params:
+            raise HTTPException(status_code=422, detail="report_title is required")
+
+        async def work() -> JobResult:
+            excel_stream = await summary_svc.generate_excel_file(
+                labels=query_params,
+                exclude_columns=exclude_columns,
+                report_title=query_params["report_title"],
+            )
+            return JobResult(excel_stream.getvalue(), XLSX_MEDIA_TYPE, EXPORT_FILENAME)
+
+        return submit_job(current_user, "export_bed_night_report", work)
+
+    @app.post(
+        "/v1/jobs/export_custom_report",
+        operation_id="submit_export_custom_report",
+        tags=["jobs"],
+    )
+    async def submit_export_custom_report(
+        request: Request,
+        current_user: User = Depends(get_current_user),
+    ) -> JSONResponse:
+        """Queues a custom report export; poll /v1/jobs/{job_id} for it."""
+        query_params = custom_export_params(request)
+        if "report_title" not in query_params:
+            raise HTTPException(status_code=422, detail="report_title is required")
+
+        async def work() -> JobResult:
+            excel_stream = await summary_svc.generate_custom_excel_file(
+                query_params=query_params, report_title=query_params["report_title"]
+            )
+            return JobResult(excel_stream.getvalue(), XLSX_MEDIA_TYPE, EXPORT_FILENAME)
+
+        return submit_job(current_user, "export_custom_report", work)
+
+    @app.post(
+        "/v1/jobs/potential_trips",
+        operation_id="submit_potential_trips",
+        tags=["jobs"],
+    )
+    async def submit_potential_trips(
+        current_user: User = Depends(get_current_user),
+    ) -> JSONResponse:
+        """Queues a potential trip search; poll /v1/jobs/{job_id} for it."""
+
+        async def work() -> JobResult:
+            trips = await quality_svc.find_potential_trips()
+            return json_result(trips, "potential_trips.json")
+
+        return submit_job(current_user, "potential_trips", work)
+
+    @app.post(
+        "/v1/jobs/progress",
+        operation_id="submit_progress",
+        tags=["jobs"],
+    )
+    async def submit_progress(
+        current_user: User = Depends(get_current_user),
+    ) -> JSONResponse:
+        """Queues a matching progress count; poll /v1/jobs/{job_id} for it."""
+
+        async def work() -> JobResult:
+            progress = await quality_svc.get_progress()
+            if progress is None:
+                raise ValueError("Report data not found")
+            return json_result(progress, "progress.json")
+
+        return submit_job(current_user, "progress", work)
+
+    @app.get(
+        "/v1/jobs/{job_id}",
+        operation_id="get_job",
+        tags=["jobs"],
+    )
+    async def get_job(
+        job_id: str, current_user: User = Depends(get_current_user)
+    ) -> JSONResponse:
+        """Gets the status of one of the current user's jobs."""
+        job = job_runner.get(job_id, current_user.email)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return JSONResponse(content=job.to_dict())
+
+    @app.get(
+        "/v1/jobs/{job_id}/download",
+        operation_id="download_job",
+        response_class=FileResponse,
+        response_model=None,
+        tags=["jobs"],
+    )
+    async def download_job(
+        job_id: str, current_user: User = Depends(get_current_user)
+    ) -> FileResponse:
+        """Downloads the result of one of the current user's finished jobs."""
+        job = job_runner.get(job_id, current_user.email)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if job.status == FAILED:
+            raise HTTPException(status_code=422, detail=job.error)
+        if job.status != DONE:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Job is {job.status}",
+                headers={"Retry-After": "5"},
+            )
+        return FileResponse(job.path, media_type=job.media_type, filename=job.filename)
+
     @app.get(
         "/v1/clients",
         operation_id="get_clients",
@@ -969,10 +1189,28 @@ def make_app(
         tags=["clients"],
     )
     async def get_referral_tree(
+        client_id: Optional[UUID] = None,
         current_user: User = Depends(get_current_user),
     ) -> Sequence[ReferralNode] | JSONResponse:
-        """Get all Client models."""
-        return await client_svc.get_referral_tree()
+        """Get referral trees, optionally only the one under a client."""
+        return await client_svc.get_referral_tree(client_id)
+
+    @app.get(
+        "/v1/clients/{client_id}/referrals",
+        operation_id="get_client_referral_lineage",
+        response_model=ReferralLineage,
+        tags=["clients"],
+    )
+    async def get_client_referral_lineage(
+        client_id: UUID,
+        max_depth: int = Query(10, ge=0, le=50),
+        current_user: User = Depends(get_current_user),
+    ) -> ReferralLineage:
+        """Get a client's referrers and referral subtree."""
+        lineage = await client_svc.get_referral_lineage(client_id, max_depth)
+        if lineage is None:
+            raise HTTPException(status_code=404, detail="Client not found")
+        return lineage
 
     @app.get(
         "/v1/reservations",
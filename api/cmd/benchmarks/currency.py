@@ -0,0 +1,75 @@
+# Copyright 2024 SH
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks bulk currency conversion over a synthetic rate history."""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from api.services.currency.rates import PIVOT_CURRENCY, RateTable
+
+
+def synthetic_quotes(num_currencies: int, years: int, seed: int):
+    """Generates USD-based quotes on roughly four of every five days."""
+    rng = random.Random(seed)
+    first_day = date(2015, 1, 1)
+    quotes = []
+    for number in range(num_currencies):
+        currency = f"C{number:02d}"
+        rate = rng.uniform(0.5, 100)
+        for offset in range(365 * years):
+            rate *= rng.uniform(0.99, 1.01)
+            if rng.random() < 0.8:
+                quotes.append(
+                    (PIVOT_CURRENCY, currency, first_day + timedelta(days=offset), rate)
+                )
+    return quotes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--amounts", type=int, default=100000)
+    parser.add_argument("--currencies", type=int, default=30)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    quotes = synthetic_quotes(args.currencies, args.years, args.seed)
+    start = time.perf_counter()
+    table = RateTable.from_quotes(quotes)
+    print(
+        f"Built table from {len(quotes)} quotes in {time.perf_counter() - start:.3f}s"
+    )
+
+    rng = np.random.default_rng(args.seed)
+    amounts = rng.uniform(10, 10000, args.amounts)
+    currencies = rng.choice(table.currencies, args.amounts).tolist()
+    dates = np.datetime64("2015-01-01") + rng.integers(
+        0, 365 * args.years, args.amounts
+    ).astype("timedelta64[D]")
+    for to_currency in (PIVOT_CURRENCY, table.currencies[-1]):
+        start = time.perf_counter()
+        converted = table.convert(amounts, currencies, dates, to_currency)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{args.amounts} amounts to {to_currency} in {elapsed * 1000:.1f}ms "
+            f"({int(np.isnan(converted).sum())} without a rate)"
+        )
+
+
+if __name__ == "__main__":
+    main()
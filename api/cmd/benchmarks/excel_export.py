@@ -0,0 +1,97 @@
+# Copyright 2024 SH
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measures event loop lag and throughput while Excel exports run.
+
+Compares building workbooks inline on the event loop with the
+SummaryService, which builds them on its Excel worker processes.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date, timedelta
+
+from api.services.summaries.excel import build_workbook
+from api.services.summaries.service import SummaryService
+
+
+def sample_columns(rows: int) -> dict:
+    """Returns bed night export columns with rows synthetic stays."""
+    first = date(2023, 1, 1)
+    return {
+        "Primary Traveler": [f"Traveler {n % 500}" for n in range(rows)],
+        "Date In": [first + timedelta(days=n % 365) for n in range(rows)],
+        "Date Out": [first + timedelta(days=n % 365 + 3) for n in range(rows)],
+        "# Pax": [2] * rows,
+        "Bed Nights": [6] * rows,
+        "Property": [f"Camp {n % 80}" for n in range(rows)],
+        "Country": [f"Country {n % 12}" for n in range(rows)],
+    }
+
+
+async def run(exports: int, columns: dict, inline: bool) -> dict:
+    """Runs the exports at once and probes the event loop until they finish."""
+    summary_svc = SummaryService()
+
+    async def export() -> None:
+        if inline:
+            build_workbook(columns, "Benchmark")
+        else:
+            await summary_svc._write_workbook(columns, "Benchmark")
+
+    lags = []
+    started = time.perf_counter()
+    tasks = [asyncio.create_task(export()) for _ in range(exports)]
+    # Probes are due every 10ms; lag counts from when a probe was due, so
+    # time the event loop spent blocked is included
+    due = started
+    while not all(task.done() for task in tasks):
+        due += 0.01
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        lags.append((time.perf_counter() - due) * 1000)
+    await asyncio.gather(*tasks)
+    lags.sort()
+    return {
+        "seconds": time.perf_counter() - started,
+        "probes": len(lags),
+        "p50": statistics.median(lags),
+        "max": lags[-1],
+    }
+
+
+async def main(exports: int, rows: int) -> None:
+    """Runs the exports inline and on the workers and prints the lag."""
+    columns = sample_columns(rows)
+    print(
+        f"{exports} exports of {rows} rows, "
+        f"{SummaryService.EXCEL_WORKERS} Excel worker processes"
+    )
+    # Start the workers first so their startup is not timed
+    await SummaryService()._write_workbook(sample_columns(1), "Warm up")
+    for label, inline in (("inline", True), ("offloaded", False)):
+        result = await run(exports, columns, inline)
+        print(
+            f"{label:<10} loop lag p50 {result['p50']:7.1f}ms  max {result['max']:7.1f}ms"
+            f"  ({result['probes']} probes, {result['seconds']:.1f}s, "
+            f"{exports / result['seconds']:.2f} exports/s)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--exports", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.exports, args.rows))
@@ -0,0 +1,139 @@
+# Copyright 2024 SH
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measures latency of a cheap endpoint while a storm of logins runs.
+
+Compares verifying bcrypt hashes inline on the event loop with the
+AuthService, which verifies them on its hashing threads.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+# pylint: disable=wrong-import-position
+from fastapi import FastAPI, HTTPException
+from fastapi.param_functions import Form
+from httpx import AsyncClient
+
+from api.services.auth.models import User
+from api.services.auth.service import AuthService, LoginThrottledError
+
+
+class InMemoryAuthRepository:
+    """Serves users from a dict so the benchmark needs no database."""
+
+    def __init__(self, users: dict):
+        self._users = users
+
+    async def get_user(self, email: str):
+        """Gets a user by email."""
+        return self._users.get(email)
+
+
+def make_app(auth_svc: AuthService, inline: bool) -> FastAPI:
+    """Builds an app with a login route and a cheap route."""
+    app = FastAPI()
+
+    @app.post("/token")
+    async def token(email: str = Form(...), password: str = Form(...)):
+        if inline:
+            user = await auth_svc._repo.get_user(email)
+            ok = user and auth_svc.pwd_context.verify(password, user.hashed_password)
+        else:
+            try:
+                ok = await auth_svc.authenticate_user(email, password)
+            except LoginThrottledError:
+                raise HTTPException(status_code=429)
+        if not ok:
+            raise HTTPException(status_code=401)
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"ok": True}
+
+    return app
+
+
+async def storm(app: FastAPI, logins: int, accounts: int, password: str) -> dict:
+    """Fires the logins at once and probes /health until they finish."""
+    latencies, statuses = [], []
+    async with AsyncClient(app=app, base_url="http://bench") as client:
+
+        async def login(number: int) -> None:
+            data = {
+                "email": f"user{number % accounts}@example.com",
+                "password": password,
+            }
+            statuses.append((await client.post("/token", data=data)).status_code)
+
+        tasks = [asyncio.create_task(login(n)) for n in range(logins)]
+        started = time.perf_counter()
+        # Probes are due every 10ms; latency counts from when a probe was due,
+        # so time the event loop spent blocked before sending it is included
+        due = started
+        while not all(task.done() for task in tasks):
+            due += 0.01
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            await client.get("/health")
+            latencies.append((time.perf_counter() - due) * 1000)
+        await asyncio.gather(*tasks)
+    latencies.sort()
+    return {
+        "seconds": time.perf_counter() - started,
+        "probes": len(latencies),
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "ok": statuses.count(200),
+        "throttled": statuses.count(429),
+    }
+
+
+async def main(logins: int, accounts: int) -> None:
+    """Runs the storm inline and offloaded and prints the probe latencies."""
+    password = "benchmark-password"
+    auth_svc = AuthService()
+    hashed = await auth_svc.hash_password(password)
+    auth_svc._repo = InMemoryAuthRepository(
+        {
+            f"user{n}@example.com": User(
+                email=f"user{n}@example.com", hashed_password=hashed, role="admin"
+            )
+            for n in range(accounts)
+        }
+    )
+    print(
+        f"{logins} logins over {accounts} accounts, "
+        f"{AuthService.HASH_WORKERS} hashing threads"
+    )
+    for label, inline in (("inline", True), ("offloaded", False)):
+        result = await storm(make_app(auth_svc, inline), logins, accounts, password)
+        print(
+            f"{label:<10} /health p50 {result['p50']:7.1f}ms  p99 {result['p99']:7.1f}ms"
+            f"  ({result['probes']} probes, {result['ok']} ok, "
+            f"{result['throttled']} throttled, {result['seconds']:.1f}s)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--accounts", type=int, default=40)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.accounts))
@@ -0,0 +1,89 @@
+# Copyright 2024 SH
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks overlap detection over a synthetic multi-year dataset."""
+import argparse
+import random
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+
+from api.services.summaries.overlaps import overlapping_pairs
+
+
+def synthetic_stays(num_stays: int, num_properties: int, years: int, seed: int):
+    """Generates stays spread evenly over properties and years."""
+    rng = random.Random(seed)
+    property_ids = [uuid.UUID(int=rng.getrandbits(128)) for _ in range(num_properties)]
+    first_day = date(2017, 1, 1)
+    span = 365 * years
+    stays = []
+    for _ in range(num_stays):
+        date_in = first_day + timedelta(days=rng.randrange(span))
+        stays.append(
+            {
+                "id": uuid.UUID(int=rng.getrandbits(128)),
+                "property_id": rng.choice(property_ids),
+                "date_in": date_in,
+                "date_out": date_in + timedelta(days=rng.randint(1, 7)),
+            }
+        )
+    return stays
+
+
+def nested_loop_pairs(stays):
+    """Pairs stays the way the self-join did: every pair at a property."""
+    by_property = defaultdict(list)
+    for stay in stays:
+        by_property[stay["property_id"]].append(stay)
+    for group in by_property.values():
+        for first in group:
+            for second in group:
+                if (
+                    first["id"] < second["id"]
+                    and first["date_out"] > second["date_in"]
+                    and second["date_out"] > first["date_in"]
+                ):
+                    yield first, second
+
+
+def timed(label: str, pairs) -> set:
+    """Drains the pair iterator, printing how long it took."""
+    start = time.perf_counter()
+    found = {(first["id"], second["id"]) for first, second in pairs}
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {len(found):>8} pairs in {elapsed:8.3f}s")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stays", type=int, default=60000)
+    parser.add_argument("--properties", type=int, default=150)
+    parser.add_argument("--years", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    stays = synthetic_stays(args.stays, args.properties, args.years, args.seed)
+    print(
+        f"{args.stays} stays over {args.properties} properties and {args.years} years"
+    )
+    swept = timed("sweep line", overlapping_pairs(stays))
+    joined = timed("nested loop", nested_loop_pairs(stays))
+    assert swept == joined, "Sweep line and nested loop disagree"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+# Copyright 2024 SH
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Explains every repository read against a seeded database and checks for plan regressions.
+
+Run against a local database seeded with production-sized data:
+
+    python -m api.cmd.benchmarks.query_plans --baseline query_plans.json
+
+The first run records the baseline. Later runs compare against it, print
+sequential scans over --seq-scan-rows rows, and exit non-zero when a query
+gains a large sequential scan or its cost or timing grows past the
+tolerances. Pass --update to accept the current plans as the new baseline.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Iterator, Optional
+
+import asyncpg
+
+from api.adapters.repository import ConnectionPoolManager, connection_configuration
+from api.services.audit.repository.postgres import PostgresAuditRepository
+from api.services.auth.repository.postgres import PostgresAuthRepository
+from api.services.clients.repository.postgres import PostgresClientRepository
+from api.services.currency.repository.postgres import PostgresCurrencyRepository
+from api.services.quality.repository.postgres import PostgresQualityRepository
+from api.services.reservations.repository.postgres import (
+    PostgresReservationRepository,
+)
+from api.services.summaries.repository.postgres import (
+    RELATED_LOG_CONDITIONS,
+    PostgresSummaryRepository,
+)
+from api.services.travel.repository.postgres import PostgresTravelRepository
+
+SAMPLE_QUERY = """
+    SELECT
+        al.id AS log_id, al.primary_traveler, al.property_id, al.date_in,
+        al.date_out, al.consultant_id, al.agency_id, al.booking_channel_id,
+        al.updated_by, p.name AS property_name, p.property_type,
+        p.location AS property_location, p.portfolio_id, p.country_id,
+        pf.name AS portfolio_name, c.name AS country_name,
+        cd.name AS core_destination_name, a.name AS agency_name,
+        bc.name AS booking_channel_name,
+        (SELECT id FROM public.clients LIMIT 1) AS client_id,
+        (SELECT id FROM public.trips LIMIT 1) AS trip_id,
+        (SELECT email FROM public.users LIMIT 1) AS user_email,
+        (SELECT MAX(rate_date) FROM public.daily_rates) AS rate_date
+    FROM public.accommodation_logs al
+    JOIN public.properties p ON al.property_id = p.id
+    JOIN public.portfolios pf ON p.portfolio_id = pf.id
+    JOIN public.core_destinations cd ON p.core_destination_id = cd.id
+    LEFT JOIN public.countries c ON p.country_id = c.id
+    LEFT JOIN public.agencies a ON al.agency_id = a.id
+    LEFT JOIN public.booking_channels bc ON al.booking_channel_id = bc.id
+    ORDER BY al.updated_at DESC
+    LIMIT 1
+"""
+# Statements issued by asyncpg itself rather than by a repository
+INTERNAL_QUERY = re.compile(r"pg_catalog|pg_advisory_unlock_all|pg_type")
+
+
+class CapturingConnection(asyncpg.Connection):
+    """Records every statement sent through the public query methods."""
+
+    captured: list[tuple[str, tuple]] = []
+
+    async def execute(self, query, *args, **kwargs):
+        self.captured.append((query, args))
+        return await super().execute(query, *args, **kwargs)
+
+    async def fetch(self, query, *args, **kwargs):
+        self.captured.append((query, args))
+        return await super().fetch(query, *args, **kwargs)
+
+    async def fetchrow(self, query, *args, **kwargs):
+        self.captured.append((query, args))
+        return await super().fetchrow(query, *args, **kwargs)
+
+    async def fetchval(self, query, *args, **kwargs):
+        self.captured.append((query, args))
+        return await super().fetchval(query, *args, **kwargs)
+
+
+@dataclass(slots=True, frozen=True)
+class QueryCase:
+    """A repository read, run with values sampled from the database."""
+
+    name: str
+    call: Callable[[dict], Awaitable]
+    needs: tuple[str, ...] = ()
+
+
+@dataclass(slots=True)
+class PlanReport:
+    """The plan and timing of one captured statement."""
+
+    key: str
+    sql: str
+    total_cost: float
+    execution_ms: float
+    shared_hit: int
+    shared_read: int
+    nodes: list[str]
+    seq_scans: dict[str, float]
+    plan: dict = field(repr=False)
+
+    def to_dict(self) -> dict:
+        """Serializes the report for the baseline file."""
+        return {
+            "sql": self.sql,
+            "total_cost": self.total_cost,
+            "execution_ms": self.execution_ms,
+            "shared_hit": self.shared_hit,
+            "shared_read": self.shared_read,
+            "nodes": self.nodes,
+            "seq_scans": self.seq_scans,
+            "plan": self.plan,
+        }
+
+
+def build_workload() -> list[QueryCase]:
+    """Lists the repository reads to explain."""
+    summaries = PostgresSummaryRepository()
+    travel = PostgresTravelRepository()
+    quality = PostgresQualityRepository()
+    clients = PostgresClientRepository()
+    currency = PostgresCurrencyRepository()
+    reservations = PostgresReservationRepository()
+    auth = PostgresAuthRepository()
+    audit = PostgresAuditRepository()
+    month = datetime.timedelta(days=30)
+
+    def window(s: dict) -> tuple[datetime.date, datetime.date]:
+        return s["date_in"] - month, s["date_in"] + month
+
+    cases = [
+        QueryCase(
+            "summaries.all_accommodation_logs",
+            lambda s: summaries.get_all_accommodation_logs(),
+        ),
+        QueryCase(
+            "summaries.accommodation_logs_by_date_range",
+            lambda s: summaries.get_accommodation_logs_by_date_range(*window(s)),
+            ("date_in",),
+        ),
+        QueryCase(
+            "summaries.overlaps",
+            lambda s: summaries.get_overlaps(*window(s)),
+            ("date_in",),
+        ),
+        QueryCase("summaries.all_properties", lambda s: summaries.get_all_properties()),
+        QueryCase(
+            "summaries.property_details", lambda s: summaries.get_property_details()
+        ),
+        QueryCase(
+            "summaries.properties_by_portfolio_name",
+            lambda s: summaries.get_properties_by_portfolio_name(s["portfolio_name"]),
+            ("portfolio_name",),
+        ),
+        QueryCase("summaries.all_countries", lambda s: summaries.get_all_countries()),
+        QueryCase(
+            "summaries.country_by_id",
+            lambda s: summaries.get_country_by_id(s["country_id"]),
+            ("country_id",),
+        ),
+        QueryCase(
+            "summaries.all_booking_channels",
+            lambda s: summaries.get_all_booking_channels(),
+        ),
+        QueryCase("summaries.all_agencies", lambda s: summaries.get_all_agencies()),
+        QueryCase("summaries.all_portfolios", lambda s: summaries.get_all_portfolios()),
+        QueryCase("summaries.all_trips", lambda s: summaries.get_all_trips()),
+        QueryCase(
+            "summaries.trip_summary_by_id",
+            lambda s: summaries.get_trip_summary_by_id(s["trip_id"]),
+            ("trip_id",),
+        ),
+        QueryCase(
+            "travel.accommodation_log_by_ids",
+            lambda s: travel.get_accommodation_log_by_ids([s["log_id"]]),
+            ("log_id",),
+        ),
+        QueryCase("travel.all_consultants", lambda s: travel.get_all_consultants()),
+        QueryCase(
+            "travel.property_by_id",
+            lambda s: travel.get_property_by_id(s["property_id"]),
+            ("property_id",),
+        ),
+        QueryCase(
+            "quality.unmatched_accommodation_logs",
+            lambda s: quality.get_unmatched_accommodation_logs(),
+        ),
+        QueryCase(
+            "quality.unmatched_accommodation_logs_after",
+            lambda s: quality.get_unmatched_accommodation_logs(
+                (s["primary_traveler"], s["date_in"], s["log_id"])
+            ),
+            ("primary_traveler", "log_id"),
+        ),
+        QueryCase("quality.flagged_trips", lambda s: quality.get_flagged_trips()),
+        QueryCase("clients.all", lambda s: clients.get()),
+        QueryCase(
+            "clients.by_id", lambda s: clients.get_by_id(s["client_id"]), ("client_id",)
+        ),
+        QueryCase("clients.summaries", lambda s: clients.get_summaries()),
+        QueryCase("clients.referral_matches", lambda s: clients.get_referral_matches()),
+        QueryCase(
+            "clients.referral_lineage",
+            lambda s: clients.get_referral_lineage(s["client_id"], 10),
+            ("client_id",),
+        ),
+        QueryCase(
+            "currency.rates_date",
+            lambda s: currency.get_rates_date(s["rate_date"]),
+            ("rate_date",),
+        ),
+        QueryCase(
+            "currency.currency_for_date",
+            lambda s: currency.get_currency_for_date(s["rate_date"], "ZAR", "USD"),
+            ("rate_date",),
+        ),
+        QueryCase("reservations.all", lambda s: reservations.get()),
+        QueryCase(
+            "auth.user", lambda s: auth.get_user(s["user_email"]), ("user_email",)
+        ),
+        QueryCase("auth.all_users", lambda s: auth.get_all_users()),
+        QueryCase(
+            "audit.recent",
+            lambda s: audit.get(action_timestamp=datetime.datetime.now() - month),
+        ),
+    ]
+    for identifier_type in RELATED_LOG_CONDITIONS:
+        cases.append(
+            QueryCase(
+                f"summaries.related_log_impact.{identifier_type}",
+                lambda s, t=identifier_type: summaries.get_related_log_impact(
+                    s[t], t, 1000, 25
+                ),
+                (identifier_type,),
+            )
+        )
+    # One case per filter supported by get_accommodation_logs_by_filter
+    filters = {
+        "start_date": ("date_in", lambda s: s["date_in"]),
+        "end_date": ("date_out", lambda s: s["date_out"]),
+        "id": ("log_id", lambda s: s["log_id"]),
+        "country_name": ("country_name", lambda s: s["country_name"]),
+        "portfolio_name": ("portfolio_name", lambda s: s["portfolio_name"]),
+        "property_name": ("property_name", lambda s: s["property_name"]),
+        "core_destination_name": (
+            "core_destination_name",
+            lambda s: s["core_destination_name"],
+        ),
+        "agency": ("agency_name", lambda s: s["agency_name"]),
+        "booking_channel": (
+            "booking_channel_name",
+            lambda s: s["booking_channel_name"],
+        ),
+        "updated_by": ("updated_by", lambda s: s["updated_by"]),
+        "property_id": ("property_id", lambda s: s["property_id"]),
+        "consultant_id": ("consultant_id", lambda s: s["consultant_id"]),
+        "booking_channel_id": ("booking_channel_id", lambda s: s["booking_channel_id"]),
+        "agency_id": ("agency_id", lambda s: s["agency_id"]),
+        "portfolio_id": ("portfolio_id", lambda s: s["portfolio_id"]),
+        "property_type": ("property_type", lambda s: s["property_type"]),
+        "country_id": ("country_id", lambda s: s["country_id"]),
+        "property_names": ("property_name", lambda s: [s["property_name"]]),
+        "property_location": ("property_location", lambda s: [s["property_location"]]),
+    }
+    for key, (needs, value) in filters.items():
+        cases.append(
+            QueryCase(
+                f"summaries.accommodation_logs_by_filter.{key}",
+                lambda s, k=key, v=value: summaries.get_accommodation_logs_by_filter(
+                    {k: v(s)}
+                ),
+                (needs,),
+            )
+        )
+    return cases
+
+
+def plan_nodes(plan: dict) -> Iterator[dict]:
+    """Walks a JSON plan depth first."""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def summarize_plan(key: str, sql: str, explained: dict) -> PlanReport:
+    """Reduces EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) output to a report."""
+    root = explained["Plan"]
+    nodes, seq_scans = [], {}
+    for node in plan_nodes(root):
+        target = node.get("Index Name") or node.get("Relation Name")
+        nodes.append(f"{node['Node Type']} {target}" if target else node["Node Type"])
+        if node["Node Type"] == "Seq Scan":
+            # Rows read before filtering, across every loop of the node
+            scanned = (
+                node.get("Actual Rows", 0) + node.get("Rows Removed by Filter", 0)
+            ) * node.get("Actual Loops", 1)
+            relation = node["Relation Name"]
+            seq_scans[relation] = max(seq_scans.get(relation, 0), scanned)
+    return PlanReport(
+        key=key,
+        sql=" ".join(sql.split()),
+        total_cost=root["Total Cost"],
+        execution_ms=explained.get("Execution Time", 0.0),
+        shared_hit=root.get("Shared Hit Blocks", 0),
+        shared_read=root.get("Shared Read Blocks", 0),
+        nodes=nodes,
+        seq_scans=seq_scans,
+        plan=root,
+    )
+
+
+def find_regressions(
+    baseline: dict,
+    current: dict,
+    seq_scan_rows: int,
+    cost_tolerance: float = 1.5,
+    time_tolerance: float = 2.0,
+    min_time_ms: float = 5.0,
+) -> list[str]:
+    """Compares serialized reports keyed by statement and describes regressions."""
+    regressions = []
+    for key, report in current.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        for relation, rows in report["seq_scans"].items():
+            if rows >= seq_scan_rows and relation not in before["seq_scans"]:
+                regressions.append(
+                    f"{key}: new sequential scan on {relation} ({rows:.0f} rows)"
+                )
+        if report["total_cost"] > before["total_cost"] * cost_tolerance:
+            regressions.append(
+                f"{key}: cost {before['total_cost']:.0f} -> {report['total_cost']:.0f}"
+            )
+        if (
+            report["execution_ms"] > before["execution_ms"] * time_tolerance
+            and report["execution_ms"] - before["execution_ms"] > min_time_ms
+        ):
+            regressions.append(
+                f"{key}: time {before['execution_ms']:.1f}ms -> "
+                f"{report['execution_ms']:.1f}ms"
+            )
+    return regressions
+
+
+async def explain(conn: asyncpg.Connection, sql: str, args: tuple) -> dict:
+    """Runs EXPLAIN ANALYZE in a rolled back transaction."""
+    transaction = conn.transaction()
+    await transaction.start()
+    try:
+        output = await conn.fetchval(
+            f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", *args
+        )
+    finally:
+        await transaction.rollback()
+    return json.loads(output)[0]
+
+
+async def sample_values(conn: asyncpg.Connection) -> dict:
+    """Picks real ids and names so each case hits existing rows."""
+    row = await conn.fetchrow(SAMPLE_QUERY)
+    return dict(row) if row else {}
+
+
+async def run_workload(cases: list[QueryCase]) -> tuple[dict, list[str]]:
+    """Runs each case, captures its statements and explains them.
+
+    Returns the reports keyed by case name and statement number, plus the
+    cases that were skipped or failed.
+    """
+    captured = CapturingConnection.captured
+    pool = await asyncpg.create_pool(
+        **connection_configuration(), connection_class=CapturingConnection
+    )
+    # Route every repository read, replica reads included, through this pool
+    previous = ConnectionPoolManager._pool, ConnectionPoolManager._replica_pool
+    ConnectionPoolManager._pool = ConnectionPoolManager._replica_pool = pool
+    reports, problems = {}, []
+    try:
+        async with pool.acquire() as conn:
+            samples = await sample_values(conn)
+        for case in cases:
+            missing = [name for name in case.needs if samples.get(name) is None]
+            if missing:
+                problems.append(f"{case.name}: skipped, no sample {', '.join(missing)}")
+                continue
+            captured.clear()
+            try:
+                await case.call(samples)
+            except Exception as exc:  # pylint: disable=broad-except
+                problems.append(f"{case.name}: failed with {exc!r}")
+                continue
+            statements = [
+                (query, args)
+                for query, args in captured
+                if query.lstrip().upper().startswith(("SELECT", "WITH"))
+                and not INTERNAL_QUERY.search(query)
+            ]
+            async with pool.acquire() as conn:
+                for number, (query, args) in enumerate(statements, start=1):
+                    key = f"{case.name}#{number}"
+                    explained = await explain(conn, query, args)
+                    reports[key] = summarize_plan(key, query, explained)
+    finally:
+        ConnectionPoolManager._pool, ConnectionPoolManager._replica_pool = previous
+        await pool.close()
+    return reports, problems
+
+
+async def main(
+    baseline_path: str, update: bool, seq_scan_rows: int, only: Optional[str]
+) -> int:
+    """Entrypoint for the query plan check."""
+    cases = [c for c in build_workload() if not only or c.name.startswith(only)]
+    reports, problems = await run_workload(cases)
+    for problem in problems:
+        print(problem)
+
+    current = {key: report.to_dict() for key, report in reports.items()}
+    for key, report in current.items():
+        large = {r: n for r, n in report["seq_scans"].items() if n >= seq_scan_rows}
+        scans = ", ".join(f"seq scan {r} ({n:.0f} rows)" for r, n in large.items())
+        print(
+            f"{key:<60} {report['execution_ms']:>9.1f}ms "
+            f"cost {report['total_cost']:>10.0f}  {scans}"
+        )
+
+    if update or not os.path.exists(baseline_path):
+        with open(baseline_path, "w", encoding="utf-8") as fd:
+            json.dump(current, fd, indent=2, sort_keys=True, default=str)
+        print(f"Recorded {len(current)} plans in {baseline_path}.")
+        return 0
+
+    with open(baseline_path, encoding="utf-8") as fd:
+        baseline = json.load(fd)
+    regressions = find_regressions(baseline, current, seq_scan_rows)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print(f"Checked {len(current)} plans, {len(regressions)} regressions.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--baseline", default="query_plans.json")
+    parser.add_argument(
+        "--update", action="store_true", help="record the current plans as baseline"
+    )
+    parser.add_argument("--seq-scan-rows", type=int, default=10000)
+    parser.add_argument("--only", help="only run cases whose name starts with this")
+    args = parser.parse_args()
+    raise SystemExit(
+        asyncio.run(main(args.baseline, args.update, args.seq_scan_rows, args.only))
+    )
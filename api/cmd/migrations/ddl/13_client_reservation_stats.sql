@@ -0,0 +1,63 @@
+-- Copyright 2024 SH
+
+-- Licensed under the Apache License, Version 2.0 (the "License");
+-- you may not use this file except in compliance with the License.
+-- You may obtain a copy of the License at
+
+--     http://www.apache.org/licenses/LICENSE-2.0
+
+-- Unless required by applicable law or agreed to in writing, software
+-- distributed under the License is distributed on an "AS IS" BASIS,
+-- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+-- See the License for the specific language governing permissions and
+-- limitations under the License.
+
+-- Per-client reservation aggregates, kept current by the reservations
+-- repository so referral queries never scan the reservations table.
+CREATE TABLE IF NOT EXISTS public.client_reservation_stats (
+    client_id UUID PRIMARY KEY NOT NULL,
+    earliest_trip DATE,
+    latest_trip DATE,
+    num_trips INT NOT NULL,
+    total_trip_spend DECIMAL,
+    avg_trip_spend DECIMAL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (client_id) REFERENCES public.clients(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_reservations_client_id ON public.reservations(client_id);
+CREATE INDEX IF NOT EXISTS idx_clients_referred_by_id ON public.clients(referred_by_id);
+
+-- Backfill and reconcile with any reservations loaded outside the repository
+INSERT INTO public.client_reservation_stats (
+    client_id, earliest_trip, latest_trip, num_trips, total_trip_spend, avg_trip_spend
+)
+SELECT
+    client_id,
+    MIN(start_date),
+    MAX(start_date),
+    COUNT(*),
+    SUM(cost),
+    AVG(cost)
+FROM public.reservations
+GROUP BY client_id
+ON CONFLICT (client_id) DO UPDATE SET
+    earliest_trip = EXCLUDED.earliest_trip,
+    latest_trip = EXCLUDED.latest_trip,
+    num_trips = EXCLUDED.num_trips,
+    total_trip_spend = EXCLUDED.total_trip_spend,
+    avg_trip_spend = EXCLUDED.avg_trip_spend,
+    updated_at = CURRENT_TIMESTAMP
+WHERE (
+    client_reservation_stats.earliest_trip,
+    client_reservation_stats.latest_trip,
+    client_reservation_stats.num_trips,
+    client_reservation_stats.total_trip_spend,
+    client_reservation_stats.avg_trip_spend
+) IS DISTINCT FROM (
+    EXCLUDED.earliest_trip,
+    EXCLUDED.latest_trip,
+    EXCLUDED.num_trips,
+    EXCLUDED.total_trip_spend,
+    EXCLUDED.avg_trip_spend
+);
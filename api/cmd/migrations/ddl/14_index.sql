@@ -0,0 +1,20 @@
+-- Copyright 2024 SH
+
+-- Licensed under the Apache License, Version 2.0 (the "License");
+-- you may not use this file except in compliance with the License.
+-- You may obtain a copy of the License at
+
+--     http://www.apache.org/licenses/LICENSE-2.0
+
+-- Unless required by applicable law or agreed to in writing, software
+-- distributed under the License is distributed on an "AS IS" BASIS,
+-- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+-- See the License for the specific language governing permissions and
+-- limitations under the License.
+
+-- migrate:no-transaction
+
+-- Foreign key lookups used by delete impact checks
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_accommodation_logs_consultant_id ON public.accommodation_logs(consultant_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_accommodation_logs_agency_id ON public.accommodation_logs(agency_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_accommodation_logs_booking_channel_id ON public.accommodation_logs(booking_channel_id);
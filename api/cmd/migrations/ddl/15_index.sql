@@ -0,0 +1,25 @@
+-- Copyright 2024 SH
+
+-- Licensed under the Apache License, Version 2.0 (the "License");
+-- you may not use this file except in compliance with the License.
+-- You may obtain a copy of the License at
+
+--     http://www.apache.org/licenses/LICENSE-2.0
+
+-- Unless required by applicable law or agreed to in writing, software
+-- distributed under the License is distributed on an "AS IS" BASIS,
+-- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+-- See the License for the specific language governing permissions and
+-- limitations under the License.
+
+-- migrate:no-transaction
+
+-- 8_index declares idx_accommodation_logs_on_traveler_date_in twice, so only the
+-- (primary_traveler, date_in) version exists. The covering index leads with the
+-- same two columns and no query reads only its columns, so it only slows writes.
+DROP INDEX CONCURRENTLY IF EXISTS public.idx_accommodation_logs_covering;
+
+-- Filters in get_accommodation_logs_by_filter without a supporting index
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_accommodation_logs_updated_by ON public.accommodation_logs(updated_by);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_properties_property_type ON public.properties(property_type);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_properties_location ON public.properties(location);
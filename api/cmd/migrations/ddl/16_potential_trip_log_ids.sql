@@ -0,0 +1,35 @@
+-- Copyright 2024 SH
+
+-- Licensed under the Apache License, Version 2.0 (the "License");
+-- you may not use this file except in compliance with the License.
+-- You may obtain a copy of the License at
+
+--     http://www.apache.org/licenses/LICENSE-2.0
+
+-- Unless required by applicable law or agreed to in writing, software
+-- distributed under the License is distributed on an "AS IS" BASIS,
+-- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+-- See the License for the specific language governing permissions and
+-- limitations under the License.
+
+-- Store flagged trips' log ids as a uuid[] instead of a comma-joined string,
+-- so overlap and membership checks can use a GIN index instead of parsing
+-- every row. Existing rows are converted in place; the unique constraint on
+-- (trip_name, accommodation_log_ids) is rebuilt on the new type.
+DO $$
+BEGIN
+    IF (
+        SELECT data_type
+        FROM information_schema.columns
+        WHERE table_schema = 'public'
+            AND table_name = 'potential_trips'
+            AND column_name = 'accommodation_log_ids'
+    ) = 'character varying' THEN
+        ALTER TABLE public.potential_trips
+        ALTER COLUMN accommodation_log_ids TYPE UUID[]
+        USING regexp_split_to_array(trim(accommodation_log_ids), '\s*,\s*')::UUID[];
+    END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_potential_trips_accommodation_log_ids
+ON public.potential_trips USING GIN (accommodation_log_ids);
@@ -0,0 +1,163 @@
+-- Copyright 2024 SH
+
+-- Licensed under the Apache License, Version 2.0 (the "License");
+-- you may not use this file except in compliance with the License.
+-- You may obtain a copy of the License at
+
+--     http://www.apache.org/licenses/LICENSE-2.0
+
+-- Unless required by applicable law or agreed to in writing, software
+-- distributed under the License is distributed on an "AS IS" BASIS,
+-- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+-- See the License for the specific language governing permissions and
+-- limitations under the License.
+
+-- Range partition accommodation_logs by date_in and audit_logs by
+-- action_timestamp, one partition per year. Reports filter on stay dates and
+-- the audit log on action time, so those queries skip years outside their
+-- range, and old audit years can be detached and archived
+-- (api/cmd/migrations/partitions.py).
+--
+-- A primary key on a partitioned table must include the partition key, so
+-- the keys become (id, date_in) and (id, action_timestamp). Rows outside every
+-- yearly partition land in a default partition until create_year_partition
+-- moves them into their year. Existing rows are copied into the new tables
+-- inside this migration's transaction, which holds both tables locked while
+-- it runs.
+
+CREATE OR REPLACE FUNCTION public.create_year_partition(parent TEXT, year INT)
+RETURNS BOOLEAN
+LANGUAGE plpgsql AS $$
+DECLARE
+    partition TEXT := format('%s_%s', parent, year);
+    key_column TEXT;
+    key_type TEXT;
+    lower_bound TEXT;
+    upper_bound TEXT;
+BEGIN
+    IF to_regclass(format('public.%I', partition)) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+    INTO key_column, key_type
+    FROM pg_partitioned_table pt
+    JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = pt.partattrs[0]
+    WHERE pt.partrelid = format('public.%I', parent)::regclass;
+
+    -- Timestamp partitions follow UTC years
+    IF key_type = 'date' THEN
+        lower_bound := make_date(year, 1, 1)::TEXT;
+        upper_bound := make_date(year + 1, 1, 1)::TEXT;
+    ELSE
+        lower_bound := make_timestamptz(year, 1, 1, 0, 0, 0, 'UTC')::TEXT;
+        upper_bound := make_timestamptz(year + 1, 1, 1, 0, 0, 0, 'UTC')::TEXT;
+    END IF;
+
+    EXECUTE format(
+        'CREATE TABLE public.%I (LIKE public.%I INCLUDING DEFAULTS)',
+        partition, parent
+    );
+    -- The default partition may already hold rows for this year, and the
+    -- partition cannot be attached until they move into it
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM public.%I WHERE %I >= %L AND %I < %L RETURNING *) '
+        || 'INSERT INTO public.%I SELECT * FROM moved',
+        parent || '_default', key_column, lower_bound, key_column, upper_bound,
+        partition
+    );
+    EXECUTE format(
+        'ALTER TABLE public.%I ATTACH PARTITION public.%I FOR VALUES FROM (%L) TO (%L)',
+        parent, partition, lower_bound, upper_bound
+    );
+    RETURN TRUE;
+END $$;
+
+-- accommodation_logs
+ALTER TABLE public.accommodation_logs RENAME TO accommodation_logs_unpartitioned;
+
+CREATE TABLE public.accommodation_logs (
+    LIKE public.accommodation_logs_unpartitioned INCLUDING DEFAULTS,
+    PRIMARY KEY (id, date_in),
+    FOREIGN KEY (property_id) REFERENCES public.properties(id),
+    FOREIGN KEY (consultant_id) REFERENCES public.consultants(id),
+    FOREIGN KEY (booking_channel_id) REFERENCES public.booking_channels(id),
+    FOREIGN KEY (agency_id) REFERENCES public.agencies(id),
+    FOREIGN KEY (trip_id) REFERENCES public.trips(id),
+    UNIQUE (primary_traveler, property_id, date_in, date_out)
+) PARTITION BY RANGE (date_in);
+
+CREATE TABLE public.accommodation_logs_default
+PARTITION OF public.accommodation_logs DEFAULT;
+
+SELECT public.create_year_partition('accommodation_logs', year)
+FROM generate_series(
+    (
+        SELECT COALESCE(MIN(EXTRACT(YEAR FROM date_in)), EXTRACT(YEAR FROM CURRENT_DATE))::INT
+        FROM public.accommodation_logs_unpartitioned
+    ),
+    EXTRACT(YEAR FROM CURRENT_DATE)::INT + 2
+) AS year;
+
+INSERT INTO public.accommodation_logs
+SELECT * FROM public.accommodation_logs_unpartitioned;
+
+DROP TABLE public.accommodation_logs_unpartitioned;
+
+-- Indexes from 4_index, 8_index, 14_index, 15_index and 17_index, built once
+-- on the parent and cascaded to every partition
+CREATE INDEX idx_accommodation_logs_date_in ON public.accommodation_logs(date_in);
+CREATE INDEX dx_accommodation_logs_date_out ON public.accommodation_logs(date_out);
+CREATE INDEX idx_accommodation_logs_property_date ON public.accommodation_logs(property_id, date_in, date_out);
+CREATE INDEX idx_accommodation_logs_updated_at ON public.accommodation_logs(updated_at);
+CREATE INDEX idx_accommodation_logs_on_traveler_date_in ON public.accommodation_logs (primary_traveler ASC, date_in ASC);
+CREATE INDEX idx_accommodation_logs_trip_id ON public.accommodation_logs(trip_id);
+CREATE INDEX idx_accommodation_logs_consultant_id ON public.accommodation_logs(consultant_id);
+CREATE INDEX idx_accommodation_logs_agency_id ON public.accommodation_logs(agency_id);
+CREATE INDEX idx_accommodation_logs_booking_channel_id ON public.accommodation_logs(booking_channel_id);
+CREATE INDEX idx_accommodation_logs_updated_by ON public.accommodation_logs(updated_by);
+CREATE INDEX idx_accommodation_logs_unmatched
+ON public.accommodation_logs (lower(trim(primary_traveler)), date_in, id)
+WHERE trip_id IS NULL;
+
+-- audit_logs
+ALTER TABLE public.audit_logs RENAME TO audit_logs_unpartitioned;
+
+CREATE TABLE public.audit_logs (
+    LIKE public.audit_logs_unpartitioned INCLUDING DEFAULTS,
+    PRIMARY KEY (id, action_timestamp)
+) PARTITION BY RANGE (action_timestamp);
+
+CREATE TABLE public.audit_logs_default
+PARTITION OF public.audit_logs DEFAULT;
+
+SELECT public.create_year_partition('audit_logs', year)
+FROM generate_series(
+    (
+        SELECT COALESCE(
+            MIN(EXTRACT(YEAR FROM action_timestamp AT TIME ZONE 'UTC')),
+            EXTRACT(YEAR FROM CURRENT_TIMESTAMP AT TIME ZONE 'UTC')
+        )::INT
+        FROM public.audit_logs_unpartitioned
+    ),
+    EXTRACT(YEAR FROM CURRENT_TIMESTAMP AT TIME ZONE 'UTC')::INT + 2
+) AS year;
+
+-- The partition key is part of the primary key, so it can no longer be NULL;
+-- rows logged without a time keep the epoch and stay in the default partition
+INSERT INTO public.audit_logs
+SELECT
+    id,
+    table_name,
+    record_id,
+    user_name,
+    before_value,
+    after_value,
+    "action",
+    COALESCE(action_timestamp, 'epoch')
+FROM public.audit_logs_unpartitioned;
+
+DROP TABLE public.audit_logs_unpartitioned;
+
+-- AuditService looks up one record's history by table and record id
+CREATE INDEX idx_audit_logs_record ON public.audit_logs(table_name, record_id);
@@ -0,0 +1,45 @@
+# Copyright 2024 SH
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Bulk imports clients from a CSV whose headers are Client field names."""
+import argparse
+import asyncio
+import csv
+
+from api.services.clients.service import ClientService
+
+
+async def import_clients(path: str, updated_by: str, batch_size: int) -> None:
+    """Streams the CSV through the client import pipeline."""
+    client_service = ClientService()
+    with open(path, encoding="utf-8-sig", newline="") as csv_file:
+        report = await client_service.import_clients(
+            csv.DictReader(csv_file), updated_by=updated_by, batch_size=batch_size
+        )
+    for batch in report.batches:
+        for error in batch.errors:
+            print(f"Batch {batch.batch_number} {error}")
+    print(
+        f"Imported {report.inserted} new and {report.updated} updated clients, "
+        f"rejected {report.rejected} rows ({report.rows_per_second:.0f} rows/sec)."
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path")
+    parser.add_argument("--updated-by", default="admin@travelbeyond.com")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(import_clients(args.path, args.updated_by, args.batch_size))
@@ -0,0 +1,49 @@
+# Copyright 2024 SH
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Backfills historical daily rates from a CSV whose headers are DailyRate field names.
+
+Expects base_currency, target_currency, currency_name, conversion_rate and
+rate_date columns, with an optional rate_time.
+"""
+import argparse
+import asyncio
+
+from api.cmd.migrations.seed_pipeline import stream_csv
+from api.services.currency.service import CurrencyService
+
+
+async def import_rates(path: str, updated_by: str, batch_size: int) -> None:
+    """Streams the CSV through the daily rate import pipeline."""
+    currency_service = CurrencyService()
+    report = await currency_service.import_rates(
+        stream_csv(path), updated_by=updated_by, batch_size=batch_size
+    )
+    for batch in report.batches:
+        for error in batch.errors:
+            print(f"Batch {batch.batch_number} {error}")
+    print(
+        f"Imported {report.inserted} new and {report.updated} updated rates, "
+        f"rejected {report.rejected} of {report.rows} rows in {report.seconds:.1f}s "
+        f"({report.rows_per_second:.0f} rows/sec)."
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path")
+    parser.add_argument("--updated-by", default="admin@travelbeyond.com")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+    asyncio.run(import_rates(args.path, args.updated_by, args.batch_size))
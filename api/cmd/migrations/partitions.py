@@ -0,0 +1,142 @@
+# Copyright 2024 SH
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Maintains the yearly partitions of accommodation_logs and audit_logs.
+
+Creates partitions for the coming years, and for any year whose rows have
+landed in a default partition, and moves old audit partitions out of the
+audit_logs table into the archive schema.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import date
+from textwrap import dedent
+from typing import Optional
+
+import asyncpg
+
+from api.config.postgres import PostgresConfig, make_conn
+
+# The year each row's partition covers; timestamp partitions follow UTC years
+PARTITION_YEAR = {
+    "accommodation_logs": "EXTRACT(YEAR FROM date_in)",
+    "audit_logs": "EXTRACT(YEAR FROM action_timestamp AT TIME ZONE 'UTC')",
+}
+YEARS_AHEAD = 2
+ARCHIVE_SCHEMA = "archive"
+log = logging.getLogger(__name__)
+
+
+async def ensure_partitions(
+    conn: asyncpg.Connection,
+    years_ahead: int = YEARS_AHEAD,
+    today: Optional[date] = None,
+) -> list[str]:
+    """Creates missing yearly partitions and returns their names.
+
+    Covers this year through years_ahead years from now, plus every year
+    with rows waiting in a default partition, which are moved into it.
+    """
+    year = (today or date.today()).year
+    created = []
+    for table, year_expression in PARTITION_YEAR.items():
+        waiting = await conn.fetch(
+            f"SELECT DISTINCT ({year_expression})::INT AS year "
+            f"FROM public.{table}_default"
+        )
+        # Rows audited without a time keep the epoch in the default partition
+        years = {row["year"] for row in waiting if row["year"] > 1970}
+        years.update(range(year, year + years_ahead + 1))
+        for partition_year in sorted(years):
+            if await conn.fetchval(
+                "SELECT public.create_year_partition($1, $2)", table, partition_year
+            ):
+                created.append(f"{table}_{partition_year}")
+    return created
+
+
+async def archive_partitions(
+    conn: asyncpg.Connection, before_year: int, table: str = "audit_logs"
+) -> list[str]:
+    """Detaches a table's partitions for years before before_year.
+
+    Detached partitions move to the archive schema, where they can be dumped
+    and dropped, and queries on the table no longer plan around them.
+    """
+    partitions = await conn.fetch(
+        dedent(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = $1::regclass
+                AND c.relname ~ ('^' || $2 || '_[0-9]{4}$')
+                AND substring(c.relname FROM '[0-9]{4}$')::INT < $3
+            ORDER BY c.relname
+            """
+        ),
+        f"public.{table}",
+        table,
+        before_year,
+    )
+    archived = []
+    await conn.execute(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}")
+    for row in partitions:
+        name = row["relname"]
+        async with conn.transaction():
+            await conn.execute(
+                f"ALTER TABLE public.{table} DETACH PARTITION public.{name}"
+            )
+            await conn.execute(f"ALTER TABLE public.{name} SET SCHEMA {ARCHIVE_SCHEMA}")
+        archived.append(f"{ARCHIVE_SCHEMA}.{name}")
+    return archived
+
+
+async def main(years_ahead: int, archive_before: Optional[int]) -> int:
+    """Creates upcoming partitions and optionally archives old audit ones."""
+    logging.basicConfig()
+    logging.getLogger().setLevel(logging.INFO)
+    conn = await make_conn(
+        PostgresConfig(
+            os.getenv("POSTGRES_HOST", "localhost"),
+            os.getenv("POSTGRES_USER", "postgres"),
+            os.getenv("POSTGRES_PASSWORD", "postgres"),
+            os.getenv("POSTGRES_DB", "tb-ops"),
+            int(os.getenv("POSTGRES_PORT", "5432")),
+        )
+    )
+    try:
+        created = await ensure_partitions(conn, years_ahead)
+        log.info("created partitions: %s", ", ".join(created) or "none")
+        if archive_before is not None:
+            archived = await archive_partitions(conn, archive_before)
+            log.info("archived partitions: %s", ", ".join(archived) or "none")
+    finally:
+        await conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years-ahead", type=int, default=YEARS_AHEAD)
+    parser.add_argument(
+        "--archive-audit-before",
+        type=int,
+        default=None,
+        help="archive audit_logs partitions for years before this one",
+    )
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.years_ahead, args.archive_audit_before)))
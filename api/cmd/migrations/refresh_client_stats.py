@@ -0,0 +1,32 @@
+# Copyright 2024 SH
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Rebuilds client_reservation_stats from the reservations table.
+
+The reservations repository keeps the stats current as it adds rows; run
+this after loading reservations any other way.
+"""
+import asyncio
+
+from api.services.reservations.service import ReservationService
+
+
+async def refresh_client_stats() -> None:
+    """Recomputes the stats row of every client with reservations."""
+    refreshed = await ReservationService().refresh_client_stats()
+    print(f"Refreshed reservation stats for {refreshed} client(s).")
+
+
+if __name__ == "__main__":
+    asyncio.run(refresh_client_stats())
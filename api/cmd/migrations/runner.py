@@ -12,29 +12,216 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Migration runner."""
+"""Migration runner.
+
+Applies the numbered files in ddl/ that are not yet recorded in the
+schema_migrations ledger, each inside its own transaction together with its
+ledger row. The ledger stores a checksum per file, and the runner refuses to
+continue if an applied file has since been edited.
+
+Files starting with a "-- migrate:no-transaction" line (after the license
+header) run statement by statement outside a transaction, which CREATE INDEX
+CONCURRENTLY requires. Their statements must be safe to rerun, since a failure
+part way leaves the earlier ones applied; invalid indexes left by a failed
+concurrent build are dropped before the retry.
+"""
 import asyncio
+import hashlib
 import logging
 import os
+import re
+import time
+from dataclasses import dataclass
+from textwrap import dedent
 
+import asyncpg
+
+from api.cmd.migrations.partitions import ensure_partitions
 from api.config.postgres import PostgresConfig, make_conn
 
+DDL_DIRECTORY = os.path.join(os.path.dirname(__file__), "ddl")
+NO_TRANSACTION = "-- migrate:no-transaction"
+# Arbitrary key so two deploys never migrate the same database at once
+MIGRATION_LOCK_ID = 7245019
+
+CREATE_LEDGER = dedent(
+    """
+    CREATE TABLE IF NOT EXISTS public.schema_migrations (
+        version INTEGER NOT NULL PRIMARY KEY,
+        filename VARCHAR(255) NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        duration_ms INTEGER NOT NULL,
+        applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    """
+)
+CONCURRENT_INDEX = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)",
+    re.IGNORECASE,
+)
+log = logging.getLogger(__name__)
+
+
+@dataclass(slots=True, frozen=True)
+class Migration:
+    """A numbered DDL file."""
+
+    version: int
+    filename: str
+    sql: str
+
+    @property
+    def checksum(self) -> str:
+        """SHA-256 of the file contents."""
+        return hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+
+    @property
+    def transactional(self) -> bool:
+        """Whether the file can run inside a transaction."""
+        return not any(line.strip() == NO_TRANSACTION for line in self.sql.splitlines())
+
+    def statements(self) -> list[str]:
+        """Splits the file on statement-ending semicolons."""
+        statements = []
+        for chunk in re.split(r";\s*$", self.sql, flags=re.MULTILINE):
+            lines = [
+                line
+                for line in chunk.splitlines()
+                if line.strip() and not line.strip().startswith("--")
+            ]
+            if lines:
+                statements.append("\n".join(lines))
+        return statements
+
 
 def extract_migration_number(filename: str) -> int:
     """
     Extracts the numerical prefix from a migration filename.
     For example, '10_create_table.sql' returns 10.
-    If no valid number is found, returns a high number to place it at the end.
     """
     number_part = filename.split("_")[0]
     return int(number_part)
 
 
+def load_migrations(ddl_directory: str = DDL_DIRECTORY) -> list[Migration]:
+    """Reads the migration files sorted by their numerical prefixes."""
+    migrations = []
+    for filename in os.listdir(ddl_directory):
+        if not filename.endswith(".sql"):
+            continue
+        with open(os.path.join(ddl_directory, filename), encoding="utf-8") as fd:
+            migrations.append(
+                Migration(extract_migration_number(filename), filename, fd.read())
+            )
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration numbers in {ddl_directory}")
+    return migrations
+
+
+async def drop_invalid_indexes(conn: asyncpg.Connection, migration: Migration) -> None:
+    """Drops indexes from this migration left invalid by a failed concurrent build."""
+    names = CONCURRENT_INDEX.findall(migration.sql)
+    if not names:
+        return
+    invalid = await conn.fetch(
+        dedent(
+            """
+            SELECT i.indexrelid::regclass::text AS name
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE NOT i.indisvalid AND c.relname = ANY($1::text[])
+            """
+        ),
+        names,
+    )
+    for row in invalid:
+        log.info("dropping invalid index %s from an earlier failed run", row["name"])
+        await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {row['name']}")
+
+
+async def apply_migration(conn: asyncpg.Connection, migration: Migration) -> float:
+    """Runs one migration and records it, returning its duration in seconds."""
+    record = dedent(
+        """
+        INSERT INTO public.schema_migrations (version, filename, checksum, duration_ms)
+        VALUES ($1, $2, $3, $4)
+        """
+    )
+    started = time.perf_counter()
+    if migration.transactional:
+        async with conn.transaction():
+            await conn.execute(migration.sql)
+            elapsed = time.perf_counter() - started
+            await conn.execute(
+                record,
+                migration.version,
+                migration.filename,
+                migration.checksum,
+                round(elapsed * 1000),
+            )
+        return elapsed
+
+    await drop_invalid_indexes(conn, migration)
+    for statement in migration.statements():
+        statement_started = time.perf_counter()
+        await conn.execute(statement)
+        log.info(
+            "  %s statement done in %.2fs",
+            migration.filename,
+            time.perf_counter() - statement_started,
+        )
+    elapsed = time.perf_counter() - started
+    await conn.execute(
+        record,
+        migration.version,
+        migration.filename,
+        migration.checksum,
+        round(elapsed * 1000),
+    )
+    return elapsed
+
+
+async def migrate(
+    conn: asyncpg.Connection, migrations: list[Migration]
+) -> list[Migration]:
+    """Applies the pending migrations in order and returns the ones applied."""
+    await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+    try:
+        await conn.execute(CREATE_LEDGER)
+        applied = {
+            row["version"]: row["checksum"]
+            for row in await conn.fetch(
+                "SELECT version, checksum FROM public.schema_migrations"
+            )
+        }
+        changed = [
+            migration.filename
+            for migration in migrations
+            if migration.version in applied
+            and applied[migration.version] != migration.checksum
+        ]
+        if changed:
+            raise RuntimeError(
+                "Applied migrations were edited, add a new migration instead: "
+                + ", ".join(changed)
+            )
+
+        pending = [m for m in migrations if m.version not in applied]
+        for migration in pending:
+            log.info("running migration: %s", migration.filename)
+            elapsed = await apply_migration(conn, migration)
+            log.info("applied %s in %.2fs", migration.filename, elapsed)
+        return pending
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
+
+
 async def main() -> int:
     """Entrypoint script for running migrations."""
-    log = logging.getLogger()
     logging.basicConfig()
-    log.setLevel(logging.INFO)
+    logging.getLogger().setLevel(logging.INFO)
     log.info(
         "Attempting connection to postgres: %s", os.getenv("POSTGRES_HOST", "localhost")
     )
@@ -49,20 +236,14 @@ async def main() -> int:
     )
     log.info(f"Running migrations on database {os.getenv('POSTGRES_DB', 'tb-ops')}")
     assert not conn.is_closed()
-    ddl_directory = os.path.join(os.path.dirname(__file__), "ddl")
-    migration_files = [f for f in os.listdir(ddl_directory) if f.endswith(".sql")]
-
-    # Sort the files based on their numerical prefixes
-    sorted_migrations = sorted(migration_files, key=extract_migration_number)
-    for f in sorted_migrations:
-        log.info("running migration: %s", f)
-        with open(
-            os.path.join(os.path.dirname(__file__), "ddl", f), encoding="utf-8"
-        ) as fd:
-            structure = fd.read()
-            await conn.execute(structure)
-            log.info("successfully executed %s\n\n", structure)
-    log.info("done migrations")
+    try:
+        applied = await migrate(conn, load_migrations())
+        # Every deploy keeps partitions a few years ahead of the data
+        created = await ensure_partitions(conn)
+        log.info("created partitions: %s", ", ".join(created) or "none")
+    finally:
+        await conn.close()
+    log.info("done migrations, %d applied", len(applied))
 
     return 0
 
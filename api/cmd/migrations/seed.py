@@ -13,11 +13,11 @@
 # limitations under the License.
 
 """Seeds database tables with historical data."""
-import csv
+import os
 import uuid
 from datetime import datetime
 import asyncio
-import asyncpg
+from typing import Sequence
 from api.services.travel.models import (
     CoreDestination,
     Country,
@@ -29,6 +29,10 @@ from api.services.travel.models import (
     Portfolio,
 )
 from api.services.travel.service import TravelService
+from api.cmd.migrations.seed_pipeline import SeedCheckpoint, stream_csv
+
+# Accommodation logs are COPYed into the database in batches of this size
+SEED_BATCH_SIZE = 5000
 
 
 class SourceTableBuilder:
@@ -37,21 +41,23 @@ class SourceTableBuilder:
     def __init__(self):
         """Initializes the source data to be seeded."""
         self._travel_service = TravelService()
-        self.raw_data = {
-            "core_destinations": self.read_csv("core_destinations"),
-            "countries": self.read_csv("countries"),
-            "agencies": self.read_csv("agencies"),
-            "booking_channels": self.read_csv("booking_channels"),
-            "consultants": self.read_csv("consultants"),
-            "properties": self.read_csv("properties"),
-            "accommodation_logs": self.read_csv("accommodation_logs"),
-            "portfolios": self.read_csv("portfolios"),
-        }
+        self.seed_dir = os.getenv("SEED_DIR", "/Users/sydney-horan/tb-ops/seed")
+        self.checkpoint = SeedCheckpoint(
+            os.path.join(self.seed_dir, ".seed_checkpoint.json")
+        )
+        self._seeded = {}
+
+    async def get_all(self, table: str) -> Sequence:
+        """Fetches a seeded table once and reuses it for every later lookup."""
+        if table not in self._seeded:
+            fetch = getattr(self._travel_service, f"get_all_{table}")
+            self._seeded[table] = await fetch()
+        return self._seeded[table]
 
     async def seed_core_destinations(self):
         """Seeds core destinations into the DB."""
         records_to_add = []
-        for row in self.raw_data["core_destinations"]:
+        for row in self.read_csv("core_destinations"):
             # Add UUID and timestamps
             row["id"] = uuid.uuid4()
             row["created_at"] = datetime.now()
@@ -68,7 +74,7 @@ class SourceTableBuilder:
     async def seed_agencies(self):
         """Seeds agencies into the DB."""
         records_to_add = []
-        for row in self.raw_data["agencies"]:
+        for row in self.read_csv("agencies"):
             # Add UUID and timestamps
             row["id"] = uuid.uuid4()
             row["created_at"] = datetime.now()
@@ -85,7 +91,7 @@ class SourceTableBuilder:
     async def seed_booking_channels(self):
         """Seeds booking channels into the DB."""
         records_to_add = []
-        for row in self.raw_data["booking_channels"]:
+        for row in self.read_csv("booking_channels"):
             # Add UUID and timestamps
             row["id"] = uuid.uuid4()
             row["created_at"] = datetime.now()
@@ -102,7 +108,7 @@ class SourceTableBuilder:
     async def seed_consultants(self):
         """Seeds consultants into the DB."""
         records_to_add = []
-        for row in self.raw_data["consultants"]:
+        for row in self.read_csv("consultants"):
             # Add UUID and timestamps
             row["id"] = uuid.uuid4()
             row["created_at"] = datetime.now()
@@ -144,7 +150,7 @@ class SourceTableBuilder:
         # await self._travel_service.add_portfolio(records_to_add)
         # print(f"Successfully seeded {len(records_to_add)} Portfolio records.")
         records_to_add = []
-        for row in self.raw_data["portfolios"]:
+        for row in self.read_csv("portfolios"):
             # Add UUID and timestamps
             row["id"] = uuid.uuid4()
             row["created_at"] = datetime.now()
@@ -161,9 +167,9 @@ class SourceTableBuilder:
     async def seed_countries(self):
         """Seeds countries into the DB with their appropriate core destination ID."""
         records_to_add = []
-        all_core_destinations = await self._travel_service.get_all_core_destinations()
+        all_core_destinations = await self.get_all("core_destinations")
         core_destination_map = {dest.name: dest.id for dest in all_core_destinations}
-        for row in self.raw_data["countries"]:
+        for row in self.read_csv("countries"):
             # Fetch the core_destination_id using the service layer
             core_destination_id = core_destination_map.get(row["core_destination"])
             if core_destination_id:
@@ -205,27 +211,30 @@ class SourceTableBuilder:
                 "country": "Tanzania",
             },
         ]
+        country_map = {
+            country.name: country for country in await self.get_all("countries")
+        }
+        core_destination_map = {
+            dest.name: dest for dest in await self.get_all("core_destinations")
+        }
+        portfolio_map = {
+            portfolio.name: portfolio for portfolio in await self.get_all("portfolios")
+        }
         for row in missing_properties:
-            country = await self._travel_service.get_country_by_name(row["country"])
+            country = country_map.get(row["country"])
             if country:
                 row["country_id"] = country.id
                 row["core_destination_id"] = country.core_destination_id
             else:
                 if row["core_destination"].strip().upper() == "SEA":
                     row["core_destination"] = "Asia"
-                core_destination = (
-                    await self._travel_service.get_core_destination_by_name(
-                        row["core_destination"]
-                    )
-                )
+                core_destination = core_destination_map.get(row["core_destination"])
                 if core_destination:
                     row["core_destination_id"] = core_destination.id
                 else:
                     print(f"Core destination {row['core_destination']} not found.")
 
-            portfolio = await self._travel_service.get_portfolio_by_name(
-                row["portfolio"]
-            )
+            portfolio = portfolio_map.get(row["portfolio"])
             if portfolio:
                 row["portfolio_id"] = portfolio.id
             else:
@@ -247,9 +256,9 @@ class SourceTableBuilder:
     async def seed_properties(self):
         """Seeds properties into the DB with their appropriate country ID."""
         records_to_add = []
-        all_countries = await self._travel_service.get_all_countries()
-        all_core_destinations = await self._travel_service.get_all_core_destinations()
-        all_portfolios = await self._travel_service.get_all_portfolios()
+        all_countries = await self.get_all("countries")
+        all_core_destinations = await self.get_all("core_destinations")
+        all_portfolios = await self.get_all("portfolios")
 
         # Create dictionaries for quick lookup
         country_map = {
@@ -260,7 +269,7 @@ class SourceTableBuilder:
         portfolio_map = {
             portfolio.name.strip(): portfolio for portfolio in all_portfolios
         }
-        for row in self.raw_data["properties"]:
+        for row in self.read_csv("properties"):
             # Initial core destination handling
             if row["core_destination"].strip().upper() == "SEA":
                 row["core_destination"] = "Asia"
@@ -319,14 +328,15 @@ class SourceTableBuilder:
     async def seed_accommodation_logs(self):
         """Seeds accommodation logs into the DB with their appropriate foreign keys."""
         records_to_add = []
+        inserted = 0
         # Pre-fetch all necessary data
-        all_countries = await self._travel_service.get_all_countries()
-        all_core_destinations = await self._travel_service.get_all_core_destinations()
-        all_portfolios = await self._travel_service.get_all_portfolios()
-        all_properties = await self._travel_service.get_all_properties()
-        all_consultants = await self._travel_service.get_all_consultants()
-        all_agencies = await self._travel_service.get_all_agencies()
-        all_booking_channels = await self._travel_service.get_all_booking_channels()
+        all_countries = await self.get_all("countries")
+        all_core_destinations = await self.get_all("core_destinations")
+        all_portfolios = await self.get_all("portfolios")
+        all_properties = await self.get_all("properties")
+        all_consultants = await self.get_all("consultants")
+        all_agencies = await self.get_all("agencies")
+        all_booking_channels = await self.get_all("booking_channels")
 
         # Create lookup maps
         country_map = {country.name: country for country in all_countries}
@@ -347,7 +357,7 @@ class SourceTableBuilder:
         agency_map = {agency.name: agency for agency in all_agencies}
         booking_channel_map = {bc.name: bc for bc in all_booking_channels}
 
-        for row in self.raw_data["accommodation_logs"]:
+        for row in self.read_csv("accommodation_logs"):
             # Clean up invalid records
             row["property_name"] = row["property_name"].strip()
             row["tb_consultant"] = row["tb_consultant"].strip()
@@ -545,17 +555,20 @@ class SourceTableBuilder:
             # Convert row dict to model instance
             record = AccommodationLog(**row)
             records_to_add.append(record)
+            if len(records_to_add) >= SEED_BATCH_SIZE:
+                inserted += await self.copy_accommodation_logs(records_to_add)
+                records_to_add = []
 
-        # Clean list to remove known duplicates
-        records_to_add = self.cleanup_rows(records_to_add)
+        inserted += await self.copy_accommodation_logs(records_to_add)
+        print(f"Successfully seeded {inserted} new AccommodationLog records.")
 
-        try:
-            await self._travel_service.add_accommodation_log(records_to_add)
-            print(
-                f"Successfully seeded {len(records_to_add)} new AccommodationLog records."
-            )
-        except asyncpg.exceptions.UniqueViolationError as e:
-            print(e)
+    async def copy_accommodation_logs(self, records: list[AccommodationLog]) -> int:
+        """Removes known duplicates and bulk loads a batch of logs."""
+        # Clean list to remove known duplicates
+        records = self.cleanup_rows(records)
+        if not records:
+            return 0
+        return await self._travel_service.bulk_add_accommodation_logs(records)
 
     def cleanup_rows(self, orig_rows: list[AccommodationLog]) -> list[AccommodationLog]:
         """Cleans up AccommodationLog rows to remove known duplicates."""
@@ -580,35 +593,32 @@ class SourceTableBuilder:
         return ret_rows
 
     async def seed_db(self):
-        """Seeds the database table given a source name."""
+        """Seeds the database table given a source name.
+
+        Each stage is checkpointed, so rerunning after a failure resumes with
+        the first stage that did not finish.
+        """
         # step 1 seed the source tables that do not reference other tables
-        await self.seed_core_destinations()
-        await self.seed_agencies()
-        await self.seed_booking_channels()
-        await self.seed_consultants()
-        await self.seed_portfolios()
-        # # # step 2 seed countries table that reference a core destination ID using lookup
-        await self.seed_countries()
-        # # step 3 seed properties that reference a country ID using lookup
-        await self.seed_properties()
+        await asyncio.gather(
+            self.checkpoint.run("core_destinations", self.seed_core_destinations),
+            self.checkpoint.run("agencies", self.seed_agencies),
+            self.checkpoint.run("booking_channels", self.seed_booking_channels),
+            self.checkpoint.run("consultants", self.seed_consultants),
+            self.checkpoint.run("portfolios", self.seed_portfolios),
+        )
+        # step 2 seed countries table that reference a core destination ID using lookup
+        await self.checkpoint.run("countries", self.seed_countries)
+        # step 3 seed properties that reference a country ID using lookup
+        await self.checkpoint.run("properties", self.seed_properties)
         # step 4 seed properties found during seed process that did not exist
-        await self.seed_override_properties()
-        # step 4 seed accommodation_logs that reference all of the above
-        await self.seed_accommodation_logs()
-
-    def read_csv(self, file_name) -> list[dict]:
-        """Parses a CSV given a file name."""
-        data = []
-        with open(
-            f"/Users/sydney-horan/tb-ops/seed/{file_name}.csv",
-            encoding="utf-8-sig",
-        ) as csv_file:
-            reader = csv.DictReader(csv_file)
-            for row in reader:
-                if None in row.keys():
-                    row.pop(None, None)
-                data.append(row)
-        return data
+        await self.checkpoint.run("override_properties", self.seed_override_properties)
+        # step 5 seed accommodation_logs that reference all of the above
+        await self.checkpoint.run("accommodation_logs", self.seed_accommodation_logs)
+        self.checkpoint.reset()
+
+    def read_csv(self, file_name):
+        """Streams the rows of a seed CSV given a file name."""
+        return stream_csv(os.path.join(self.seed_dir, f"{file_name}.csv"))
 
 
 if __name__ == "__main__":
@@ -12,120 +12,136 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Migration runner."""
+"""Syncs tables from a source database into a target with streamed COPY.
+
+The source is read from the POSTGRES_*_SOURCE env vars and the target, which
+is written to, from POSTGRES_*_TARGET, e.g. prod and UAT respectively.
+"""
+import argparse
 import asyncio
 import logging
 import os
+from typing import Optional
+
+from api.config.postgres import PostgresConfig, make_pool
+from api.cmd.migrations.table_sync import SyncTable, sync_tables
+
+# Ingest from the following tables in the source into corresponding in the
+# target. Order does not matter; tables are synced in foreign key order.
+TABLES = [
+    SyncTable("public.core_destinations"),
+    SyncTable("public.countries"),
+    SyncTable("public.agencies"),
+    SyncTable("public.booking_channels"),
+    SyncTable("public.portfolios"),
+    SyncTable("public.consultants"),
+    SyncTable("public.properties"),
+    SyncTable("public.trips"),
+    SyncTable("public.accommodation_logs", "date_in > '2022-07-01'"),
+    SyncTable("public.property_details"),
+    SyncTable("public.daily_rates"),
+]
+# Holds password hashes, so it is only synced when asked for explicitly
+USERS = SyncTable("public.users")
+CONNECTION_VARS = ("HOST", "USER", "PASSWORD", "DB", "PORT")
+# Earlier versions of this script read from UAT and wrote to PROD
+LEGACY_SUFFIXES = ("UAT", "PROD")
+
+
+def env_config(suffix: str, parallelism: int) -> PostgresConfig:
+    """Reads a connection config from the POSTGRES_*_<suffix> env vars."""
+    return PostgresConfig(
+        os.getenv(f"POSTGRES_HOST_{suffix}", "localhost"),
+        os.getenv(f"POSTGRES_USER_{suffix}", "postgres"),
+        os.getenv(f"POSTGRES_PASSWORD_{suffix}", "postgres"),
+        os.getenv(f"POSTGRES_DB_{suffix}", "postgres"),
+        int(os.getenv(f"POSTGRES_PORT_{suffix}", os.getenv("POSTGRES_PORT", "5432"))),
+        min_pool_size=1,
+        max_pool_size=parallelism + 1,
+    )
 
-from api.config.postgres import PostgresConfig, make_conn
-
-
-async def count_rows(conn, table, condition=None):
-    condition = f" WHERE {condition}" if condition else ""
-    copy_sql = f"SELECT COUNT(*) FROM {table}{condition};"
-    async with conn.transaction():
-        result = await conn.fetchval(copy_sql)
-        return result
-
-
-async def fetch_data(prod_conn, table, condition=None):
-    query = f"SELECT * FROM {table}"
-    if condition:
-        query += f" WHERE {condition}"
-    async with prod_conn.transaction():
-        return await prod_conn.fetch(query)
 
+def env_error() -> Optional[str]:
+    """Returns why the env vars cannot be trusted to name source and target."""
 
-async def insert_data(uat_conn, table, data):
-    if not data:
-        return
-    # Assuming all rows have the same columns, get columns from the first row
-    columns = list(data[0].keys())
-    values_placeholder = ", ".join([f"${i+1}" for i in range(len(columns))])
+    def is_set(suffix: str) -> bool:
+        return any(os.getenv(f"POSTGRES_{var}_{suffix}") for var in CONNECTION_VARS)
 
-    # Construct the INSERT INTO statement
-    columns_placeholder = ", ".join(columns)
-    insert_query = f"""
-      INSERT INTO {table} ({columns_placeholder})
-      VALUES ({values_placeholder})
-      ON CONFLICT DO NOTHING;
-    """
+    if not (is_set("SOURCE") or is_set("TARGET")):
+        if any(is_set(suffix) for suffix in LEGACY_SUFFIXES):
+            return (
+                "POSTGRES_*_UAT and POSTGRES_*_PROD are no longer read. Set "
+                "POSTGRES_*_SOURCE to the database to copy from and "
+                "POSTGRES_*_TARGET to the database to write to."
+            )
+    if env_config("SOURCE", 0) == env_config("TARGET", 0):
+        return "POSTGRES_*_SOURCE and POSTGRES_*_TARGET name the same database."
+    return None
 
-    # Prepare the values to be inserted
-    # Convert each row's values to a list
-    values_to_insert = [list(row.values()) for row in data]
 
-    async with uat_conn.transaction():
-        await uat_conn.executemany(insert_query, values_to_insert)
+def select_tables(tables: list[str], include_users: bool) -> list[SyncTable]:
+    """Returns the tables named, or all but users unless include_users is set."""
+    available = TABLES + [USERS]
+    if tables:
+        unknown = set(tables) - {t.name for t in available}
+        if unknown:
+            raise ValueError(f"Unknown tables: {', '.join(sorted(unknown))}")
+        return [t for t in available if t.name in tables]
+    return TABLES + [USERS] if include_users else list(TABLES)
 
 
-async def main() -> None:
-    """Entrypoint script for running migrations."""
+async def main(
+    tables: list[str], full: bool, parallelism: int, include_users: bool
+) -> int:
+    """Entrypoint script for syncing the source into the target."""
     log = logging.getLogger()
     logging.basicConfig()
     log.setLevel(logging.INFO)
-    log.info("Attempting connection to postgres prod")
-    conn = await make_conn(
-        PostgresConfig(
-            os.getenv("POSTGRES_HOST_UAT", "localhost"),
-            os.getenv("POSTGRES_USER_UAT", "postgres"),
-            os.getenv("POSTGRES_PASSWORD_UAT", "postgres"),
-            os.getenv("POSTGRES_DB_UAT", "postgres"),
-            int(os.getenv("POSTGRES_PORT", "5432")),
-        )
-    )
-    log.info("Attempting connection to postgres local")
-    uat_conn = await make_conn(
-        PostgresConfig(
-            os.getenv("POSTGRES_HOST_PROD", "localhost"),
-            os.getenv("POSTGRES_USER_PROD", "postgres"),
-            os.getenv("POSTGRES_PASSWORD_PROD", "postgres"),
-            os.getenv("POSTGRES_DB_PROD", "postgres"),
-            int(os.getenv("POSTGRES_PORT", "5432")),
+    error = env_error()
+    if error:
+        log.error(error)
+        return 2
+    selected = select_tables(tables, include_users)
+    log.info("Attempting connection to postgres source")
+    source_pool = await make_pool(env_config("SOURCE", parallelism))
+    log.info("Attempting connection to postgres target")
+    target_pool = await make_pool(env_config("TARGET", parallelism))
+
+    try:
+        results = await sync_tables(
+            source_pool,
+            target_pool,
+            selected,
+            incremental=not full,
+            parallelism=parallelism,
         )
-    )
-    assert not conn.is_closed()
-    assert not uat_conn.is_closed()
-
-    # Ingest from the following tables in prod into corresponding in UAT
-    tables = [
-        # "public.core_destinations",
-        # "public.countries",
-        # "public.agencies",
-        # "public.booking_channels",
-        # "public.portfolios",
-        # "public.consultants",
-        # "public.properties",
-        # "public.accommodation_logs",
-        # "public.property_details",
-        # "public.users",
-        # "public.trips",
-        "public.daily_rates",
-    ]
-
-    for table in tables:
-        if table == "public.accommodation_logs":
-            prod_count = await count_rows(conn, table, "date_in > '2022-07-01'")
-            uat_count = await count_rows(uat_conn, table, "date_in > '2022-07-01'")
-        else:
-            prod_count = await count_rows(conn, table)
-            uat_count = await count_rows(uat_conn, table)
-        print(f"Table {table} - Prod Count: {prod_count}, UAT Count: {uat_count}")
-
-    for table in tables:
-        condition = (
-            "date_in > '2022-07-01'" if table == "public.accommodation_logs" else None
-        )
-        data = await fetch_data(conn, table, condition)
-        await insert_data(uat_conn, table, data)
-        print(f"Data copied for table: {table}")
-
-    # first print out a select count(*) from each in Prod and UAT to show me they're being accessed correctly
-    # implement insert select * to insert into UAT
-    # For accommodation_logs, only use date_in > 2024-01-01
+    finally:
+        await source_pool.close()
+        await target_pool.close()
+    mismatched = [result.table for result in results if not result.verified]
+    if mismatched:
+        print(f"Row counts or checksums differ for: {', '.join(mismatched)}")
+        return 1
+    return 0
 
 
 if __name__ == "__main__":
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    raise SystemExit(loop.run_until_complete(main()))
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "tables",
+        nargs="*",
+        help="tables to sync, e.g. public.daily_rates (default all but users)",
+    )
+    parser.add_argument(
+        "--full", action="store_true", help="ignore the updated_at watermark"
+    )
+    parser.add_argument(
+        "--include-users",
+        action="store_true",
+        help="also sync public.users, including password hashes",
+    )
+    parser.add_argument("--parallelism", type=int, default=4)
+    args = parser.parse_args()
+    raise SystemExit(
+        asyncio.run(main(args.tables, args.full, args.parallelism, args.include_users))
+    )
@@ -0,0 +1,63 @@
+# Copyright 2024 SH
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Building blocks for streaming, resumable seed runs."""
+import csv
+import json
+import os
+import time
+from typing import Awaitable, Callable, Iterator
+
+
+def stream_csv(path: str) -> Iterator[dict]:
+    """Yields the rows of a CSV one at a time."""
+    with open(path, encoding="utf-8-sig", newline="") as csv_file:
+        for row in csv.DictReader(csv_file):
+            row.pop(None, None)
+            yield row
+
+
+class SeedCheckpoint:
+    """Records finished seed stages in a JSON file so a failed run can resume."""
+
+    def __init__(self, path: str):
+        """Loads the stages finished by earlier runs."""
+        self._path = path
+        self._done: set = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as fd:
+                self._done = set(json.load(fd))
+
+    def _save(self) -> None:
+        temp_path = f"{self._path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as fd:
+            json.dump(sorted(self._done), fd)
+        os.replace(temp_path, self._path)
+
+    def reset(self) -> None:
+        """Forgets every finished stage so the next run starts over."""
+        self._done.clear()
+        if os.path.exists(self._path):
+            os.remove(self._path)
+
+    async def run(self, stage: str, step: Callable[[], Awaitable]) -> None:
+        """Runs a stage unless an earlier run already finished it."""
+        if stage in self._done:
+            print(f"Skipping {stage}, already seeded.")
+            return
+        started = time.perf_counter()
+        await step()
+        self._done.add(stage)
+        self._save()
+        print(f"Finished {stage} in {time.perf_counter() - started:.1f}s.")
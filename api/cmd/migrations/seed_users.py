@@ -36,7 +36,7 @@ class UserBuilder:
         for user in users:
             print(f"Adding user {user['email']}")
             # hash password
-            hashed_password = self._auth_service.hash_password(user["password"])
+            hashed_password = await self._auth_service.hash_password(user["password"])
             auth_user = User(
                 email=user["email"], hashed_password=hashed_password, role=user["role"]
             )
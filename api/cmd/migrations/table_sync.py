@@ -0,0 +1,333 @@
+# Copyright 2024 SH
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Streams tables between two databases with COPY and verifies the result."""
+import asyncio
+import contextlib
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from textwrap import dedent
+from typing import Optional, Sequence
+
+import asyncpg
+
+# Each chunk is one COPY data message, so the pipe holds at most a few MB
+PIPE_CHUNKS = 64
+
+
+@dataclass(slots=True, frozen=True)
+class SyncTable:
+    """A table to sync, optionally limited to rows matching a SQL condition."""
+
+    name: str
+    condition: Optional[str] = None
+
+
+@dataclass(slots=True)
+class TableSyncResult:
+    """Outcome of syncing one table."""
+
+    table: str
+    copied: int
+    watermark: Optional[object]
+    source_rows: int
+    target_rows: int
+    source_checksum: Decimal
+    target_checksum: Decimal
+    seconds: float
+
+    @property
+    def verified(self) -> bool:
+        """Whether both sides hold the same rows within the synced scope."""
+        return (self.source_rows, self.source_checksum) == (
+            self.target_rows,
+            self.target_checksum,
+        )
+
+
+async def table_columns(conn: asyncpg.Connection, table: str) -> list[str]:
+    """Returns the column names of a table in ordinal order."""
+    rows = await conn.fetch(
+        dedent(
+            """
+            SELECT attname
+            FROM pg_attribute
+            WHERE attrelid = $1::regclass AND attnum > 0 AND NOT attisdropped
+            ORDER BY attnum
+            """
+        ),
+        table,
+    )
+    return [row["attname"] for row in rows]
+
+
+async def primary_key(conn: asyncpg.Connection, table: str) -> list[str]:
+    """Returns the primary key columns of a table."""
+    rows = await conn.fetch(
+        dedent(
+            """
+            SELECT a.attname
+            FROM pg_index i
+            JOIN pg_attribute a
+                ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+            WHERE i.indrelid = $1::regclass AND i.indisprimary
+            """
+        ),
+        table,
+    )
+    return [row["attname"] for row in rows]
+
+
+async def partition_key(conn: asyncpg.Connection, table: str) -> list[str]:
+    """Returns the partition key columns of a table, empty if not partitioned."""
+    rows = await conn.fetch(
+        dedent(
+            """
+            SELECT a.attname
+            FROM pg_partitioned_table p
+            JOIN pg_attribute a
+                ON a.attrelid = p.partrelid AND a.attnum = ANY(p.partattrs)
+            WHERE p.partrelid = $1::regclass
+            """
+        ),
+        table,
+    )
+    return [row["attname"] for row in rows]
+
+
+async def fk_levels(
+    conn: asyncpg.Connection, tables: Sequence[SyncTable]
+) -> list[list[SyncTable]]:
+    """Groups tables into levels where each level only references earlier ones.
+
+    Self references are ignored, since one INSERT ... SELECT checks them at
+    the end of the statement.
+    """
+    rows = await conn.fetch(
+        dedent(
+            """
+            SELECT conrelid::regclass::text AS child, confrelid::regclass::text AS parent
+            FROM pg_constraint
+            WHERE contype = 'f'
+                AND conrelid = ANY($1::regclass[])
+                AND confrelid = ANY($1::regclass[])
+                AND conrelid <> confrelid
+            """
+        ),
+        [table.name for table in tables],
+    )
+    # regclass::text drops the public. prefix, so key tables the same way
+    keys = {
+        table.name: await conn.fetchval("SELECT $1::regclass::text", table.name)
+        for table in tables
+    }
+    parents: dict[str, set] = {keys[table.name]: set() for table in tables}
+    for row in rows:
+        parents[row["child"]].add(row["parent"])
+
+    levels, placed, remaining = [], set(), list(tables)
+    while remaining:
+        level = [t for t in remaining if parents[keys[t.name]] <= placed]
+        if not level:
+            names = ", ".join(t.name for t in remaining)
+            raise ValueError(f"Foreign keys form a cycle between: {names}")
+        levels.append(level)
+        placed.update(keys[t.name] for t in level)
+        remaining = [t for t in remaining if t not in level]
+    return levels
+
+
+async def pipe_copy(
+    source: asyncpg.Connection,
+    target: asyncpg.Connection,
+    query: str,
+    args: Sequence,
+    target_table: str,
+    columns: Sequence[str],
+) -> None:
+    """Streams a COPY out of the source into a COPY on the target.
+
+    The two sides are joined by a bounded queue, so a slow target applies
+    backpressure to the source instead of buffering the table in memory.
+    """
+    pipe: asyncio.Queue = asyncio.Queue(maxsize=PIPE_CHUNKS)
+
+    async def produce() -> None:
+        try:
+            await source.copy_from_query(query, *args, output=pipe.put, format="binary")
+        finally:
+            await pipe.put(None)
+
+    async def chunks():
+        while (chunk := await pipe.get()) is not None:
+            yield chunk
+
+    producer = asyncio.create_task(produce())
+    try:
+        await target.copy_to_table(
+            target_table, source=chunks(), columns=list(columns), format="binary"
+        )
+    except Exception:
+        producer.cancel()
+        # Surface the source's error if it is what broke the stream
+        with contextlib.suppress(asyncio.CancelledError):
+            await producer
+        raise
+    await producer
+
+
+def _scope(condition: Optional[str], *extra: str) -> str:
+    clauses = [c for c in (condition, *extra) if c]
+    return f" WHERE {' AND '.join(f'({c})' for c in clauses)}" if clauses else ""
+
+
+async def table_checksum(
+    conn: asyncpg.Connection,
+    table: str,
+    columns: Sequence[str],
+    condition: Optional[str] = None,
+) -> tuple[int, Decimal]:
+    """Returns the row count and an order-independent checksum of a table."""
+    # Timestamps render in the session time zone, so pin it on both sides
+    await conn.execute("SET TIME ZONE 'UTC'")
+    row_text = f"ROW({', '.join(columns)})::text"
+    row = await conn.fetchrow(
+        f"SELECT COUNT(*) AS row_count, "
+        f"COALESCE(SUM(('x' || LEFT(md5({row_text}), 16))::bit(64)::bigint), 0) "
+        f"AS checksum FROM {table}{_scope(condition)}"
+    )
+    return row["row_count"], row["checksum"]
+
+
+async def sync_table(
+    source_pool: asyncpg.Pool,
+    target_pool: asyncpg.Pool,
+    table: SyncTable,
+    incremental: bool = True,
+) -> TableSyncResult:
+    """Copies a table's rows from source to target and verifies them.
+
+    Rows are staged on the target and merged: rows with a newer updated_at
+    replace the target's copy and new rows are inserted. With incremental
+    set, only source rows updated after the target's latest updated_at are
+    read.
+
+    A partitioned table's primary key includes its partition key, so a row
+    whose partition key changed would not match its old copy by primary
+    key. Such tables match rows on the rest of the key instead, and replace
+    changed rows by deleting them before the insert.
+    """
+    started = time.perf_counter()
+    async with source_pool.acquire() as source, target_pool.acquire() as target:
+        source_columns = set(await table_columns(source, table.name))
+        columns = [
+            c for c in await table_columns(target, table.name) if c in source_columns
+        ]
+        partition_columns = await partition_key(target, table.name)
+        keys = [
+            k
+            for k in await primary_key(target, table.name)
+            if k not in partition_columns
+        ]
+        tracks_updates = "updated_at" in columns
+
+        watermark = None
+        if incremental and tracks_updates:
+            watermark = await target.fetchval(
+                f"SELECT MAX(updated_at) FROM {table.name}{_scope(table.condition)}"
+            )
+        query = f"SELECT {', '.join(columns)} FROM {table.name}" + _scope(
+            table.condition, "updated_at > $1" if watermark is not None else ""
+        )
+        args = [watermark] if watermark is not None else []
+
+        column_list = ", ".join(columns)
+        async with target.transaction():
+            await target.execute(
+                f"CREATE TEMP TABLE sync_staging (LIKE {table.name}) ON COMMIT DROP"
+            )
+            await pipe_copy(source, target, query, args, "sync_staging", columns)
+            copied = await target.fetchval("SELECT COUNT(*) FROM sync_staging")
+            matches = " AND ".join(f"t.{k} = s.{k}" for k in keys)
+            if keys and partition_columns:
+                # Without updated_at, only rows that moved partition are stale
+                changed = (
+                    ["updated_at"]
+                    if tracks_updates
+                    else [c for c in partition_columns if c in columns]
+                )
+                differs = " OR ".join(f"s.{c} IS DISTINCT FROM t.{c}" for c in changed)
+                await target.execute(
+                    f"DELETE FROM {table.name} t USING sync_staging s "
+                    f"WHERE {matches} AND ({differs})"
+                )
+            elif keys and tracks_updates:
+                assignments = ", ".join(
+                    f"{c} = s.{c}" for c in columns if c not in keys
+                )
+                await target.execute(
+                    f"UPDATE {table.name} t SET {assignments} FROM sync_staging s "
+                    f"WHERE {matches} AND s.updated_at IS DISTINCT FROM t.updated_at"
+                )
+            await target.execute(
+                f"INSERT INTO {table.name} ({column_list}) "
+                f"SELECT {column_list} FROM sync_staging ON CONFLICT DO NOTHING"
+            )
+
+        (source_rows, source_checksum), (target_rows, target_checksum) = (
+            await asyncio.gather(
+                table_checksum(source, table.name, columns, table.condition),
+                table_checksum(target, table.name, columns, table.condition),
+            )
+        )
+    return TableSyncResult(
+        table=table.name,
+        copied=copied,
+        watermark=watermark,
+        source_rows=source_rows,
+        target_rows=target_rows,
+        source_checksum=source_checksum,
+        target_checksum=target_checksum,
+        seconds=time.perf_counter() - started,
+    )
+
+
+async def sync_tables(
+    source_pool: asyncpg.Pool,
+    target_pool: asyncpg.Pool,
+    tables: Sequence[SyncTable],
+    incremental: bool = True,
+    parallelism: int = 4,
+) -> list[TableSyncResult]:
+    """Syncs tables level by level in foreign key order, in parallel within a level."""
+    async with target_pool.acquire() as conn:
+        levels = await fk_levels(conn, tables)
+    limit = asyncio.Semaphore(parallelism)
+
+    async def sync_one(table: SyncTable) -> TableSyncResult:
+        async with limit:
+            result = await sync_table(source_pool, target_pool, table, incremental)
+        status = "verified" if result.verified else "MISMATCH"
+        print(
+            f"Table {result.table}: copied {result.copied} rows in "
+            f"{result.seconds:.1f}s - source {result.source_rows}, "
+            f"target {result.target_rows} rows, {status}"
+        )
+        return result
+
+    results = []
+    for level in levels:
+        results.extend(await asyncio.gather(*(sync_one(table) for table in level)))
+    return results
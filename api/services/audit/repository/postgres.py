@@ -46,35 +46,35 @@ class PostgresAuditRepository(PostgresMixin, AuditRepository):
                 after_value,
                 action,
                 action_timestamp
-            ) VALUES (
-                $1, $2, $3, $4, $5, $6, $7, NOW()::TIMESTAMP WITHOUT TIME ZONE
-            )
-            ON CONFLICT (id) 
+            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+            -- A log submitted twice keeps its id and timestamp, so the primary
+            -- key, which includes the partition key, still skips it
+            ON CONFLICT (id, action_timestamp)
             DO NOTHING;
         """
         )
+        args = []
+        for audit_log_json in audit_logs:
+            # Assuming audit_log_json is a JSON string representation of your AuditLog
+            audit_log = json.loads(audit_log_json)
+            args.append(
+                (
+                    audit_log["id"],
+                    audit_log["table_name"],
+                    audit_log["record_id"],
+                    audit_log["user_name"],
+                    # Ensure these are JSON-formatted strings
+                    json.dumps(audit_log["before_value"]),
+                    json.dumps(audit_log["after_value"]),
+                    audit_log["action"],
+                    # Naive timestamps are this process's local time
+                    datetime.fromisoformat(audit_log["action_timestamp"]).astimezone(),
+                )
+            )
         async with pool.acquire() as con:
             async with con.transaction():
-                for audit_log_json in audit_logs:
-                    # Assuming audit_log_json is a JSON string representation of your AuditLog
-                    audit_log = json.loads(
-                        audit_log_json
-                    )  # This converts it back to a dict for access
-                    await con.execute(
-                        query,
-                        audit_log["id"],
-                        audit_log["table_name"],
-                        audit_log["record_id"],
-                        audit_log["user_name"],
-                        json.dumps(
-                            audit_log["before_value"]
-                        ),  # Ensure this is a JSON-formatted string
-                        json.dumps(
-                            audit_log["after_value"]
-                        ),  # Ensure this is a JSON-formatted string
-                        audit_log["action"],
-                    )
-        print(f"Inserted {len(audit_logs)} audit logs into the repository.")
+                await con.executemany(query, args)
+        print(f"Inserted {len(args)} audit logs into the repository.")
 
     async def get(
         self,
@@ -90,7 +90,6 @@ class PostgresAuditRepository(PostgresMixin, AuditRepository):
         Returns:
             List[AuditLog]
         """
-        pool = await self._get_pool()
         base_query = """
         SELECT *
         FROM public.audit_logs
@@ -117,9 +116,7 @@ class PostgresAuditRepository(PostgresMixin, AuditRepository):
         print("Audit logs query:")
         print(values)
 
-        async with pool.acquire() as con:
-            async with con.transaction():
-                rows = await con.fetch(base_query, *values)
+        rows = await self._fetch(base_query, *values)
 
         # Process each record to handle JSON fields correctly
         audit_logs = []
@@ -26,21 +26,15 @@ class PostgresAuthRepository(PostgresMixin, AuthRepository):
 
     async def get_user(self, email: str):
         """Gets a user from the repository by email."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.users
             WHERE UPPER(email) = $1
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                res = await con.fetchrow(query, email.strip().upper())
-                if res:
-                    return User(**res)
+        res = await self._fetchrow(query, email.strip().upper())
+        if res:
+            return User(**res)
 
     async def add_user(self, users: Sequence[User]) -> None:
         """Adds a sequence of User models to the repository."""
@@ -78,7 +72,6 @@ class PostgresAuthRepository(PostgresMixin, AuthRepository):
     async def get_all_users(self) -> Sequence[UserSummary]:
         """Gets all users as UserSummary models from the repository."""
         """Gets a user from the repository by email."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT
@@ -89,13 +82,6 @@ class PostgresAuthRepository(PostgresMixin, AuthRepository):
             ORDER BY email
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(
-                    query
-                )  # Use fetch to retrieve all matching rows
-                user_summaries = [UserSummary(**record) for record in records]
-                return user_summaries
+        records = await self._fetch(query)  # Use fetch to retrieve all matching rows
+        user_summaries = [UserSummary(**record) for record in records]
+        return user_summaries
@@ -13,38 +13,68 @@
 # limitations under the License.
 
 """Services for authenticating within the app."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, time
 import os
-from typing import Sequence
+from typing import Optional, Sequence
 
 from passlib.context import CryptContext
 from jose import jwt
 
+from api.adapters.cache import TTLCache
 from api.services.auth.repository.postgres import PostgresAuthRepository
 from api.services.auth.models import User, UserSummary
 
 
+class LoginThrottledError(Exception):
+    """Raised when an account already has too many logins in flight."""
+
+
 class AuthService:
     """Service for interfacing with the auth repository."""
 
     SECRET_KEY = os.environ["SECRET_KEY"]
     ALGORITHM = os.environ["ALGORITHM"]
     # ACCESS_TOKEN_EXPIRE_MINUTES = 10080
+    # bcrypt takes ~100ms of CPU, so it runs on a small shared pool of threads
+    # instead of the event loop
+    HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+    LOGINS_PER_ACCOUNT = int(os.getenv("LOGIN_CONCURRENCY_PER_ACCOUNT", "2"))
+    # Every authenticated request looks up its user, so keep recent ones briefly
+    USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+    USER_CACHE_SIZE = 1024
+
+    _hash_executor: Optional[ThreadPoolExecutor] = None
 
     def __init__(self):
         """Initializes with a configured repository."""
         self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
         self._repo = PostgresAuthRepository()
-
-    def hash_password(self, password: str) -> str:
-        """Hashes a password string."""
-        ret = self.pwd_context.hash(password)
-        return ret
-
-    def verify_password(self, plain_password, hashed_password) -> bool:
-        """Validates a password string based on its hash."""
-        ret = self.pwd_context.verify(plain_password, hashed_password)
-        return ret
+        self._logins_in_flight: dict[str, int] = {}
+        self._user_cache = TTLCache(self.USER_CACHE_SIZE, self.USER_CACHE_TTL)
+
+    @classmethod
+    def _executor(cls) -> ThreadPoolExecutor:
+        if cls._hash_executor is None:
+            cls._hash_executor = ThreadPoolExecutor(
+                max_workers=cls.HASH_WORKERS, thread_name_prefix="password-hash"
+            )
+        return cls._hash_executor
+
+    async def hash_password(self, password: str) -> str:
+        """Hashes a password string on the password hashing threads."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor(), self.pwd_context.hash, password
+        )
+
+    async def verify_password(self, plain_password, hashed_password) -> bool:
+        """Validates a password string based on its hash on the hashing threads."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor(), self.pwd_context.verify, plain_password, hashed_password
+        )
 
     def create_access_token(self, data: dict, expires_delta: timedelta = None) -> str:
         """Creates access token."""
@@ -65,23 +95,47 @@ class AuthService:
         return encoded_jwt
 
     async def authenticate_user(self, email: str, password: str):
-        """Validates a user's password hash."""
-        user = await self._repo.get_user(email)
-        if user and self.verify_password(password, user.hashed_password):
-            return user
-        return None
+        """Validates a user's password hash.
+
+        Raises LoginThrottledError instead of queueing when the account already
+        has LOGINS_PER_ACCOUNT attempts being verified, so a burst against one
+        account cannot fill the hashing pool.
+        """
+        account = email.strip().lower()
+        if self._logins_in_flight.get(account, 0) >= self.LOGINS_PER_ACCOUNT:
+            raise LoginThrottledError(f"Too many concurrent logins for {email}")
+        self._logins_in_flight[account] = self._logins_in_flight.get(account, 0) + 1
+        try:
+            user = await self._repo.get_user(email)
+            if user and await self.verify_password(password, user.hashed_password):
+                return user
+            return None
+        finally:
+            self._logins_in_flight[account] -= 1
+            if not self._logins_in_flight[account]:
+                del self._logins_in_flight[account]
 
     async def get_user(self, email: str):
-        """Gets a user by email."""
-        user = await self._repo.get_user(email)
+        """Gets a user by email, from the user cache when recently read."""
+        user = self._user_cache.get(email)
+        if user is None:
+            user = await self._repo.get_user(email)
+            if user is not None:
+                self._user_cache.set(email, user)
         return user
 
+    def invalidate_user(self, email: str) -> None:
+        """Drops a cached user, e.g. after its role changes."""
+        self._user_cache.pop(email)
+
     async def add_user(self, users: Sequence[User]):
         """Adds a user model to the repository."""
         to_be_added = [
             user for user in users if not await self._repo.get_user(user.email)
         ]
         await self._repo.add_user(to_be_added)
+        for user in users:
+            self.invalidate_user(user.email)
 
     async def get_all_users(self) -> Sequence[UserSummary]:
         """Adds a user model to the repository."""
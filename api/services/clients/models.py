@@ -94,6 +94,56 @@ class Client(BaseModel):
     updated_by: str
 
 
+class ClientImportBatch(BaseModel):
+    """Outcome of one batch of a bulk client import."""
+
+    batch_number: int
+    rows: int
+    inserted: int = 0
+    updated: int = 0
+    rejected: int = 0
+    errors: Sequence[str] = []
+    seconds: float
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def rows_per_second(self) -> float:
+        """Throughput of the batch."""
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class ClientImportReport(BaseModel):
+    """Per-batch and overall outcome of a bulk client import."""
+
+    batches: list[ClientImportBatch] = []
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def inserted(self) -> int:
+        """Clients created by the import."""
+        return sum(batch.inserted for batch in self.batches)
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def updated(self) -> int:
+        """Existing clients overwritten by the import."""
+        return sum(batch.updated for batch in self.batches)
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def rejected(self) -> int:
+        """Rows that failed validation."""
+        return sum(batch.rejected for batch in self.batches)
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def rows_per_second(self) -> float:
+        """Throughput across all batches."""
+        seconds = sum(batch.seconds for batch in self.batches)
+        rows = sum(batch.rows for batch in self.batches)
+        return rows / seconds if seconds else 0.0
+
+
 class ClientSummary(BaseModel):
     """Data model for a client."""
 
@@ -234,6 +284,30 @@ class ReferralMatch(BaseModel):
     new_client_num_trips: int = 0
 
 
+class ReferralLineageNode(BaseModel):
+    """A client in another client's referral ancestry or descendants."""
+
+    id: UUID
+    name: str
+    referred_by_id: Optional[UUID] = None
+    depth: int
+    birth_date: Optional[date] = None
+    total_spend: float
+    avg_spend: float
+    earliest_trip: Optional[date] = None
+    latest_trip: Optional[date] = None
+    num_trips: int = 0
+    subtree_spend: Optional[float] = None
+
+
+class ReferralLineage(BaseModel):
+    """A client's referrers, nearest first, and everyone they referred."""
+
+    client_id: UUID
+    ancestors: Sequence[ReferralLineageNode] = []
+    descendants: Sequence[ReferralLineageNode] = []
+
+
 class ReferralNode(BaseModel):
     id: UUID
     name: str
@@ -0,0 +1,119 @@
+# Copyright 2024 SH
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Assembles referral forests from referral matches."""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from uuid import UUID
+
+from api.services.clients.models import ReferralMatch
+
+
+class ReferralForest(NamedTuple):
+    """Referral trees in ReferralNode shape plus any referral cycles found.
+
+    referrers holds the subtree under every client in the trees who referred
+    someone, sharing its nodes with trees rather than copying them.
+    """
+
+    trees: List[dict]
+    cycles: List[List[UUID]]
+    referrers: List[dict]
+
+
+def _node(referral: ReferralMatch, side: str) -> dict:
+    """Extracts one side of a referral match as a tree node."""
+    return {
+        "id": getattr(referral, f"{side}_client_id"),
+        "name": getattr(referral, f"{side}_client_cb_name"),
+        "birth_date": getattr(referral, f"{side}_client_birth_date"),
+        "total_spend": getattr(referral, f"{side}_client_total_trip_spend"),
+        "avg_spend": getattr(referral, f"{side}_client_avg_trip_spend"),
+        "earliest_trip": getattr(referral, f"{side}_client_earliest_trip"),
+        "latest_trip": getattr(referral, f"{side}_client_latest_trip"),
+        "num_trips": getattr(referral, f"{side}_client_num_trips"),
+    }
+
+
+def build_referral_forest(
+    referrals: Iterable[ReferralMatch], root_id: Optional[UUID] = None
+) -> ReferralForest:
+    """Builds referral trees from a parent to children adjacency index.
+
+    Clients nobody referred become roots. A client belongs to one tree only,
+    since a shared visited set stops it being re-attached elsewhere.
+    Groups of clients that only refer each other have no natural root, so
+    each cycle is reported and hung from its alphabetically first member,
+    the same tie-break the mutual referral cleanup has always used. Given a
+    root_id, only the tree under that client is returned.
+    """
+    nodes: Dict[UUID, dict] = {}
+    parent_of: Dict[UUID, UUID] = {}
+    children_of: Dict[UUID, List[UUID]] = defaultdict(list)
+    for referral in referrals:
+        source, new = _node(referral, "source"), _node(referral, "new")
+        nodes.setdefault(source["id"], source)
+        nodes.setdefault(new["id"], new)
+        if new["id"] not in parent_of:
+            parent_of[new["id"]] = source["id"]
+            children_of[source["id"]].append(new["id"])
+
+    visited: set = set()
+    assembled: Dict[UUID, dict] = {}
+
+    def assemble(top_id: UUID) -> dict:
+        top = {**nodes[top_id], "children": []}
+        visited.add(top_id)
+        assembled[top_id] = top
+        stack = [top]
+        while stack:
+            node = stack.pop()
+            for child_id in children_of.get(node["id"], ()):
+                if child_id not in visited:
+                    visited.add(child_id)
+                    child = {**nodes[child_id], "children": []}
+                    assembled[child_id] = child
+                    node["children"].append(child)
+                    stack.append(child)
+        return top
+
+    def referrers() -> List[dict]:
+        return [assembled[node_id] for node_id in children_of if node_id in assembled]
+
+    if root_id is not None:
+        trees = [assemble(root_id)] if root_id in nodes else []
+        return ReferralForest(trees, [], referrers())
+
+    trees = [assemble(node_id) for node_id in nodes if node_id not in parent_of]
+
+    # Whatever is left hangs off a cycle, as every client has one referrer
+    cycles = []
+    for node_id in nodes:
+        if node_id in visited:
+            continue
+        path: List[UUID] = []
+        seen_on_path: set = set()
+        while node_id not in seen_on_path and node_id not in visited:
+            seen_on_path.add(node_id)
+            path.append(node_id)
+            node_id = parent_of[node_id]
+        if node_id in visited:
+            continue
+        cycle = path[path.index(node_id) :]
+        cycles.append(cycle)
+        top_id = min(cycle, key=lambda member: nodes[member]["name"].lower())
+        trees.append(assemble(top_id))
+
+    return ReferralForest(trees, cycles, referrers())
@@ -15,16 +15,22 @@
 """Repositories for client-related data."""
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Iterable
-from api.services.clients.models import Client, ClientSummary
+from typing import Dict, Iterable, Sequence, Tuple
+from uuid import UUID
+from api.services.clients.models import Client, ClientSummary, ReferralLineageNode
 
 
 class ClientRepository(ABC):
     """Abstract repository for client-related models."""
 
     @abstractmethod
-    async def upsert(self, clients: Iterable[Client]) -> None:
-        """Adds an iterable of Client models to the repository."""
+    async def upsert(self, clients: Iterable[Client]) -> Tuple[int, int]:
+        """Adds or updates Client models, returning inserted and updated counts."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_column_lengths(self) -> Dict[str, int]:
+        """Returns the character limit of each length-limited client column."""
         raise NotImplementedError
 
     @abstractmethod
@@ -36,3 +42,10 @@ class ClientRepository(ABC):
     async def get_summaries(self) -> Iterable[ClientSummary]:
         """Returns ClientSummary instances in the repository."""
         raise NotImplementedError
+
+    @abstractmethod
+    async def get_referral_lineage(
+        self, client_id: UUID, max_depth: int
+    ) -> Sequence[ReferralLineageNode]:
+        """Returns a client's referral ancestors and descendants up to max_depth."""
+        raise NotImplementedError
@@ -15,179 +15,141 @@
 """Repositories for client-related data."""
 import json
 from textwrap import dedent
-from typing import Iterable, Sequence, Optional, Tuple
+from typing import Dict, Iterable, Sequence, Optional, Tuple
 from uuid import UUID
-from api.services.clients.models import Client, ClientSummary, ReferralMatch
+from api.services.clients.models import (
+    Client,
+    ClientSummary,
+    ReferralLineageNode,
+    ReferralMatch,
+    ReferralType,
+)
 
-from api.adapters.repository import PostgresMixin
+from api.adapters.repository import PostgresMixin, replica_read
 from api.services.clients.repository import ClientRepository
 from api.services.clients.models import Client
 
+CLIENT_COLUMNS = (
+    "id",
+    "first_name",
+    "last_name",
+    "middle_name",
+    "address_line_1",
+    "address_line_2",
+    "address_apt_suite",
+    "address_city",
+    "address_state",
+    "address_zip",
+    "address_country",
+    "cb_name",
+    "cb_interface_id",
+    "cb_profile_no",
+    "cb_notes",
+    "cb_profile_type",
+    "cb_courtesy_title",
+    "cb_primary_agent_name",
+    "cb_salutation",
+    "cb_issue_country",
+    "cb_relationship",
+    "cb_active",
+    "cb_passport_expire",
+    "cb_gender",
+    "cb_created_date",
+    "cb_modified_date",
+    "cb_referred_by",
+    "subjective_score",
+    "birth_date",
+    "referral_type",
+    "referred_by_id",
+    "referred_by_name",
+    "notes",
+    "num_referrals",
+    "audited",
+    "created_at",
+    "updated_at",
+    "updated_by",
+)
+# Everything but the identity, the creation time and the ClientBase relationship
+CLIENT_UPDATE_COLUMNS = tuple(
+    column
+    for column in CLIENT_COLUMNS
+    if column not in ("id", "cb_relationship", "created_at")
+)
+
+
+def _client_record(client: Client) -> tuple:
+    """Flattens a Client into a staging row, trimming text fields."""
+    record = []
+    for column in CLIENT_COLUMNS:
+        value = getattr(client, column)
+        if isinstance(value, ReferralType):
+            value = value.value
+        elif isinstance(value, str):
+            value = value.strip() if value else None
+        record.append(value)
+    return tuple(record)
+
 
 class PostgresClientRepository(PostgresMixin, ClientRepository):
     """Implementation of the ClientRepository ABC for Postgres."""
 
-    async def upsert(self, clients: Iterable[Client]) -> None:
-        """Adds or updates an iterable of Client models in the repository."""
-        pool = await self._get_pool()  # Assuming this retrieves an asyncpg pool
-        query = dedent(
-            """
-            INSERT INTO public.clients (
-                id, first_name, last_name, middle_name, address_line_1, address_line_2,
-                address_apt_suite, address_city, address_state, address_zip, address_country,
-                cb_name, cb_interface_id, cb_profile_no,
-                cb_notes, cb_profile_type, cb_courtesy_title, cb_primary_agent_name, cb_salutation,
-                cb_issue_country,
-                cb_relationship, cb_active,
-                cb_passport_expire, cb_gender, cb_created_date, cb_modified_date, cb_referred_by,
-                subjective_score, birth_date, referral_type, referred_by_id, referred_by_name, notes,
-                num_referrals, audited, created_at, updated_at, updated_by
-            )
-            VALUES (
-                $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16,
-                $17, $18, $19, $20, $21, $22, $23, $24, $25, $26, $27, $28, $29, $30, $31,
-                $32, $33, $34
-            )
+    async def upsert(self, clients: Iterable[Client]) -> Tuple[int, int]:
+        """Adds or updates Client models, returning inserted and updated counts.
+
+        Rows are COPYed into a transaction-scoped staging table and merged into
+        public.clients with a single INSERT ... SELECT ... ON CONFLICT.
+        """
+        pool = await self._get_pool()
+        columns = ", ".join(CLIENT_COLUMNS)
+        updates = ",\n                ".join(
+            f"{column} = EXCLUDED.{column}" for column in CLIENT_UPDATE_COLUMNS
+        )
+        merge = dedent(
+            f"""
+            INSERT INTO public.clients ({columns})
+            SELECT {columns} FROM client_import_staging
             ON CONFLICT (id) DO UPDATE SET
-                first_name = EXCLUDED.first_name,
-                last_name = EXCLUDED.last_name,
-                middle_name = EXCLUDED.middle_name,
-                address_line_1 = EXCLUDED.address_line_1,
-                address_line_2 = EXCLUDED.address_line_2,
-                address_apt_suite = EXCLUDED.address_apt_suite,
-                address_city = EXCLUDED.address_city,
-                address_state = EXCLUDED.address_state,
-                address_zip = EXCLUDED.address_zip,
-                address_country = EXCLUDED.address_country,
-                cb_name = EXCLUDED.cb_name,
-                cb_interface_id = EXCLUDED.cb_interface_id,
-                cb_profile_no = EXCLUDED.cb_profile_no,
-                cb_notes = EXCLUDED.cb_notes,
-                cb_profile_type = EXCLUDED.cb_profile_type,
-                cb_courtesy_title = EXCLUDED.cb_courtesy_title,
-                cb_primary_agent_name = EXCLUDED.cb_primary_agent_name,
-                cb_salutation = EXCLUDED.cb_salutation,
-                cb_issue_country = EXCLUDED.cb_issue_country,
-                cb_active = EXCLUDED.cb_active,
-                cb_passport_expire = EXCLUDED.cb_passport_expire,
-                cb_gender = EXCLUDED.cb_gender,
-                cb_created_date = EXCLUDED.cb_created_date,
-                cb_modified_date = EXCLUDED.cb_modified_date,
-                cb_referred_by = EXCLUDED.cb_referred_by,
-                subjective_score = EXCLUDED.subjective_score,
-                birth_date = EXCLUDED.birth_date,
-                referral_type = EXCLUDED.referral_type,
-                referred_by_id = EXCLUDED.referred_by_id,
-                referred_by_name = EXCLUDED.referred_by_name,
-                notes = EXCLUDED.notes,
-                num_referrals = EXCLUDED.num_referrals,
-                audited = EXCLUDED.audited,
-                updated_at = EXCLUDED.updated_at,
-                updated_by = EXCLUDED.updated_by
+                {updates}
+            RETURNING (xmax = 0) AS was_inserted
             """
         )
+        # A batch may repeat an id, which one merge cannot apply twice
+        records = list(
+            {client.id: _client_record(client) for client in clients}.values()
+        )
         async with pool.acquire() as con:
-            await con.set_type_codec(
-                "jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
             async with con.transaction():
-                args = [
-                    (
-                        client.id,
-                        client.first_name.strip() if client.first_name else None,
-                        client.last_name.strip() if client.last_name else None,
-                        client.middle_name.strip() if client.middle_name else None,
-                        (
-                            client.address_line_1.strip()
-                            if client.address_line_1
-                            else None
-                        ),
-                        (
-                            client.address_line_2.strip()
-                            if client.address_line_2
-                            else None
-                        ),
-                        (
-                            client.address_apt_suite.strip()
-                            if client.address_apt_suite
-                            else None
-                        ),
-                        client.address_city.strip() if client.address_city else None,
-                        client.address_state.strip() if client.address_state else None,
-                        client.address_zip.strip() if client.address_zip else None,
-                        (
-                            client.address_country.strip()
-                            if client.address_country
-                            else None
-                        ),
-                        client.cb_name.strip() if client.cb_name else None,
-                        (
-                            client.cb_interface_id.strip()
-                            if client.cb_interface_id
-                            else None
-                        ),
-                        client.cb_profile_no.strip() if client.cb_profile_no else None,
-                        client.cb_notes.strip() if client.cb_notes else None,
-                        (
-                            client.cb_profile_type.strip()
-                            if client.cb_profile_type
-                            else None
-                        ),
-                        (
-                            client.cb_courtesy_title.strip()
-                            if client.cb_courtesy_title
-                            else None
-                        ),
-                        (
-                            client.cb_primary_agent_name.strip()
-                            if client.cb_primary_agent_name
-                            else None
-                        ),
-                        client.cb_salutation.strip() if client.cb_salutation else None,
-                        (
-                            client.cb_issue_country.strip()
-                            if client.cb_issue_country
-                            else None
-                        ),
-                        (
-                            client.cb_relationship.strip()
-                            if client.cb_relationship
-                            else None
-                        ),
-                        client.cb_active.strip() if client.cb_active else None,
-                        (
-                            client.cb_passport_expire.strip()
-                            if client.cb_passport_expire
-                            else None
-                        ),
-                        client.cb_gender.strip() if client.cb_gender else None,
-                        client.cb_created_date,
-                        client.cb_modified_date,
-                        (
-                            client.cb_referred_by.strip()
-                            if client.cb_referred_by
-                            else None
-                        ),
-                        client.subjective_score,
-                        client.birth_date,
-                        client.referral_type,
-                        client.referred_by_id,
-                        (
-                            client.referred_by_name.strip()
-                            if client.referred_by_name
-                            else None
-                        ),
-                        (client.notes.strip() if client.notes else None),
-                        client.num_referrals,
-                        client.audited,
-                        client.created_at,
-                        client.updated_at,
-                        client.updated_by.strip(),
-                    )
-                    for client in clients
-                ]
-                await con.executemany(query, args)
-        print(f"Successfully processed {len(args)} Client record(s) in the repository.")
+                await con.execute(
+                    "CREATE TEMP TABLE client_import_staging "
+                    "(LIKE public.clients INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
+                await con.copy_records_to_table(
+                    "client_import_staging", records=records, columns=CLIENT_COLUMNS
+                )
+                results = await con.fetch(merge)
+        inserted = sum(1 for result in results if result["was_inserted"])
+        updated = len(results) - inserted
+        print(
+            f"Successfully processed {len(records)} Client record(s) in the repository."
+        )
+        return inserted, updated
+
+    async def get_column_lengths(self) -> Dict[str, int]:
+        """Returns the character limit of each length-limited client column."""
+        query = dedent(
+            """
+            SELECT column_name, character_maximum_length
+            FROM information_schema.columns
+            WHERE table_schema = 'public'
+                AND table_name = 'clients'
+                AND character_maximum_length IS NOT NULL
+            """
+        )
+        records = await self._fetch(query)
+        return {
+            record["column_name"]: record["character_maximum_length"]
+            for record in records
+        }
 
     async def upsert_referral(self, client: Client) -> list[Tuple[UUID, bool]]:
         """Adds or updates an iterable of Client models in the repository."""
@@ -270,42 +232,29 @@ class PostgresClientRepository(PostgresMixin, ClientRepository):
 
     async def get(self) -> Sequence[Client]:
         """Returns Clients in the repository."""
-        pool = await self._get_pool()  # Assuming this retrieves an asyncpg pool
         query = dedent(
             """
             SELECT * FROM public.clients
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(query)
-                clients = [Client(**record) for record in records]
-                return clients
+        records = await self._fetch(query)
+        clients = [Client(**record) for record in records]
+        return clients
 
     async def get_by_id(self, client_id: UUID) -> Optional[Client]:
         """Returns Client in the repository by ID."""
-        pool = await self._get_pool()  # Assuming this retrieves an asyncpg pool
         query = dedent(
             """
             SELECT * FROM public.clients
             WHERE id = $1
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                res = await con.fetchrow(query, client_id)
-                if res:
-                    return Client(**res)
+        res = await self._fetchrow(query, client_id)
+        if res:
+            return Client(**res)
 
     async def get_summaries(self) -> Sequence[ClientSummary]:
         """Returns ClientSummary instances in the repository."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT 
@@ -363,37 +312,15 @@ class PostgresClientRepository(PostgresMixin, ClientRepository):
             GROUP BY c.id, r.first_name, r.last_name, ag.name, empl.email
             """
         )
-        async with pool.acquire() as con:
-            async with con.transaction():
-                records = await con.fetch(query)
-                client_summaries = [ClientSummary(**record) for record in records]
-                return client_summaries
+        records = await self._fetch(query)
+        client_summaries = [ClientSummary(**record) for record in records]
+        return client_summaries
 
+    @replica_read
     async def get_referral_matches(self) -> Sequence[ReferralMatch]:
         """Returns ClientSummary instances in the repository."""
-        pool = await self._get_pool()
         query = dedent(
             """
-            with res_info as (
-            select
-                client_id,
-                MIN(start_date) as earliest_trip,
-                MAX(start_date) as latest_trip,
-                count(*) as num_trips,
-                SUM(cost) as total_trip_spend,
-                AVG(cost) as avg_trip_spend,
-                extract(year
-            from
-                AGE(NOW(),
-                MAX(start_date))) * 12 + extract(month
-            from
-                AGE(NOW(),
-                MAX(start_date))) as months_since_last_reservation
-            from
-                public.reservations
-            group by
-                client_id
-            )
             select
                 source_client.id as source_client_id,
                 source_client.cb_name as source_client_cb_name,
@@ -416,16 +343,81 @@ class PostgresClientRepository(PostgresMixin, ClientRepository):
             join public.clients new_client
             on
                 new_client.referred_by_id = source_client.id
-            join res_info new_res_info
+            join public.client_reservation_stats new_res_info
             on
                 new_res_info.client_id = new_client.id
-            join res_info source_res_info
+            join public.client_reservation_stats source_res_info
             on
                 source_res_info.client_id = source_client.id
             """
         )
-        async with pool.acquire() as con:
-            async with con.transaction():
-                records = await con.fetch(query)
-                referral_matches = [ReferralMatch(**record) for record in records]
-                return referral_matches
+        records = await self._fetch(query)
+        referral_matches = [ReferralMatch(**record) for record in records]
+        return referral_matches
+
+    @replica_read
+    async def get_referral_lineage(
+        self, client_id: UUID, max_depth: int
+    ) -> Sequence[ReferralLineageNode]:
+        """Returns a client's referral ancestors and descendants up to max_depth.
+
+        Ancestors have negative depths and the client sits at depth 0. Each
+        client at depth 0 or below it carries the spend of its whole subtree.
+        """
+        query = dedent(
+            """
+            WITH RECURSIVE descendants AS (
+                SELECT id, referred_by_id, 0 AS depth, ARRAY[id] AS path
+                FROM public.clients
+                WHERE id = $1
+                UNION ALL
+                SELECT c.id, c.referred_by_id, d.depth + 1, d.path || c.id
+                FROM public.clients c
+                JOIN descendants d ON c.referred_by_id = d.id
+                WHERE d.depth < $2 AND NOT c.id = ANY(d.path)
+            ),
+            ancestors AS (
+                SELECT id, referred_by_id, 0 AS depth, ARRAY[id] AS path
+                FROM public.clients
+                WHERE id = $1
+                UNION ALL
+                SELECT c.id, c.referred_by_id, a.depth - 1, a.path || c.id
+                FROM public.clients c
+                JOIN ancestors a ON c.id = a.referred_by_id
+                WHERE a.depth > -$2 AND NOT c.id = ANY(a.path)
+            ),
+            rollup AS (
+                SELECT node.id, SUM(COALESCE(s.total_trip_spend, 0)) AS subtree_spend
+                FROM descendants node
+                JOIN descendants d ON node.id = ANY(d.path)
+                LEFT JOIN public.client_reservation_stats s ON s.client_id = d.id
+                GROUP BY node.id
+            ),
+            lineage AS (
+                SELECT id, referred_by_id, depth FROM descendants
+                UNION ALL
+                -- A referral cycle through the client would list members twice
+                SELECT id, referred_by_id, depth FROM ancestors
+                WHERE depth < 0 AND id NOT IN (SELECT id FROM descendants)
+            )
+            SELECT
+                l.id,
+                COALESCE(c.cb_name, c.last_name || '/' || c.first_name) AS name,
+                l.referred_by_id,
+                l.depth,
+                c.birth_date,
+                COALESCE(s.total_trip_spend, 0) AS total_spend,
+                COALESCE(s.avg_trip_spend, 0) AS avg_spend,
+                s.earliest_trip,
+                s.latest_trip,
+                COALESCE(s.num_trips, 0) AS num_trips,
+                r.subtree_spend
+            FROM lineage l
+            JOIN public.clients c ON c.id = l.id
+            LEFT JOIN public.client_reservation_stats s ON s.client_id = l.id
+            LEFT JOIN rollup r ON r.id = l.id
+            ORDER BY l.depth < 0, ABS(l.depth)
+            """
+        )
+        records = await self._fetch(query, client_id, max_depth)
+        return [ReferralLineageNode(**record) for record in records]
@@ -16,19 +16,26 @@
 # from typing import Optional, Sequence, Union
 from uuid import UUID
 from datetime import datetime
+from itertools import islice
 import copy
+import time
 from typing import Iterable, Union, Sequence, Optional, Tuple, Dict
 
 from numpy import true_divide
+from pydantic import ValidationError
 from api.services.audit.service import AuditService
 from api.services.audit.models import AuditLog
 from api.services.clients.models import (
     Client,
+    ClientImportBatch,
+    ClientImportReport,
     ClientSummary,
     PatchClientRequest,
+    ReferralLineage,
     ReferralMatch,
     ReferralNode,
 )
+from api.services.clients.referrals import build_referral_forest
 from api.services.clients.repository.postgres import PostgresClientRepository
 from api.services.reservations.service import ReservationService
 
@@ -48,6 +55,70 @@ class ClientService:
             clients = [clients]
         await self._repo.upsert(clients)
 
+    async def import_clients(
+        self, rows: Iterable[dict], updated_by: str, batch_size: int = 1000
+    ) -> ClientImportReport:
+        """Validates and merges client rows in batches, reporting on each batch.
+
+        Rows are consumed lazily, so a csv.DictReader streams straight through.
+        Keys are Client field names and empty strings count as missing. Rows
+        with values longer than their column allows are rejected.
+        """
+        report = ClientImportReport()
+        # Over-long values would abort the batch's COPY, so reject them here
+        column_lengths = await self._repo.get_column_lengths()
+        numbered_rows = enumerate(rows, start=1)
+        while batch := list(islice(numbered_rows, batch_size)):
+            started = time.perf_counter()
+            clients = []
+            errors = []
+            for row_number, row in batch:
+                values = {key: value for key, value in row.items() if key and value}
+                values.setdefault("updated_by", updated_by)
+                try:
+                    client = Client(**values)
+                except ValidationError as e:
+                    reasons = "; ".join(
+                        f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                        for error in e.errors()
+                    )
+                    errors.append(f"row {row_number}: {reasons}")
+                    continue
+                if (
+                    not (client.first_name or "").strip()
+                    or not (client.last_name or "").strip()
+                ):
+                    errors.append(f"row {row_number}: first and last name required")
+                    continue
+                too_long = [
+                    f"{field}: at most {limit} characters"
+                    for field, limit in column_lengths.items()
+                    if isinstance(value := getattr(client, field, None), str)
+                    and len(value) > limit
+                ]
+                if too_long:
+                    errors.append(f"row {row_number}: {'; '.join(too_long)}")
+                    continue
+                clients.append(client)
+
+            inserted, updated = await self._repo.upsert(clients) if clients else (0, 0)
+            batch_report = ClientImportBatch(
+                batch_number=len(report.batches) + 1,
+                rows=len(batch),
+                inserted=inserted,
+                updated=updated,
+                rejected=len(errors),
+                errors=errors,
+                seconds=time.perf_counter() - started,
+            )
+            report.batches.append(batch_report)
+            print(
+                f"Batch {batch_report.batch_number}: {inserted} inserted, "
+                f"{updated} updated, {len(errors)} rejected "
+                f"({batch_report.rows_per_second:.0f} rows/sec)"
+            )
+        return report
+
     async def process_patch_request(self, client_request: PatchClientRequest) -> dict:
         """Adds new Client to the repository."""
         prepared_data_or_error = await self.prepare_client_data(client_request)
@@ -240,80 +311,31 @@ class ClientService:
         return await self._repo.get_referral_matches()
 
     async def get_referral_tree(
-        self,
+        self, client_id: Optional[UUID] = None
     ) -> Sequence[ReferralNode]:
-        """Returns Clients from the repository."""
-        # get Sequence[ReferralMatch] from repository
+        """Returns the referral tree under each referrer, or only client_id's.
+
+        Every client who referred someone gets an entry with their whole
+        subtree, so a referrer who was referred themselves is listed both on
+        their own and under whoever referred them.
+        """
         referrals = await self._repo.get_referral_matches()
-        referrals_converted = [ref.model_dump() for ref in referrals]
-
-        # Build the referral tree
-        referral_tree = self.build_referral_tree(referrals_converted)
-        referral_nodes = [ReferralNode(**referral_tree[key]) for key in referral_tree]
-
-        return referral_nodes
-
-    def build_referral_tree(self, referrals) -> dict:
-        referral_tree = {}
-        referred_by_map = {}
-
-        # Initialize the referral tree and the referred_by_map
-        for referral in referrals:
-            source_id = referral["source_client_id"]
-            new_id = referral["new_client_id"]
-
-            if source_id not in referral_tree:
-                referral_tree[source_id] = {
-                    "id": source_id,
-                    "name": referral["source_client_cb_name"],
-                    "birth_date": referral["source_client_birth_date"],
-                    "total_spend": referral["source_client_total_trip_spend"],
-                    "avg_spend": referral["source_client_avg_trip_spend"],
-                    "earliest_trip": referral["source_client_earliest_trip"],
-                    "latest_trip": referral["source_client_latest_trip"],
-                    "num_trips": referral["source_client_num_trips"],
-                    "children": [],
-                }
-
-            referred_by_map[new_id] = {
-                "id": new_id,
-                "name": referral["new_client_cb_name"],
-                "birth_date": referral["new_client_birth_date"],
-                "total_spend": referral["new_client_total_trip_spend"],
-                "avg_spend": referral["new_client_avg_trip_spend"],
-                "earliest_trip": referral["new_client_earliest_trip"],
-                "latest_trip": referral["new_client_latest_trip"],
-                "num_trips": referral["new_client_num_trips"],
-                "parent_id": source_id,
-            }
-
-        # Recursively build the tree
-        def add_children(node, visited_ids):
-            node_id = node["id"]
-            visited_ids.add(node_id)  # Add current node to the visited set
-
-            for child_id, child_data in referred_by_map.items():
-                if child_data["parent_id"] == node_id and child_id not in visited_ids:
-                    child_node = {
-                        "id": child_data["id"],
-                        "name": child_data["name"],
-                        "birth_date": child_data["birth_date"],
-                        "total_spend": child_data["total_spend"],
-                        "avg_spend": child_data["avg_spend"],
-                        "earliest_trip": child_data["earliest_trip"],
-                        "latest_trip": child_data["latest_trip"],
-                        "num_trips": child_data["num_trips"],
-                        "children": [],
-                    }
-                    node["children"].append(child_node)
-                    add_children(
-                        child_node, visited_ids.copy()
-                    )  # Recursive call to add descendants
-
-        # Build the tree from root nodes
-        for source_id, source_data in referral_tree.items():
-            add_children(source_data, set())
-
-        # Optionally handle mutual referrals as before (if still necessary)
-
-        return referral_tree
+        forest = build_referral_forest(referrals, root_id=client_id)
+        for cycle in forest.cycles:
+            print(f"Circular referral detected between clients {cycle}")
+
+        trees = forest.trees if client_id is not None else forest.referrers
+        return [ReferralNode(**tree) for tree in trees]
+
+    async def get_referral_lineage(
+        self, client_id: UUID, max_depth: int = 10
+    ) -> Optional[ReferralLineage]:
+        """Returns who referred a client and whom they referred, if the client exists."""
+        nodes = await self._repo.get_referral_lineage(client_id, max_depth)
+        if not nodes:
+            return None
+        return ReferralLineage(
+            client_id=client_id,
+            ancestors=[node for node in nodes if node.depth < 0],
+            descendants=[node for node in nodes if node.depth >= 0],
+        )
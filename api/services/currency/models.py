@@ -16,8 +16,9 @@
 from uuid import UUID, uuid4
 from datetime import date, time, datetime
 from decimal import Decimal
+from typing import Sequence
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 
 
 class DailyRate(BaseModel):
@@ -45,3 +46,58 @@ class PatchDailyRateRequest(BaseModel):
     rate_date: date
     rate_time: time
     updated_by: str
+
+
+class DailyRateImportBatch(BaseModel):
+    """Outcome of one batch of a bulk daily rate import."""
+
+    batch_number: int
+    rows: int
+    inserted: int = 0
+    updated: int = 0
+    rejected: int = 0
+    errors: Sequence[str] = []
+    seconds: float
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def rows_per_second(self) -> float:
+        """Throughput of the batch."""
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class DailyRateImportReport(BaseModel):
+    """Per-batch and overall outcome of a bulk daily rate import."""
+
+    batches: list[DailyRateImportBatch] = []
+    seconds: float = 0.0
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def rows(self) -> int:
+        """Rows read from the source."""
+        return sum(batch.rows for batch in self.batches)
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def inserted(self) -> int:
+        """Rates created by the import."""
+        return sum(batch.inserted for batch in self.batches)
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def updated(self) -> int:
+        """Existing rates whose values the import changed."""
+        return sum(batch.updated for batch in self.batches)
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def rejected(self) -> int:
+        """Rows that failed validation."""
+        return sum(batch.rejected for batch in self.batches)
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def rows_per_second(self) -> float:
+        """Throughput of the whole import, including time spent reading."""
+        return self.rows / self.seconds if self.seconds else 0.0
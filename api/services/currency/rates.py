@@ -0,0 +1,114 @@
+# Copyright 2024 SH
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-memory daily rate table for converting many amounts at once."""
+from datetime import date
+from typing import Iterable, Sequence, Union
+
+import numpy as np
+
+PIVOT_CURRENCY = "USD"
+
+
+def _epoch_days(dates: Union[Sequence[date], np.ndarray]) -> np.ndarray:
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+class RateTable:
+    """Daily rates for every currency against USD, forward filled by day.
+
+    Rates are quoted as units of target currency per one base currency, as
+    in daily_rates. Row i of the matrix holds the USD -> currencies[i] rate
+    for each day from the first quoted date to the last, so a lookup is one
+    index into the matrix. Days without a quote carry the nearest prior
+    quote, days before a currency's first quote are NaN, and dates after the
+    last quoted day use the last day's rates.
+    """
+
+    def __init__(self, currencies: Sequence[str], first_day: int, matrix: np.ndarray):
+        """Wraps a currencies x days matrix starting at first_day (epoch days)."""
+        self.currencies = list(currencies)
+        self.first_day = first_day
+        self.matrix = matrix
+        self._index = {currency: row for row, currency in enumerate(self.currencies)}
+
+    @classmethod
+    def from_quotes(cls, quotes: Iterable[tuple[str, str, date, float]]) -> "RateTable":
+        """Builds the table from (base, target, rate_date, conversion_rate) rows.
+
+        Quotes against USD in either direction are used, with USD-based quotes
+        winning when both exist for a day. Quotes between two other
+        currencies are ignored; they convert through USD instead.
+        """
+        usd_based, inverted = [], []
+        for base, target, rate_date, rate in quotes:
+            if not rate or rate_date is None:
+                continue
+            if base == PIVOT_CURRENCY and target != PIVOT_CURRENCY:
+                usd_based.append((target, rate_date, float(rate)))
+            elif target == PIVOT_CURRENCY and base != PIVOT_CURRENCY:
+                inverted.append((base, rate_date, 1 / float(rate)))
+        rows = inverted + usd_based
+        if not rows:
+            return cls([PIVOT_CURRENCY], 0, np.ones((1, 1)))
+
+        currencies = [PIVOT_CURRENCY] + sorted({currency for currency, _, _ in rows})
+        index = {currency: row for row, currency in enumerate(currencies)}
+        days = _epoch_days([rate_date for _, rate_date, _ in rows])
+        first_day = int(days.min())
+        matrix = np.full((len(currencies), int(days.max()) - first_day + 1), np.nan)
+        matrix[0] = 1.0
+        # Later assignments win, so USD-based quotes overwrite inverted ones
+        matrix[[index[currency] for currency, _, _ in rows], days - first_day] = [
+            rate for _, _, rate in rows
+        ]
+
+        # Forward fill each row with the position of its latest quote so far
+        positions = np.where(
+            np.isnan(matrix), 0, np.arange(matrix.shape[1])[np.newaxis, :]
+        )
+        np.maximum.accumulate(positions, axis=1, out=positions)
+        matrix = matrix[np.arange(len(currencies))[:, np.newaxis], positions]
+        return cls(currencies, first_day, matrix)
+
+    def convert(
+        self,
+        amounts: Union[Sequence[float], np.ndarray],
+        currencies: Sequence[str],
+        dates: Union[Sequence[date], np.ndarray],
+        to_currency: str = PIVOT_CURRENCY,
+    ) -> np.ndarray:
+        """Converts amounts in the given currencies on the given dates.
+
+        Returns NaN where a currency is unknown or has no quote on or before
+        the date.
+        """
+        amounts = np.asarray(amounts, dtype=np.float64)
+        target_row = self._index.get(to_currency, -1)
+        rows = np.fromiter(
+            (self._index.get(currency, -1) for currency in currencies),
+            dtype=np.int64,
+            count=len(amounts),
+        )
+        days = _epoch_days(dates) - self.first_day
+        unknown = (rows < 0) | (days < 0) | (target_row < 0)
+        days = np.clip(days, 0, self.matrix.shape[1] - 1)
+
+        usd = amounts / self.matrix[rows, days]
+        converted = usd * self.matrix[target_row, days]
+        converted[unknown] = np.nan
+        # Same-currency amounts need no rate, even outside the quoted days
+        same = (rows == target_row) & (rows >= 0)
+        converted[same] = amounts[same]
+        return converted
@@ -14,8 +14,9 @@
 
 """Repositories for data related to currency conversion."""
 from abc import ABC, abstractmethod
-from typing import Sequence, Optional
+from typing import Sequence, Optional, Tuple
 from datetime import date
+from decimal import Decimal
 from api.services.currency.models import DailyRate
 
 
@@ -38,3 +39,27 @@ class CurrencyRepository(ABC):
     ) -> Optional[DailyRate]:
         """Gets a DailyRate object for given base and target currencies on a specific date."""
         raise NotImplementedError
+
+    @abstractmethod
+    async def copy_daily_rates(
+        self, daily_rates: Sequence[DailyRate]
+    ) -> Tuple[int, int]:
+        """Bulk merges DailyRate objects, returning inserted and updated counts."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_rates_for_keys(
+        self, keys: Sequence[Tuple[str, str, date]]
+    ) -> Sequence[DailyRate]:
+        """Gets the DailyRate objects matching (base, target, rate_date) keys."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_rate_quotes(self) -> Sequence[Tuple[str, str, date, Decimal]]:
+        """Gets (base, target, rate_date, conversion_rate) for every dated rate."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_max_conversion_rate(self) -> Optional[Decimal]:
+        """Gets the largest conversion rate the repository can store, if bounded."""
+        raise NotImplementedError
@@ -13,11 +13,10 @@
 # limitations under the License.
 """Postgres Repository for travel-related data."""
 from datetime import date, datetime
+from decimal import Decimal
 from typing import Sequence, Optional, Tuple
 from textwrap import dedent
 from uuid import UUID
-import json
-from asyncpg import UniqueViolationError
 
 
 # from asyncpg.connection import inspect
@@ -36,15 +35,12 @@ class PostgresCurrencyRepository(PostgresMixin, CurrencyRepository):
 
     async def get_rates_date(self, rate_date: date) -> Sequence[DailyRate]:
         """Gets all DailyRate objects for a given date."""
-        pool = await self._get_pool()
         query = """
         SELECT *
         FROM public.daily_rates
         WHERE rate_date = $1;
         """
-        async with pool.acquire() as con:
-            async with con.transaction():
-                rows = await con.fetch(query, rate_date)
+        rows = await self._fetch(query, rate_date)
 
         # Convert rows to DailyRate instances
         daily_rates = [DailyRate(**row) for row in rows]
@@ -69,7 +65,10 @@ class PostgresCurrencyRepository(PostgresMixin, CurrencyRepository):
     async def upsert_daily_rates(
         self, daily_rates: Sequence[DailyRate]
     ) -> list[Tuple[UUID, bool, str]]:
-        pool = await self._get_pool()
+        """Upserts DailyRate objects in one statement, keyed on currencies and date.
+
+        Each (base, target, rate_date) may appear only once per call.
+        """
         query = dedent(
             """
             INSERT INTO public.daily_rates (
@@ -82,9 +81,12 @@ class PostgresCurrencyRepository(PostgresMixin, CurrencyRepository):
                 rate_time,
                 updated_by,
                 updated_at
-            ) VALUES (
-                $1, $2, $3, $4, $5, $6, $7, $8, $9
             )
+            SELECT r.*, $9
+            FROM unnest(
+                $1::uuid[], $2::text[], $3::text[], $4::text[],
+                $5::numeric[], $6::date[], $7::time[], $8::text[]
+            ) AS r
             ON CONFLICT (base_currency, target_currency, rate_date) DO UPDATE SET
                 currency_name = EXCLUDED.currency_name,
                 conversion_rate = EXCLUDED.conversion_rate,
@@ -92,54 +94,158 @@ class PostgresCurrencyRepository(PostgresMixin, CurrencyRepository):
                 updated_at = EXCLUDED.updated_at,
                 updated_by = EXCLUDED.updated_by
             RETURNING id, (xmax = 0) AS was_inserted;
+            """
+        )
+        columns = list(
+            zip(
+                *(
+                    (
+                        rate.id,
+                        rate.base_currency.strip(),
+                        rate.target_currency.strip(),
+                        rate.currency_name.strip(),
+                        rate.conversion_rate,
+                        rate.rate_date,
+                        rate.rate_time,
+                        rate.updated_by,
+                    )
+                    for rate in daily_rates
+                )
+            )
+        )
+        if not columns:
+            return []
+        rows = await self._fetch(query, *columns, datetime.now())
+        return [(row["id"], row["was_inserted"], "") for row in rows]
+
+    async def copy_daily_rates(
+        self, daily_rates: Sequence[DailyRate]
+    ) -> Tuple[int, int]:
+        """Bulk merges DailyRate objects, returning inserted and updated counts.
+
+        Rates are COPYed into a transaction-scoped staging table and merged on
+        (base_currency, target_currency, rate_date) in one statement. Stored
+        rates whose values are unchanged are left alone.
         """
+        pool = await self._get_pool()
+        columns = (
+            "id",
+            "base_currency",
+            "target_currency",
+            "currency_name",
+            "conversion_rate",
+            "rate_date",
+            "rate_time",
+            "updated_by",
+            "updated_at",
+        )
+        column_list = ", ".join(columns)
+        merge = dedent(
+            f"""
+            INSERT INTO public.daily_rates AS d ({column_list})
+            SELECT {column_list} FROM daily_rate_staging
+            ON CONFLICT (base_currency, target_currency, rate_date) DO UPDATE SET
+                currency_name = EXCLUDED.currency_name,
+                conversion_rate = EXCLUDED.conversion_rate,
+                rate_time = EXCLUDED.rate_time,
+                updated_by = EXCLUDED.updated_by,
+                updated_at = EXCLUDED.updated_at
+            WHERE (d.currency_name, d.conversion_rate, d.rate_time)
+                IS DISTINCT FROM
+                (EXCLUDED.currency_name, EXCLUDED.conversion_rate, EXCLUDED.rate_time)
+            RETURNING (xmax = 0) AS was_inserted
+            """
+        )
+        # A batch may repeat a key, which one merge cannot apply twice
+        records = list(
+            {
+                (rate.base_currency, rate.target_currency, rate.rate_date): (
+                    rate.id,
+                    rate.base_currency,
+                    rate.target_currency,
+                    rate.currency_name,
+                    rate.conversion_rate,
+                    rate.rate_date,
+                    rate.rate_time,
+                    rate.updated_by,
+                    rate.updated_at,
+                )
+                for rate in daily_rates
+            }.values()
         )
-        results = []
         async with pool.acquire() as con:
-            await con.set_type_codec(
-                "jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
             async with con.transaction():
-                for rate in daily_rates:
-                    try:
-                        args = (
-                            rate.id,
-                            rate.base_currency.strip(),
-                            rate.target_currency.strip(),
-                            rate.currency_name.strip(),
-                            rate.conversion_rate,
-                            rate.rate_date,
-                            rate.rate_time,
-                            rate.updated_by,
-                            datetime.now(),
-                        )
-                        row = await con.fetchrow(query, *args)
-                        if row:
-                            # Append log ID and whether it was an insert (True) or an update (False)
-                            results.append((row["id"], row["was_inserted"], ""))
-                    except UniqueViolationError:
-                        # Construct a more user-friendly error message
-                        error_message = (
-                            f"A record for {rate.target_currency} from date"
-                            f"{rate.rate_date} already exists."
-                        )
-                        results.append((rate.id, False, error_message))
-        return results
+                await con.execute(
+                    "CREATE TEMP TABLE daily_rate_staging "
+                    "(LIKE public.daily_rates INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
+                await con.copy_records_to_table(
+                    "daily_rate_staging", records=records, columns=columns
+                )
+                results = await con.fetch(merge)
+        inserted = sum(1 for result in results if result["was_inserted"])
+        return inserted, len(results) - inserted
+
+    async def get_rates_for_keys(
+        self, keys: Sequence[Tuple[str, str, date]]
+    ) -> Sequence[DailyRate]:
+        """Gets the DailyRate objects matching (base, target, rate_date) keys."""
+        if not keys:
+            return []
+        query = dedent(
+            """
+            SELECT d.*
+            FROM unnest($1::char(3)[], $2::char(3)[], $3::date[])
+                AS k (base_currency, target_currency, rate_date)
+            JOIN public.daily_rates d
+                ON d.base_currency = k.base_currency
+                AND d.target_currency = k.target_currency
+                AND d.rate_date = k.rate_date;
+            """
+        )
+        bases, targets, rate_dates = zip(*keys)
+        rows = await self._fetch(query, list(bases), list(targets), list(rate_dates))
+        return [DailyRate(**row) for row in rows]
 
     async def get_currency_for_date(
         self, rate_date: date, target_currency: str, base_currency: str
     ) -> Optional[DailyRate]:
         """Gets a DailyRate object for given base and target currencies on a specific date."""
-        pool = await self._get_pool()
         query = """
         SELECT *
         FROM public.daily_rates
         WHERE rate_date = $1 AND target_currency = $2 AND base_currency = $3;
         """
-        async with pool.acquire() as con:
-            async with con.transaction():
-                res = await con.fetchrow(
-                    query, rate_date, target_currency, base_currency
-                )
-                if res:
-                    return DailyRate(**res)
+        res = await self._fetchrow(query, rate_date, target_currency, base_currency)
+        if res:
+            return DailyRate(**res)
+        return None
+
+    async def get_max_conversion_rate(self) -> Optional[Decimal]:
+        """Gets the largest conversion rate the repository can store, if bounded."""
+        query = dedent(
+            """
+            SELECT numeric_precision, numeric_scale
+            FROM information_schema.columns
+            WHERE table_schema = 'public'
+                AND table_name = 'daily_rates'
+                AND column_name = 'conversion_rate'
+            """
+        )
+        record = await self._fetchrow(query)
+        if record is None or record["numeric_precision"] is None:
+            return None
+        precision, scale = record["numeric_precision"], record["numeric_scale"]
+        return Decimal(10) ** (precision - scale) - Decimal(10) ** -scale
+
+    async def get_rate_quotes(self) -> Sequence[Tuple[str, str, date, Decimal]]:
+        """Gets (base, target, rate_date, conversion_rate) for every dated rate."""
+        query = dedent(
+            """
+            SELECT base_currency, target_currency, rate_date, conversion_rate
+            FROM public.daily_rates
+            WHERE rate_date IS NOT NULL AND conversion_rate IS NOT NULL
+            """
+        )
+        rows = await self._fetch(query)
+        return [tuple(row) for row in rows]
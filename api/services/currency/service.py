@@ -15,22 +15,68 @@
 """Services for interacting with currency conversion entries."""
 # from typing import Optional, Sequence, Union
 # from uuid import UUID
-from datetime import date
+import asyncio
+from datetime import date, datetime
 from collections import defaultdict
-from typing import Optional, Sequence, Tuple, Dict, List, Any
+from itertools import islice
+import time
+from decimal import Decimal
+from typing import Optional, Sequence, Tuple, Dict, Iterable, List, Any, Union
+
+import numpy as np
+from pydantic import ValidationError
+
 from api.services.audit.service import AuditService
 from api.services.audit.models import AuditLog
-from api.services.currency.models import DailyRate, PatchDailyRateRequest
+from api.services.currency.models import (
+    DailyRate,
+    DailyRateImportBatch,
+    DailyRateImportReport,
+    PatchDailyRateRequest,
+)
+from api.services.currency.rates import PIVOT_CURRENCY, RateTable
 from api.services.currency.repository.postgres import PostgresCurrencyRepository
 
 
 class CurrencyService:
     """Service for interfacing with the currency conversion repository."""
 
+    # Other workers may write rates, so reload the table at least this often
+    RATE_TABLE_MAX_AGE = 600
+
     def __init__(self):
         """Initializes with a configured repository."""
         self._audit_svc = AuditService()
         self._repo = PostgresCurrencyRepository()
+        self._rate_table: Optional[RateTable] = None
+        self._rate_table_loaded_at = 0.0
+
+    async def get_rate_table(self) -> RateTable:
+        """Returns the in-memory rate table, loading it when missing or old."""
+        age = time.monotonic() - self._rate_table_loaded_at
+        if self._rate_table is None or age > self.RATE_TABLE_MAX_AGE:
+            self._rate_table = RateTable.from_quotes(await self._repo.get_rate_quotes())
+            self._rate_table_loaded_at = time.monotonic()
+        return self._rate_table
+
+    def invalidate_rate_table(self) -> None:
+        """Forces the next conversion to reload rates."""
+        self._rate_table = None
+
+    async def convert(
+        self,
+        amounts: Union[Sequence[float], np.ndarray],
+        currencies: Sequence[str],
+        dates: Union[Sequence[date], np.ndarray],
+        to_currency: str = PIVOT_CURRENCY,
+    ) -> np.ndarray:
+        """Converts amounts from their currencies on their dates to to_currency.
+
+        Uses the nearest prior daily rate and converts through USD; entries
+        without a usable rate come back as NaN.
+        """
+        table = await self.get_rate_table()
+        return table.convert(amounts, currencies, dates, to_currency)
 
     async def get_rates_date(self, rate_date: date) -> Sequence[DailyRate]:
         """Returns DailyRate objects for a given date."""
@@ -38,7 +84,121 @@ class CurrencyService:
 
     async def add_rates(self, daily_rates: Sequence[DailyRate]) -> int:
         """Inserts DailyRate objects."""
-        return await self._repo.add_rates(daily_rates)
+        added = await self._repo.add_rates(daily_rates)
+        self.invalidate_rate_table()
+        return added
+
+    async def import_rates(
+        self, rows: Iterable[dict], updated_by: str, batch_size: int = 10000
+    ) -> DailyRateImportReport:
+        """Validates and merges daily rate rows in batches, reporting on each batch.
+
+        Rows are consumed lazily, so a CSV streams straight through. Keys are
+        DailyRate field names, empty strings count as missing and a missing
+        rate_time defaults to midnight.
+        """
+        report = DailyRateImportReport()
+        # Rates beyond the column's precision would abort a batch's merge
+        max_rate = await self._repo.get_max_conversion_rate()
+        started = time.perf_counter()
+        numbered_rows = enumerate(rows, start=1)
+        pending: Optional[tuple] = None
+
+        async def finish_batch(
+            merging: asyncio.Task, batch_rows: int, errors: list, batch_started: float
+        ) -> None:
+            inserted, updated = await merging
+            batch_report = DailyRateImportBatch(
+                batch_number=len(report.batches) + 1,
+                rows=batch_rows,
+                inserted=inserted,
+                updated=updated,
+                rejected=len(errors),
+                errors=errors,
+                seconds=time.perf_counter() - batch_started,
+            )
+            report.batches.append(batch_report)
+            report.seconds = time.perf_counter() - started
+            print(
+                f"Batch {batch_report.batch_number}: {inserted} inserted, "
+                f"{updated} updated, {len(errors)} rejected - "
+                f"{report.rows} rows so far ({report.rows_per_second:.0f} rows/sec)"
+            )
+
+        def next_batch() -> Tuple[int, List[DailyRate], List[str]]:
+            batch = list(islice(numbered_rows, batch_size))
+            return len(batch), *self._validate_rate_rows(batch, updated_by, max_rate)
+
+        try:
+            while True:
+                batch_started = time.perf_counter()
+                # Reading and validating on a thread leaves the event loop free
+                # to run the previous batch's merge in the meantime
+                batch_rows, daily_rates, errors = await asyncio.to_thread(next_batch)
+                if not batch_rows:
+                    break
+                # Wait for the previous merge so batches still apply in order
+                if pending is not None:
+                    await finish_batch(*pending)
+                merging = asyncio.create_task(self._merge_rates(daily_rates))
+                pending = (merging, batch_rows, errors, batch_started)
+            if pending is not None:
+                await finish_batch(*pending)
+                pending = None
+        finally:
+            if pending is not None:
+                pending[0].cancel()
+            if report.inserted or report.updated:
+                self.invalidate_rate_table()
+        return report
+
+    async def _merge_rates(self, daily_rates: Sequence[DailyRate]) -> Tuple[int, int]:
+        if not daily_rates:
+            return 0, 0
+        return await self._repo.copy_daily_rates(daily_rates)
+
+    @staticmethod
+    def _validate_rate_rows(
+        batch: Sequence[Tuple[int, dict]],
+        updated_by: str,
+        max_rate: Optional[Decimal] = None,
+    ) -> Tuple[List[DailyRate], List[str]]:
+        """Validates numbered rows into DailyRates, collecting errors by row.
+
+        Rates above max_rate, once rounded to its decimal places, are rejected.
+        """
+        # The database rounds half away from zero to max_rate's places
+        overflow = (
+            max_rate + Decimal(1).scaleb(max_rate.as_tuple().exponent) / 2
+            if max_rate is not None
+            else None
+        )
+        # One timestamp per batch saves a clock read per row
+        updated_at = datetime.now()
+        daily_rates, errors = [], []
+        for row_number, row in batch:
+            values = {
+                key: value.strip()
+                for key, value in row.items()
+                if key and value and value.strip()
+            }
+            values.setdefault("rate_time", "00:00")
+            values.setdefault("updated_by", updated_by)
+            values.setdefault("updated_at", updated_at)
+            try:
+                daily_rate = DailyRate(**values)
+            except ValidationError as e:
+                reasons = "; ".join(
+                    f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                    for error in e.errors()
+                )
+                errors.append(f"row {row_number}: {reasons}")
+                continue
+            if overflow is not None and abs(daily_rate.conversion_rate) >= overflow:
+                errors.append(f"row {row_number}: conversion_rate: at most {max_rate}")
+                continue
+            daily_rates.append(daily_rate)
+        return daily_rates, errors
 
     async def get_currency_for_date(
         self, target_currency: str, rate_date: date, base_currency: str = "USD"
@@ -53,9 +213,20 @@ class CurrencyService:
     ) -> dict:
         """Adds or edits daily rates in the repository."""
         messages = []
-        prepared_data = [
-            await self.prepare_daily_rate_data(rate_request, messages)
+        # One request per key; a later request for the same rate wins
+        requests_by_key = {
+            self._rate_key(rate_request): rate_request
             for rate_request in daily_rate_requests
+        }
+        existing_rates = {
+            self._rate_key(rate): rate
+            for rate in await self._repo.get_rates_for_keys(list(requests_by_key))
+        }
+        prepared_data = [
+            self.prepare_daily_rate_data(
+                rate_request, existing_rates.get(key), messages
+            )
+            for key, rate_request in requests_by_key.items()
         ]
         valid_data = [data for data in prepared_data if data[0] is not None]
         if valid_data:
@@ -75,6 +246,7 @@ class CurrencyService:
             await self.process_audit_logs(
                 [log for log in audit_logs if log is not None]
             )
+            self.invalidate_rate_table()
         else:
             audit_logs = []
         summarized_audit_logs = self.summarize_audit_logs(audit_logs)
@@ -104,20 +276,23 @@ class CurrencyService:
 
         return summary_dict
 
-    async def prepare_daily_rate_data(
-        self, rate_request: PatchDailyRateRequest, messages: list[str]
-    ) -> Tuple[Optional[DailyRate], Optional[AuditLog]]:
-        """Resolves and prepares an agency patch for insertion or update."""
-        # Check if this agency exists and needs updating
-
-        # Check for a name conflict with a different agency
-        existing_rate = await self.get_currency_for_date(
-            rate_request.target_currency,
-            rate_request.rate_date,
-            rate_request.base_currency,
+    @staticmethod
+    def _rate_key(
+        rate: Union[DailyRate, PatchDailyRateRequest]
+    ) -> Tuple[str, str, date]:
+        return (
+            rate.base_currency.strip(),
+            rate.target_currency.strip(),
+            rate.rate_date,
         )
-        print(rate_request)
 
+    def prepare_daily_rate_data(
+        self,
+        rate_request: PatchDailyRateRequest,
+        existing_rate: Optional[DailyRate],
+        messages: list[str],
+    ) -> Tuple[Optional[DailyRate], Optional[AuditLog]]:
+        """Diffs a rate request against the stored rate for the same key."""
         if existing_rate:
             if (
                 rate_request.target_currency == existing_rate.target_currency
@@ -16,13 +16,10 @@
 import datetime
 import uuid
 from abc import ABC, abstractmethod
-from typing import Sequence
+from typing import List, Optional, Sequence, Tuple
 from api.services.summaries.models import AccommodationLogSummary
 
-from api.services.quality.models import (
-    FlaggedTrip,
-    PotentialTrip,
-)
+from api.services.quality.models import FlaggedTrip
 
 
 class QualityRepository(ABC):
@@ -30,8 +27,17 @@ class QualityRepository(ABC):
 
     # PotentialTrip
     @abstractmethod
-    async def get_unmatched_accommodation_logs(self) -> PotentialTrip:
-        """Gets accommodation logs without an associated trip_id."""
+    async def get_unmatched_accommodation_logs(
+        self,
+        after: Optional[Tuple[str, datetime.date, uuid.UUID]] = None,
+        limit: int = 5000,
+    ) -> List[AccommodationLogSummary]:
+        """Gets a page of accommodation logs without a trip or a flagged trip."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_progress_counts(self) -> Sequence[tuple]:
+        """Counts confirmed and potential trips by start year and destination."""
         raise NotImplementedError
 
     @abstractmethod
@@ -17,10 +17,10 @@ import datetime
 import json
 from uuid import UUID
 from abc import ABC, abstractmethod
-from typing import Sequence, List, Set
+from typing import Optional, Sequence, List, Tuple
 from textwrap import dedent
 
-from api.adapters.repository import PostgresMixin
+from api.adapters.repository import PostgresMixin, replica_read
 from api.services.quality.repository import QualityRepository
 from api.services.summaries.models import AccommodationLogSummary
 
@@ -34,16 +34,26 @@ class PostgresQualityRepository(PostgresMixin, QualityRepository):
     """Abstract repository for data summary models."""
 
     # PotentialTrip
+    @replica_read
     async def get_unmatched_accommodation_logs(
-        self, exclude_ids: Set[UUID]
+        self,
+        after: Optional[Tuple[str, datetime.date, UUID]] = None,
+        limit: int = 5000,
     ) -> List[AccommodationLogSummary]:
-        """Gets accommodation logs without an associated Trip ID."""
-        pool = await self._get_pool()
-        if exclude_ids:
-            excluded_ids_string = ",".join(f"'{str(id)}'" for id in exclude_ids)
-            where_clause = f"AND al.id NOT IN ({excluded_ids_string})"
-        else:
-            where_clause = ""
+        """Gets a page of accommodation logs without a trip or a flagged trip.
+
+        Logs come in (traveler, date_in, id) order, travelers compared without
+        case or surrounding spaces. Pass the last log's (primary_traveler,
+        date_in, id) as after to get the next page.
+        """
+        args: list = [limit]
+        keyset = ""
+        if after is not None:
+            keyset = (
+                "AND (lower(trim(al.primary_traveler)), al.date_in, al.id)"
+                " > (lower(trim($2::text)), $3::date, $4::uuid)"
+            )
+            args.extend(after)
         query = dedent(
             f"""
             SELECT
@@ -79,31 +89,107 @@ class PostgresQualityRepository(PostgresMixin, QualityRepository):
             LEFT JOIN public.agencies a ON al.agency_id = a.id
             LEFT JOIN public.countries c ON p.country_id = c.id
             LEFT JOIN public.core_destinations cd ON p.core_destination_id = cd.id
-            WHERE al.trip_id IS NULL {where_clause}
-            ORDER BY al.primary_traveler ASC, al.date_in ASC
+            WHERE al.trip_id IS NULL {keyset}
+                AND NOT EXISTS (
+                    SELECT 1
+                    FROM public.potential_trips pt
+                    WHERE pt.accommodation_log_ids @> ARRAY[al.id]
+                )
+            ORDER BY lower(trim(al.primary_traveler)), al.date_in, al.id
+            LIMIT $1
         """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+        records = await self._fetch(query, *args)
+        accommodation_log_summaries = [
+            AccommodationLogSummary(**record) for record in records
+        ]
+        return accommodation_log_summaries
+
+    @replica_read
+    async def get_progress_counts(self) -> Sequence[tuple]:
+        """Counts confirmed and potential trips by start year and destination.
+
+        Returns (status, start_year, core_destination, trips) rows, where
+        status is confirmed or potential. Potential trips are the flagged
+        trips plus the unmatched, unflagged logs grouped the way
+        QualityService.find_potential_trips groups them: per traveler, a
+        stay starting within 3 days of the previous stay's end continues
+        the trip. A trip's destination is its most common log destination,
+        ties going to the one stayed at first.
+        """
+        query = dedent(
+            """
+            WITH flagged AS (
+                SELECT
+                    pt.id::text AS trip_key,
+                    unnest(pt.accommodation_log_ids) AS log_id
+                FROM public.potential_trips pt
+            ),
+            logs AS (
+                SELECT al.id, al.trip_id, al.primary_traveler, al.date_in,
+                    al.date_out, cd.name AS destination
+                FROM public.accommodation_logs al
+                LEFT JOIN public.properties p ON al.property_id = p.id
+                LEFT JOIN public.core_destinations cd
+                    ON p.core_destination_id = cd.id
+            ),
+            unmatched AS (
+                SELECT
+                    l.*,
+                    lower(trim(l.primary_traveler)) AS traveler,
+                    lag(l.date_out) OVER (
+                        PARTITION BY lower(trim(l.primary_traveler))
+                        ORDER BY l.date_in
+                    ) AS previous_out
+                FROM logs l
+                WHERE l.trip_id IS NULL
+                    AND NOT EXISTS (SELECT 1 FROM flagged f WHERE f.log_id = l.id)
+            ),
+            trip_logs AS (
+                SELECT 'confirmed' AS status, trip_id::text AS trip_key,
+                    date_in, destination
+                FROM logs
+                WHERE trip_id IS NOT NULL
+                UNION ALL
+                SELECT 'potential', f.trip_key, l.date_in, l.destination
+                FROM flagged f
+                JOIN logs l ON l.id = f.log_id
+                UNION ALL
+                SELECT
+                    'potential',
+                    traveler || '/' || COUNT(*) FILTER (
+                        WHERE previous_out IS NULL OR previous_out + 3 < date_in
+                    ) OVER (PARTITION BY traveler ORDER BY date_in ROWS UNBOUNDED PRECEDING),
+                    date_in,
+                    destination
+                FROM unmatched
+            ),
+            destinations AS (
+                SELECT status, trip_key, destination,
+                    COUNT(*) AS logs, MIN(date_in) AS first_in
+                FROM trip_logs
+                GROUP BY status, trip_key, destination
+            ),
+            trips AS (
+                SELECT DISTINCT ON (status, trip_key)
+                    status,
+                    destination,
+                    MIN(first_in) OVER (PARTITION BY status, trip_key) AS start_date
+                FROM destinations
+                ORDER BY status, trip_key, logs DESC, first_in, destination
             )
-            async with con.transaction():
-                records = await con.fetch(
-                    query
-                )  # Use fetch to retrieve all matching rows
-                accommodation_log_summaries = [
-                    AccommodationLogSummary(**record) for record in records
-                ]
-                return accommodation_log_summaries
+            SELECT status, EXTRACT(YEAR FROM start_date)::int AS start_year,
+                destination, COUNT(*) AS trips
+            FROM trips
+            GROUP BY status, start_year, destination
+            """
+        )
+        rows = await self._fetch(query)
+        return [tuple(row) for row in rows]
 
     async def add_flagged_trip(self, flagged_trip: FlaggedTrip):
         """Adds a FlaggedTrip to the repo."""
         pool = await self._get_pool()
-        # Convert list of UUIDs to a comma-separated string
-        accommodation_log_ids_str = ",".join(
-            str(id) for id in flagged_trip.accommodation_log_ids
-        )
-
         query = dedent(
             """
             INSERT INTO public.potential_trips (
@@ -124,7 +210,7 @@ class PostgresQualityRepository(PostgresMixin, QualityRepository):
                 args = [
                     flagged_trip.id,
                     flagged_trip.trip_name,
-                    accommodation_log_ids_str,
+                    flagged_trip.accommodation_log_ids,
                     flagged_trip.review_status,
                     flagged_trip.review_notes,
                     flagged_trip.reviewed_at,
@@ -137,9 +223,9 @@ class PostgresQualityRepository(PostgresMixin, QualityRepository):
 
                 print("Successfully added potential trip")
 
+    @replica_read
     async def get_flagged_trips(self) -> Sequence[FlaggedTrip]:
         """Gets FlaggedTrips in the repository."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT
@@ -147,36 +233,22 @@ class PostgresQualityRepository(PostgresMixin, QualityRepository):
             FROM public.potential_trips
         """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(query)
-                flagged_trips = []
-                for record in records:
-                    # Convert the immutable asyncpg.Record to a mutable dictionary
-                    mutable_record = dict(record)
-                    # Split the string and convert each UUID string to a UUID object
-                    log_ids = [
-                        UUID(id_str.strip())
-                        for id_str in mutable_record["accommodation_log_ids"].split(",")
-                    ]
-                    # Update the dictionary with the new list of UUIDs
-                    mutable_record["accommodation_log_ids"] = log_ids
-                    flagged_trip = FlaggedTrip(**mutable_record)
-                    flagged_trips.append(flagged_trip)
-                return flagged_trips
+        records = await self._fetch(query)
+        flagged_trips = []
+        for record in records:
+            flagged_trip = FlaggedTrip(**record)
+            flagged_trips.append(flagged_trip)
+        return flagged_trips
 
     async def delete_related_potential_trips(self, accommodation_log_ids: List[UUID]):
         """Deletes potential trips that have any of the specified accommodation log IDs."""
         pool = await self._get_pool()
-        log_ids_str = ",".join(
-            f"'{str(id)}'" for id in accommodation_log_ids
-        )  # Prepare string for SQL query
-        query = f"""
-        DELETE FROM potential_trips
-        WHERE string_to_array(accommodation_log_ids, ',')::uuid[] && ARRAY[{log_ids_str}]::uuid[];
-        """
+        # && is answered by the GIN index on accommodation_log_ids
+        query = dedent(
+            """
+            DELETE FROM public.potential_trips
+            WHERE accommodation_log_ids && $1::uuid[];
+            """
+        )
         async with pool.acquire() as con:
-            await con.execute(query)
+            await con.execute(query, list(accommodation_log_ids))
@@ -16,7 +16,17 @@
 from asyncio import gather
 from datetime import datetime, timedelta, date
 from collections import defaultdict
-from typing import Optional, Sequence, Union, Tuple, Dict, List, Any, cast
+from typing import (
+    Optional,
+    Sequence,
+    Union,
+    Tuple,
+    Dict,
+    List,
+    Any,
+    cast,
+    AsyncIterator,
+)
 from uuid import UUID
 import time
 from api.services.audit.service import AuditService
@@ -33,32 +43,28 @@ from api.services.quality.models import (
 )
 from api.services.quality.repository.postgres import PostgresQualityRepository
 
+# Unmatched logs are read in pages of this many rows
+UNMATCHED_PAGE_SIZE = 5000
+
 
 class QualityService:
     """Service for interfacing with the data quality of travel entries."""
 
+    # Logs also change outside trip matching, so recount at least this often
+    PROGRESS_MAX_AGE = 60
+
     def __init__(self):
         """Initializes with a configured repository."""
         self._summary_svc = SummaryService()
         self._travel_svc = TravelService()
         self._audit_svc = AuditService()
         self._repo = PostgresQualityRepository()
+        self._progress: Optional[MatchingProgress] = None
+        self._progress_loaded_at = 0.0
 
     async def find_potential_trips(self) -> List[PotentialTrip]:
         """Finds unmatched entries and groups them into trips."""
         flagged_trips = await self._repo.get_flagged_trips()
-        flagged_log_ids = {
-            log_id for trip in flagged_trips for log_id in trip.accommodation_log_ids
-        }
-
-        start_time = time.time()
-        unmatched = await self._repo.get_unmatched_accommodation_logs(
-            exclude_ids=flagged_log_ids
-        )
-        print(
-            f"got unmatched accommodation logs in {float(time.time() - start_time)} seconds"
-        )
-
         potential_trips = [
             trip
             for trip in await gather(
@@ -67,47 +73,43 @@ class QualityService:
             if trip is not None
         ]
 
-        # Sort logs by primary traveler and date_in in descending order
-        sorted_unmatched = sorted(
-            unmatched,
-            key=lambda x: (x.primary_traveler.lower().strip(), x.date_in.toordinal()),
-        )
-
-        # Initialize a dictionary to keep track of the last log per traveler for easy reference
-        last_log_per_traveler = {}
-
-        for log in sorted_unmatched:
-            should_append = False
-
-            # Check if this log can continue a trip from the same traveler
-            if log.primary_traveler.lower().strip() in last_log_per_traveler:
-                last_log = last_log_per_traveler[log.primary_traveler.lower().strip()]
-                # Allow a gap of up to 3 days; consider large gaps as a new trip
-                if last_log.date_out + timedelta(days=3) >= log.date_in:
-                    should_append = True
-
-            if should_append:
-                # Find the right trip to append this log, ensure the dates are close enough
-                for trip in reversed(
-                    potential_trips
-                ):  # Reverse to optimize search, likely near the end
-                    if (
-                        trip.accommodation_logs[-1].primary_traveler.lower().strip()
-                        == log.primary_traveler.lower().strip()
-                        and trip.accommodation_logs[-1].date_out + timedelta(days=3)
-                        >= log.date_in
-                    ):
-                        trip.accommodation_logs.append(log)
-                        break
+        start_time = time.time()
+        # Logs stream in traveler then date_in order, so a log either continues
+        # the traveler's latest trip or starts a new one
+        current_trip: Optional[PotentialTrip] = None
+        current_traveler = None
+        async for log in self.iter_unmatched_accommodation_logs():
+            traveler = log.primary_traveler.lower().strip()
+            last_log = current_trip.accommodation_logs[-1] if current_trip else None
+            # Allow a gap of up to 3 days; consider large gaps as a new trip
+            if (
+                traveler == current_traveler
+                and last_log.date_out + timedelta(days=3) >= log.date_in
+            ):
+                current_trip.accommodation_logs.append(log)
             else:
-                # Start a new potential trip and set the trip name based on the log's details
-                potential_trips.append(PotentialTrip(accommodation_logs=[log]))
-
-            # Update the last log for this traveler, or set it if it's the first log we're seeing for this traveler
-            last_log_per_traveler[log.primary_traveler.lower().strip()] = log
+                current_trip = PotentialTrip(accommodation_logs=[log])
+                current_traveler = traveler
+                potential_trips.append(current_trip)
+        print(
+            f"grouped unmatched accommodation logs in {float(time.time() - start_time)} seconds"
+        )
 
         return potential_trips
 
+    async def iter_unmatched_accommodation_logs(
+        self, page_size: int = UNMATCHED_PAGE_SIZE
+    ) -> AsyncIterator[AccommodationLogSummary]:
+        """Yields logs without a trip or a flagged trip, one page at a time."""
+        after = None
+        while True:
+            page = await self._repo.get_unmatched_accommodation_logs(after, page_size)
+            for log in page:
+                yield log
+            if len(page) < page_size:
+                return
+            after = (page[-1].primary_traveler, page[-1].date_in, page[-1].id)
+
     async def get_trip_with_logs(self, row):
         # Fetch log summaries asynchronously and flatten the results
         nested_log_summaries = await gather(
@@ -150,6 +152,7 @@ class QualityService:
         await self._repo.delete_related_potential_trips(
             trip_request.accommodation_log_ids
         )
+        self.invalidate_progress()
 
         # create an audit log for the trip data
         audit_log = AuditLog(
@@ -180,6 +183,7 @@ class QualityService:
             updated_by=trip_request.updated_by,
         )
         await self._repo.add_flagged_trip(new_trip)
+        self.invalidate_progress()
 
         audit_log = AuditLog(
             table_name="potential_trips",
@@ -424,24 +428,26 @@ class QualityService:
         return False
 
     async def get_progress(self) -> MatchingProgress:
-        potential_trips = await self.find_potential_trips()
-        confirmed_trips = await self._summary_svc.get_all_trips()
-
+        """Returns matching progress, recounting when stale or after a change."""
+        age = time.monotonic() - self._progress_loaded_at
+        if self._progress is None or age > self.PROGRESS_MAX_AGE:
+            self._progress = await self.count_progress()
+            self._progress_loaded_at = time.monotonic()
+        return self._progress
+
+    def invalidate_progress(self) -> None:
+        """Forces the next progress request to recount."""
+        self._progress = None
+
+    async def count_progress(self) -> MatchingProgress:
+        """Counts confirmed and potential trips by year and destination bucket."""
         year_data = defaultdict(lambda: {"confirmed": 0, "potential": 0})
         destination_data = defaultdict(lambda: {"confirmed": 0, "potential": 0})
-        for trip in potential_trips:
-            if trip.start_date:
-                year = self.categorize_year(trip.start_date.year)
-                year_data[year]["potential"] += 1
-            destination = self.categorize_destination(trip.core_destination)
-            destination_data[destination]["potential"] += 1
-
-        for trip in confirmed_trips:
-            if trip.start_date:
-                year = self.categorize_year(trip.start_date.year)
-                year_data[year]["confirmed"] += 1
-            destination = self.categorize_destination(trip.core_destination)
-            destination_data[destination]["confirmed"] += 1
+        counts = await self._repo.get_progress_counts()
+        for status, start_year, destination, trips in counts:
+            if start_year is not None:
+                year_data[self.categorize_year(start_year)][status] += trips
+            destination_data[self.categorize_destination(destination)][status] += trips
 
         # Create progress data for overall, years, and destinations
         total_confirmed = sum(data["confirmed"] for data in year_data.values())
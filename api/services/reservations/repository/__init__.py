@@ -26,6 +26,11 @@ class ReservationRepository(ABC):
     async def add(self, reservations: Iterable[Reservation]) -> None:
         """Adds an iterable of Reservation models to the repository."""
 
+    @abstractmethod
+    async def refresh_client_stats(self) -> int:
+        """Rebuilds every client's reservation stats, returning rows written."""
+        raise NotImplementedError
+
     @abstractmethod
     async def get(self) -> Iterable[Reservation]:
         """Returns Reservations in the repository."""
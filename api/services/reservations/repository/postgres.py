@@ -22,6 +22,46 @@ from api.adapters.repository import PostgresMixin
 from api.services.reservations.repository import ReservationRepository
 from api.services.reservations.models import Reservation
 
+# Each refresh re-aggregates from its own snapshot, so two transactions
+# touching one client would each miss the other's insert. Locking the
+# clients, in hash order and before the refresh statement takes its snapshot,
+# makes the later refresh see the earlier commit.
+LOCK_CLIENTS = dedent(
+    """
+    SELECT pg_advisory_xact_lock(key)
+    FROM (
+        SELECT DISTINCT hashtext(client_id::text) AS key
+        FROM unnest($1::uuid[]) AS client_id
+        ORDER BY key
+    ) AS keys
+    """
+)
+REFRESH_CLIENT_STATS = dedent(
+    """
+    INSERT INTO public.client_reservation_stats (
+        client_id, earliest_trip, latest_trip, num_trips, total_trip_spend,
+        avg_trip_spend
+    )
+    SELECT
+        client_id,
+        MIN(start_date),
+        MAX(start_date),
+        COUNT(*),
+        SUM(cost),
+        AVG(cost)
+    FROM public.reservations
+    WHERE $1::uuid[] IS NULL OR client_id = ANY($1::uuid[])
+    GROUP BY client_id
+    ON CONFLICT (client_id) DO UPDATE SET
+        earliest_trip = EXCLUDED.earliest_trip,
+        latest_trip = EXCLUDED.latest_trip,
+        num_trips = EXCLUDED.num_trips,
+        total_trip_spend = EXCLUDED.total_trip_spend,
+        avg_trip_spend = EXCLUDED.avg_trip_spend,
+        updated_at = CURRENT_TIMESTAMP;
+    """
+)
+
 
 class PostgresReservationRepository(PostgresMixin, ReservationRepository):
     """Implementation of the ReservationsRepository ABC for Postgres."""
@@ -58,21 +98,36 @@ class PostgresReservationRepository(PostgresMixin, ReservationRepository):
                     )
                     for res in reservations
                 ]
+                client_ids = list({arg[1] for arg in args})
+                await con.execute(LOCK_CLIENTS, client_ids)
                 await con.executemany(query, args)
+                await con.execute(REFRESH_CLIENT_STATS, client_ids)
         print(
             f"Successfully added {len(args)} new Reservation record(s) to the repository."
         )
 
+    async def refresh_client_stats(self) -> int:
+        """Rebuilds every client's reservation stats, returning rows written.
+
+        Reconciles the stats with reservations loaded outside the repository.
+        """
+        pool = await self._get_pool()
+        async with pool.acquire() as con:
+            async with con.transaction():
+                # Waits out any add() that is mid-refresh before aggregating
+                await con.execute(
+                    "LOCK TABLE public.client_reservation_stats IN EXCLUSIVE MODE"
+                )
+                status = await con.execute(REFRESH_CLIENT_STATS, None)
+        return int(status.split()[-1])
+
     async def get(self) -> Sequence[Reservation]:
         """Returns all Reservation models in the repository."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.reservations
             """
         )
-        async with pool.acquire() as con:
-            async with con.transaction():
-                records = await con.fetch(query)
-                reservations = [Reservation(**record) for record in records]
-                return reservations
+        records = await self._fetch(query)
+        reservations = [Reservation(**record) for record in records]
+        return reservations
@@ -36,6 +36,10 @@ class ReservationService:
             reservations = [reservations]
         await self._repo.add(reservations)
 
+    async def refresh_client_stats(self) -> int:
+        """Rebuilds the per-client reservation stats from all reservations."""
+        return await self._repo.refresh_client_stats()
+
     async def get(
         self,
     ) -> Sequence[Reservation]:
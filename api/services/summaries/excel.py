@@ -0,0 +1,301 @@
+# Copyright 2024 SH
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Builds formatted Excel reports, in worker processes when configured."""
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+from openpyxl.styles import Alignment, Font, Border, Side, PatternFill
+from openpyxl.utils import get_column_letter
+from openpyxl.cell.cell import MergedCell
+
+FONT_NAME = "Brandon Grotesque"
+
+
+def is_numeric(value):
+    """
+    Determines if a given value is numeric.
+    Returns True if value is an integer or float, or a string that can be converted to a float.
+    """
+    if isinstance(value, (int, float)):
+        return True
+    if isinstance(value, str):
+        value = value.strip()
+        if value.isdigit():
+            return True
+        try:
+            float(value)
+            return True
+        except ValueError:
+            return False
+    return False
+
+
+def build_workbook(
+    columns: dict,
+    report_title: str = "Bed Night Report",
+    include_total_column: bool = False,
+) -> bytes:
+    """Writes columns of values into a formatted workbook and returns its bytes.
+
+    Takes plain lists keyed by header rather than a DataFrame, so it is cheap
+    to send to a worker process.
+    """
+    df = pd.DataFrame(columns)
+    excel_stream = BytesIO()
+    header_row = 3
+    tb_teal_fill = PatternFill(
+        start_color="0E9BAC", end_color="0E9BAC", fill_type="solid"
+    )
+    tb_white_font = "F2F0E7"
+
+    with pd.ExcelWriter(excel_stream, engine="openpyxl") as writer:
+        # Write the DataFrame starting from row 3 to leave space for title and subtitle
+        df.to_excel(writer, index=False, startrow=header_row - 1, sheet_name="Sheet1")
+        numeric_columns = df.select_dtypes(include=["number"]).columns.tolist()
+
+        sheet = writer.sheets["Sheet1"]
+
+        # Define the number of columns in the DataFrame
+        df_width = len(df.columns)
+        num_columns = df_width + 1 if include_total_column else df_width
+
+        # ----------------------------
+        # 1. Add Title (Row 1)
+        # ----------------------------
+        title_font = Font(name=FONT_NAME, bold=True, size=18, color=tb_white_font)
+        sheet.merge_cells(
+            start_row=1,
+            start_column=1,
+            end_row=1,
+            end_column=num_columns,
+        )
+        title_cell = sheet.cell(row=1, column=1, value=report_title)
+        title_cell.font = title_font
+        title_cell.fill = tb_teal_fill
+        title_cell.alignment = Alignment(horizontal="center", vertical="center")
+
+        # ----------------------------
+        # 2. Add Subtitle (Row 2)
+        # ----------------------------
+        subtitle_font = Font(name=FONT_NAME, size=14, color=tb_white_font)
+        current_datetime = datetime.now()
+        subtitle_text = f"Bed Nights as of {current_datetime.strftime('%B')} {current_datetime.day}, {current_datetime.year}"
+        sheet.merge_cells(
+            start_row=2, start_column=1, end_row=2, end_column=num_columns
+        )
+        subtitle_cell = sheet.cell(row=2, column=1, value=subtitle_text)
+        subtitle_cell.font = subtitle_font
+        subtitle_cell.fill = tb_teal_fill
+        subtitle_cell.alignment = Alignment(horizontal="center", vertical="center")
+
+        # ----------------------------
+        # 3. Format Headers (Row 4)
+        # ----------------------------
+
+        header_font = Font(name=FONT_NAME, bold=True, size=11)
+        if include_total_column:
+            max_col = num_columns  # Include an extra column for 'TOTAL'
+        else:
+            max_col = num_columns  # Only include existing columns
+
+        for col_num in range(1, max_col + 1):
+            if col_num <= num_columns:
+                # Zero-based indexing in pandas
+                if col_num == num_columns and include_total_column:
+                    header_value = "TOTAL"
+                else:
+                    header_value = df.columns[col_num - 1]
+            elif col_num == (num_columns - 1) and include_total_column:
+                # Last column when include_total_column is True
+                header_value = "TOTAL"
+
+            cell = sheet.cell(row=header_row, column=col_num)
+
+            if is_numeric(header_value):
+                # Convert to appropriate numeric type
+                if isinstance(header_value, float) or (
+                    isinstance(header_value, str) and "." in header_value
+                ):
+                    numeric_header = float(header_value)
+                    cell.value = numeric_header
+                    cell.number_format = "0.00"
+                else:
+                    numeric_header = int(float(header_value))
+                    cell.value = numeric_header
+                    cell.number_format = "0"
+
+                # Set alignment for numeric headers
+                cell.alignment = Alignment(horizontal="center", vertical="center")
+            else:
+                # For non-numeric headers, set as uppercase string
+                cell.value = str(header_value).upper()
+                cell.number_format = "General"
+
+                # Set alignment based on header content
+                if cell.value == "PROPERTY" and include_total_column:
+                    cell.alignment = Alignment(horizontal="left", vertical="center")
+                else:
+                    cell.alignment = Alignment(horizontal="center", vertical="center")
+
+            # Apply font styling
+            cell.font = header_font
+
+        # ----------------------------
+        # 4. Add TOTAL Column
+        # ----------------------------
+        total_col = num_columns
+        if include_total_column:
+            # total_col = num_columns + 1
+            sheet.cell(row=header_row, column=total_col, value="TOTAL").font = (
+                header_font
+            )
+            sheet.cell(row=header_row, column=total_col).alignment = Alignment(
+                horizontal="center", vertical="center"
+            )
+
+            # Populate TOTAL column with formulas
+            for row in range(header_row + 1, header_row + 1 + len(df)):
+                # Assuming numerical data starts from column 2 to (total_col -1)
+                sum_range = f"${get_column_letter(2)}${row}:${get_column_letter(num_columns-1)}${row}"
+                total_cell = sheet.cell(row=row, column=total_col)
+                total_cell.value = f"=SUM({sum_range})"
+                total_cell.font = Font(name=FONT_NAME, bold=True, size=11)
+                total_cell.alignment = Alignment(horizontal="center", vertical="center")
+
+        # ----------------------------
+        # 5. Add TOTAL Row
+        # ----------------------------
+        total_row = header_row + 1 + len(df)
+        sheet.cell(row=total_row, column=1, value="TOTAL").font = Font(
+            name=FONT_NAME, bold=True, size=11
+        )
+        sheet.cell(row=total_row, column=1).alignment = Alignment(
+            horizontal="right", vertical="center"
+        )
+        for col_num in range(2, total_col + 1):
+            if include_total_column and col_num == total_col:
+                # Grand total for TOTAL column
+                sum_range = f"${get_column_letter(col_num)}${header_row + 1}:${get_column_letter(col_num)}${total_row - 1}"
+                total_cell = sheet.cell(row=total_row, column=col_num)
+                total_cell.value = f"=SUM({sum_range})"
+                total_cell.font = Font(name=FONT_NAME, bold=True, size=11)
+            else:
+                column_name = df.columns[col_num - 1]
+                if column_name in numeric_columns:
+                    sum_range = f"${get_column_letter(col_num)}${header_row + 1}:${get_column_letter(col_num)}${total_row - 1}"
+                    total_cell = sheet.cell(row=total_row, column=col_num)
+                    total_cell.value = f"=SUM({sum_range})"
+                    total_cell.font = Font(name=FONT_NAME, bold=True, size=11)
+                else:
+                    total_cell = sheet.cell(row=total_row, column=col_num)
+                    total_cell.value = ""
+                    total_cell.font = Font(name=FONT_NAME, bold=False, size=11)
+            # Set alignment for all cells in TOTAL row
+            total_cell.alignment = Alignment(horizontal="center", vertical="center")
+
+        # ----------------------------
+        # 6. Apply Gridlines (Borders) to the Table
+        # ----------------------------
+        thin_border = Border(
+            left=Side(style="thin", color="000000"),
+            right=Side(style="thin", color="000000"),
+            top=Side(style="thin", color="000000"),
+            bottom=Side(style="thin", color="000000"),
+        )
+
+        for row in range(header_row, total_row + 2):
+            for col in range(1, num_columns + 1):
+                cell = sheet.cell(row=row, column=col)
+                cell.border = thin_border
+                if row == header_row:
+                    # Header cells already styled
+                    pass
+                elif row == total_row:
+                    # Total cells already styled
+                    pass
+                elif row >= header_row + 1 and row < total_row and col != total_col:
+                    # Table data cells
+                    cell.font = Font(name=FONT_NAME, size=11)
+                    column_name = df.columns[col - 1]
+                    if column_name in numeric_columns:
+                        cell.alignment = Alignment(
+                            horizontal="center", vertical="center"
+                        )
+                        cell.number_format = "General"
+                elif include_total_column and col == total_col:
+                    # TOTAL column cells
+                    cell.font = Font(name=FONT_NAME, bold=True, size=11)
+
+        # ----------------------------
+        # 7. Set Column Widths
+        # ----------------------------
+        for col in sheet.columns:
+            max_length = 0
+            column = None  # Initialize the column variable
+
+            # Find the first non-merged cell in the column to get the column letter
+            for cell in col:
+                if not isinstance(cell, MergedCell):
+                    column = cell.column_letter
+                    break
+
+            if column is None:
+                # All cells in the column are merged; skip adjusting this column
+                continue
+
+            for cell in col:
+                if isinstance(cell, MergedCell):
+                    # Skip MergedCell objects
+                    continue
+                try:
+                    cell_value = str(cell.value) if cell.value is not None else ""
+                    cell_length = len(cell_value)
+                    if cell_length > max_length:
+                        max_length = cell_length
+                except:
+                    pass
+            adjusted_width = max_length + 2  # Adding extra space for readability
+            sheet.column_dimensions[column].width = adjusted_width
+        # ----------------------------
+        # 8. Add Final Footer (Optional)
+        # ----------------------------
+        footer_row = total_row + 1
+        sheet.cell(row=footer_row, column=1, value="Travel Beyond Confidential")
+        footer_font = Font(
+            name=FONT_NAME,
+            bold=True,
+            size=14,
+            color=tb_white_font,
+        )
+        footer_alignment = Alignment(horizontal="center", vertical="center")
+
+        sheet.merge_cells(
+            start_row=footer_row,
+            start_column=1,
+            end_row=footer_row,
+            end_column=total_col,
+        )
+        footer_cell = sheet.cell(row=footer_row, column=1)
+        footer_cell.font = footer_font
+        footer_cell.fill = tb_teal_fill
+        footer_cell.alignment = footer_alignment
+        footer_cell.border = thin_border
+
+        for col_num in range(1, total_col + 1):
+            cell = sheet.cell(row=footer_row, column=col_num)
+            cell.border = thin_border
+
+    return excel_stream.getvalue()
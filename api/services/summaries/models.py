@@ -228,6 +228,28 @@ class BedNightReport(BaseModel):
     calculations: ReportAggregations
 
 
+class RelatedLogImpact(BaseModel):
+    """How many accommodation logs a change would affect, with a small sample."""
+
+    affected_count: int
+    count_capped: bool
+    sample: List[AccommodationLogSummary] = []
+
+
+class PotentialDuplicate(BaseModel):
+    """Two accommodation logs that book the same traveler on the same nights."""
+
+    traveler: str
+    overlap_days: int
+    first: AccommodationLogSummary
+    second: AccommodationLogSummary
+
+    def to_json(self, **kwargs):
+        """Convert the model to a dict, then serialize the dict using the custom encoder."""
+        model_dict = self.dict()
+        return json.dumps(model_dict, default=custom_json_encoder, **kwargs)
+
+
 class Overlap(BaseModel):
     """Accommodation logs that overlap between two travelers"""
 
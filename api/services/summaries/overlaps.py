@@ -0,0 +1,96 @@
+# Copyright 2024 SH
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Sweep-line detection of overlapping stays."""
+
+import heapq
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Iterable, Iterator, Mapping, Tuple
+
+from api.services.summaries.models import AccommodationLogSummary, PotentialDuplicate
+
+
+def overlapping_pairs(
+    stays: Iterable[Mapping], group_key: str = "property_id"
+) -> Iterator[Tuple[Mapping, Mapping]]:
+    """Yields every pair of stays in the same group whose nights overlap.
+
+    Stays need `id`, `date_in` and `date_out` keys. Each group is swept in
+    date_in order while a heap keyed on date_out retires stays that have
+    already checked out, so a stay is only compared with the stays still in
+    house when it checks in. Each pair is yielded once, lower id first.
+    """
+    groups = defaultdict(list)
+    for stay in stays:
+        groups[stay[group_key]].append(stay)
+
+    for group in groups.values():
+        group.sort(key=lambda stay: stay["date_in"])
+        in_house: list = []
+        for seq, stay in enumerate(group):
+            while in_house and in_house[0][0] <= stay["date_in"]:
+                heapq.heappop(in_house)
+            # Everything left in house checks out after this stay checks in
+            for _, _, other in in_house:
+                if stay["date_out"] > other["date_in"]:
+                    if other["id"] < stay["id"]:
+                        yield other, stay
+                    else:
+                        yield stay, other
+            heapq.heappush(in_house, (stay["date_out"], seq, stay))
+
+
+def overlap_days(first: Mapping, second: Mapping) -> int:
+    """Returns the number of nights two stays share."""
+    shared = min(first["date_out"], second["date_out"]) - max(
+        first["date_in"], second["date_in"]
+    )
+    return max(0, shared.days)
+
+
+def normalize_traveler(name: str) -> str:
+    """Folds case, accents, punctuation and spacing out of a traveler name."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return "/".join(
+        " ".join(re.findall(r"[a-z0-9]+", part))
+        for part in stripped.casefold().split("/")
+    )
+
+
+def find_duplicate_stays(
+    logs: Iterable[AccommodationLogSummary],
+) -> Iterator[PotentialDuplicate]:
+    """Yields pairs of logs that put the same traveler somewhere on the same night."""
+    stays = (
+        {
+            "id": log.id,
+            "traveler": normalize_traveler(log.primary_traveler),
+            "date_in": log.date_in,
+            "date_out": log.date_out,
+            "log": log,
+        }
+        for log in logs
+    )
+    for first, second in overlapping_pairs(stays, group_key="traveler"):
+        nights = overlap_days(first, second)
+        if nights > 0:
+            yield PotentialDuplicate(
+                traveler=first["traveler"],
+                overlap_days=nights,
+                first=first["log"],
+                second=second["log"],
+            )
@@ -16,7 +16,7 @@
 import datetime
 from uuid import UUID
 from abc import ABC, abstractmethod
-from typing import Sequence
+from typing import Optional, Sequence
 from api.services.summaries.models import (
     AccommodationLogSummary,
     AgencySummary,
@@ -26,6 +26,7 @@ from api.services.summaries.models import (
     PortfolioSummary,
     PropertyDetailSummary,
     PropertySummary,
+    RelatedLogImpact,
     TripSummary,
 )
 from api.services.travel.models import Trip
@@ -57,6 +58,22 @@ class SummaryRepository(ABC):
         """Gets all AccommodationLog models in the repository, joined with their foreign keys."""
         raise NotImplementedError
 
+    @abstractmethod
+    async def get_accommodation_logs_by_date_range(
+        self,
+        start_date: Optional[datetime.date] = None,
+        end_date: Optional[datetime.date] = None,
+    ) -> Sequence[AccommodationLogSummary]:
+        """Gets AccommodationLogSummary models for stays touching the date range."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_related_log_impact(
+        self, identifier: UUID, identifier_type: str, count_cap: int, sample_size: int
+    ) -> RelatedLogImpact:
+        """Counts accommodation logs tied to a record, up to count_cap, with a sample."""
+        raise NotImplementedError
+
     @abstractmethod
     async def get_accommodation_logs_by_filter(
         self, filters: dict
@@ -13,12 +13,12 @@
 # limitations under the License.
 """Postgres Repository for travel-related data."""
 import datetime
-import json
 from uuid import UUID
-from typing import Sequence
+from typing import Optional, Sequence
 from textwrap import dedent
 
-from api.adapters.repository import PostgresMixin
+from api.adapters.repository import PostgresMixin, replica_read
+from api.services.summaries.overlaps import overlap_days, overlapping_pairs
 from api.services.summaries.repository import SummaryRepository
 from api.services.summaries.models import (
     AccommodationLogSummary,
@@ -30,14 +30,31 @@ from api.services.summaries.models import (
     PropertyDetailSummary,
     PropertySummary,
     Overlap,
+    RelatedLogImpact,
     TripSummary,
 )
 from api.services.travel.models import AccommodationLog, Property, Trip
 
 
+# Accommodation log conditions for each record type a log can depend on
+RELATED_LOG_CONDITIONS = {
+    "property_id": "al.property_id = $1",
+    "consultant_id": "al.consultant_id = $1",
+    "booking_channel_id": "al.booking_channel_id = $1",
+    "agency_id": "al.agency_id = $1",
+    "country_id": (
+        "al.property_id IN (SELECT id FROM public.properties WHERE country_id = $1)"
+    ),
+    "portfolio_id": (
+        "al.property_id IN (SELECT id FROM public.properties WHERE portfolio_id = $1)"
+    ),
+}
+
+
 class PostgresSummaryRepository(PostgresMixin, SummaryRepository):
     """Implementation of the SummaryRepository ABC for Postgres."""
 
+    @replica_read
     async def get_bed_night_report(self, input_args: dict) -> BedNightReport:
         """Creates a BedNightReport model given the inputs and repo data."""
         # Parse the input args to filter the query
@@ -94,6 +111,7 @@ class PostgresSummaryRepository(PostgresMixin, SummaryRepository):
         #         return report
 
     # AccommodationLog
+    @replica_read
     async def get_accommodation_log(
         self,
         primary_traveler: str,
@@ -104,9 +122,9 @@ class PostgresSummaryRepository(PostgresMixin, SummaryRepository):
         """Gets a single AccommodationLog model in the repository by name."""
         raise NotImplementedError
 
+    @replica_read
     async def get_all_accommodation_logs(self) -> Sequence[AccommodationLogSummary]:
         """Gets all AccommodationLog models in the repository, joined with their foreign keys."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT
@@ -152,30 +170,176 @@ class PostgresSummaryRepository(PostgresMixin, SummaryRepository):
             ORDER BY al.updated_at desc
         """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(
-                    query
-                )  # Use fetch to retrieve all matching rows
-                accommodation_log_summaries = [
-                    AccommodationLogSummary(**record) for record in records
-                ]
-                return accommodation_log_summaries
+        records = await self._fetch(query)  # Use fetch to retrieve all matching rows
+        accommodation_log_summaries = [
+            AccommodationLogSummary(**record) for record in records
+        ]
+        return accommodation_log_summaries
+
+    @replica_read
+    async def get_accommodation_logs_by_date_range(
+        self,
+        start_date: Optional[datetime.date] = None,
+        end_date: Optional[datetime.date] = None,
+    ) -> Sequence[AccommodationLogSummary]:
+        """Gets AccommodationLogSummary models for stays touching the date range."""
+        query = dedent(
+            """
+            SELECT
+                al.id,
+                al.primary_traveler,
+                cd.name AS core_destination_name,
+                cd.id AS core_destination_id,
+                c.name AS country_name,
+                c.id AS country_id,
+                al.date_in,
+                al.date_out,
+                al.num_pax,
+                p.name AS property_name,
+                p.property_type AS property_type,
+                p.location AS property_location,
+                p.latitude AS property_latitude,
+                p.longitude AS property_longitude,
+                pf.id AS property_portfolio_id,
+                pf.name AS property_portfolio,
+                bc.name AS booking_channel_name,
+                a.name AS agency_name,
+                al.consultant_id,
+                cons.first_name AS consultant_first_name,
+                cons.last_name AS consultant_last_name,
+                cons.is_active AS consultant_is_active,
+                al.property_id,
+                al.booking_channel_id,
+                al.agency_id,
+                t.id as trip_id,
+                t.trip_name as trip_name,
+                al.created_at,
+                al.updated_at,
+                al.updated_by
+            FROM public.accommodation_logs al
+            JOIN public.properties p ON al.property_id = p.id
+            JOIN public.portfolios pf ON p.portfolio_id = pf.id
+            JOIN public.consultants cons ON al.consultant_id = cons.id
+            LEFT JOIN public.booking_channels bc ON al.booking_channel_id = bc.id
+            LEFT JOIN public.trips t ON al.trip_id = t.id
+            LEFT JOIN public.agencies a ON al.agency_id = a.id
+            LEFT JOIN public.countries c ON p.country_id = c.id
+            JOIN public.core_destinations cd ON p.core_destination_id = cd.id
+            {where}
+        """
+        )
+        # Only bounds that are given are added, since a generic plan cannot
+        # prune date_in partitions through "$2 IS NULL OR al.date_in <= $2"
+        conditions, values = [], []
+        if start_date is not None:
+            values.append(start_date)
+            conditions.append(f"al.date_out >= ${len(values)}")
+        if end_date is not None:
+            values.append(end_date)
+            conditions.append(f"al.date_in <= ${len(values)}")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        records = await self._fetch(query.format(where=where), *values)
+        accommodation_log_summaries = [
+            AccommodationLogSummary(**record) for record in records
+        ]
+        return accommodation_log_summaries
+
+    @replica_read
+    async def get_related_log_impact(
+        self, identifier: UUID, identifier_type: str, count_cap: int, sample_size: int
+    ) -> RelatedLogImpact:
+        """Counts accommodation logs tied to a record, up to count_cap, with a sample.
+
+        The count stops at count_cap + 1 rows, so deciding whether a popular
+        property can be deleted costs a bounded index scan. Only the sampled
+        logs are joined out to full summaries.
+        """
+        if identifier_type not in RELATED_LOG_CONDITIONS:
+            raise ValueError(f"Unsupported identifier type: {identifier_type}")
+        condition = RELATED_LOG_CONDITIONS[identifier_type]
+        count_query = dedent(
+            f"""
+            SELECT COUNT(*) AS affected_count FROM (
+                SELECT 1 FROM public.accommodation_logs al
+                WHERE {condition}
+                LIMIT $2
+            ) related
+            """
+        )
+        sample_query = dedent(
+            f"""
+            SELECT
+                al.id,
+                al.primary_traveler,
+                cd.name AS core_destination_name,
+                c.id as country_id,
+                c.name AS country_name,
+                al.date_in,
+                al.date_out,
+                al.num_pax,
+                p.name AS property_name,
+                p.property_type AS property_type,
+                p.location AS property_location,
+                p.latitude AS property_latitude,
+                p.longitude AS property_longitude,
+                pf.name AS property_portfolio,
+                p.portfolio_id AS property_portfolio_id,
+                bc.name AS booking_channel_name,
+                a.name AS agency_name,
+                al.consultant_id,
+                cons.first_name AS consultant_first_name,
+                cons.last_name AS consultant_last_name,
+                cons.is_active AS consultant_is_active,
+                al.property_id,
+                al.booking_channel_id,
+                t.id as trip_id,
+                t.trip_name as trip_name,
+                al.agency_id,
+                al.created_at,
+                al.updated_at,
+                al.updated_by
+            FROM (
+                SELECT * FROM public.accommodation_logs al
+                WHERE {condition}
+                ORDER BY al.updated_at DESC
+                LIMIT $2
+            ) al
+            JOIN public.properties p ON al.property_id = p.id
+            JOIN public.portfolios pf ON p.portfolio_id = pf.id
+            JOIN public.consultants cons ON al.consultant_id = cons.id
+            LEFT JOIN public.booking_channels bc ON al.booking_channel_id = bc.id
+            LEFT JOIN public.trips t ON al.trip_id = t.id
+            LEFT JOIN public.agencies a ON al.agency_id = a.id
+            LEFT JOIN public.countries c ON p.country_id = c.id
+            JOIN public.core_destinations cd ON p.core_destination_id = cd.id
+            ORDER BY al.updated_at DESC
+            """
+        )
+        async with self._read_snapshot() as con:
+            affected_count = await con.fetchval(count_query, identifier, count_cap + 1)
+            records = []
+            if affected_count and sample_size:
+                records = await con.fetch(sample_query, identifier, sample_size)
+        return RelatedLogImpact(
+            affected_count=min(affected_count, count_cap),
+            count_capped=affected_count > count_cap,
+            sample=[AccommodationLogSummary(**record) for record in records],
+        )
 
+    @replica_read
     async def get_accommodation_logs_by_filter(
         self, filters: dict, exclude_fam: bool = False
     ) -> Sequence[AccommodationLogSummary]:
         """Gets a set of AccommodationLogSummary models by filter."""
-        pool = await self._get_pool()
         query_conditions = []
         for key, value in filters.items():
             if key == "start_date":
                 query_conditions.append(f"al.date_in >= '{value}'")
             elif key == "end_date":
+                # A stay checks in by the day it checks out, so the date_in
+                # bound is implied; it lets later date_in partitions be pruned
                 query_conditions.append(f"al.date_out <= '{value}'")
+                query_conditions.append(f"al.date_in <= '{value}'")
             elif key == "id":
                 query_conditions.append(f"al.id = '{value}'")
             elif key == "country_name":
@@ -276,87 +440,101 @@ class PostgresSummaryRepository(PostgresMixin, SummaryRepository):
         )
         print("condition_string:")
         print(condition_string)
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(query)
-                # Convert each record to AccommodationLogSummary before filtering
-                accommodation_log_summaries_temp = [
-                    AccommodationLogSummary(**record) for record in records
-                ]
-
-                if "consultant_name" in filters:
-                    consultant_filter = filters["consultant_name"]
-                    # Filter using the consultant_display_name property of AccommodationLogSummary
-                    accommodation_log_summaries = [
-                        log
-                        for log in accommodation_log_summaries_temp
-                        if log.consultant_display_name == consultant_filter
-                    ]
-                else:
-                    accommodation_log_summaries = accommodation_log_summaries_temp
-
-                return accommodation_log_summaries
+        records = await self._fetch(query)
+        # Convert each record to AccommodationLogSummary before filtering
+        accommodation_log_summaries_temp = [
+            AccommodationLogSummary(**record) for record in records
+        ]
+
+        if "consultant_name" in filters:
+            consultant_filter = filters["consultant_name"]
+            # Filter using the consultant_display_name property of AccommodationLogSummary
+            accommodation_log_summaries = [
+                log
+                for log in accommodation_log_summaries_temp
+                if log.consultant_display_name == consultant_filter
+            ]
+        else:
+            accommodation_log_summaries = accommodation_log_summaries_temp
 
+        return accommodation_log_summaries
+
+    @replica_read
     async def get_overlaps(
         self, start_date: datetime.date, end_date: datetime.date
     ) -> Sequence[Overlap]:
-        """Returns accommodation logs where clients are overlapping at a property by >0 days."""
-        pool = await self._get_pool()
-        query = """
-        SELECT
-            a1.primary_traveler AS traveler1,
-            a1.date_in AS date_in_traveler1,
-            a1.date_out AS date_out_traveler1,
-            bc1.name AS booking_channel_traveler1,
-            a2.primary_traveler AS traveler2,
-            a2.date_in AS date_in_traveler2,
-            a2.date_out AS date_out_traveler2,
-            bc2.name AS booking_channel_traveler2,
-            p.id AS property_id,
-            p.name AS property_name,
-            c.name AS country_name,
-            cons1.first_name AS consultant_first_name_traveler1,
-            cons1.last_name AS consultant_last_name_traveler1,
-            cons2.first_name AS consultant_first_name_traveler2,
-            cons2.last_name AS consultant_last_name_traveler2,
-            cons1.is_active AS consultant_is_active_traveler1,
-            cons2.is_active AS consultant_is_active_traveler2,
-            cd.name AS core_destination_name,
-            ag1.name AS agency_name_traveler1,
-            ag2.name AS agency_name_traveler2,
-            -- Calculate the overlap in days
-            GREATEST(0, LEAST(a1.date_out, a2.date_out) - GREATEST(a1.date_in, a2.date_in)) AS overlap_days
-        FROM public.accommodation_logs a1
-        JOIN public.accommodation_logs a2 ON a1.property_id = a2.property_id
-            AND a1.id < a2.id  -- Ensure unique pairings
-            AND a1.date_out > a2.date_in
-            AND a2.date_out > a1.date_in
-        JOIN public.properties p ON a1.property_id = p.id
-        LEFT JOIN public.countries c ON p.country_id = c.id
-        LEFT JOIN public.booking_channels bc1 on a1.booking_channel_id = bc1.id
-        LEFT JOIN public.booking_channels bc2 on a2.booking_channel_id = bc2.id
-        LEFT JOIN public.consultants cons1 ON a1.consultant_id = cons1.id
-        LEFT JOIN public.consultants cons2 ON a2.consultant_id = cons2.id
-        LEFT JOIN public.core_destinations cd ON p.core_destination_id = cd.id
-        LEFT JOIN public.agencies ag1 ON a1.agency_id = ag1.id
-        LEFT JOIN public.agencies ag2 ON a2.agency_id = ag2.id
-        WHERE (a1.date_in BETWEEN $1 AND $2 OR a1.date_out BETWEEN $1 AND $2)
-            AND (a2.date_in BETWEEN $1 AND $2 OR a2.date_out BETWEEN $1 AND $2)
-        ORDER BY overlap_days ASC, a1.date_in DESC  -- Order by fewest overlap days first, then by date_in
+        """Returns accommodation logs where clients are overlapping at a property by >0 days.
+
+        Logs in the window are fetched once and paired by a per-property sweep
+        line, instead of self-joining accommodation_logs on date inequalities
+        that no index can serve.
         """
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+        query = dedent(
+            """
+            SELECT
+                al.id,
+                al.property_id,
+                al.primary_traveler,
+                al.date_in,
+                al.date_out,
+                bc.name AS booking_channel,
+                p.name AS property_name,
+                c.name AS country_name,
+                cd.name AS core_destination_name,
+                cons.first_name AS consultant_first_name,
+                cons.last_name AS consultant_last_name,
+                cons.is_active AS consultant_is_active,
+                ag.name AS agency_name
+            FROM public.accommodation_logs al
+            JOIN public.properties p ON al.property_id = p.id
+            LEFT JOIN public.countries c ON p.country_id = c.id
+            LEFT JOIN public.booking_channels bc ON al.booking_channel_id = bc.id
+            LEFT JOIN public.consultants cons ON al.consultant_id = cons.id
+            LEFT JOIN public.core_destinations cd ON p.core_destination_id = cd.id
+            LEFT JOIN public.agencies ag ON al.agency_id = ag.id
+            WHERE (al.date_in BETWEEN $1 AND $2 OR al.date_out BETWEEN $1 AND $2)
+                -- Implied by both branches, and prunes later date_in partitions
+                AND al.date_in <= $2
+            """
+        )
+        records = await self._fetch(query, start_date, end_date)
+        overlaps = [
+            Overlap(
+                traveler1=first["primary_traveler"],
+                date_in_traveler1=first["date_in"],
+                date_out_traveler1=first["date_out"],
+                booking_channel_traveler1=first["booking_channel"],
+                traveler2=second["primary_traveler"],
+                date_in_traveler2=second["date_in"],
+                date_out_traveler2=second["date_out"],
+                booking_channel_traveler2=second["booking_channel"],
+                property_id=first["property_id"],
+                property_name=first["property_name"],
+                country_name=first["country_name"],
+                consultant_first_name_traveler1=first["consultant_first_name"],
+                consultant_last_name_traveler1=first["consultant_last_name"],
+                consultant_first_name_traveler2=second["consultant_first_name"],
+                consultant_last_name_traveler2=second["consultant_last_name"],
+                consultant_is_active_traveler1=first["consultant_is_active"],
+                consultant_is_active_traveler2=second["consultant_is_active"],
+                core_destination_name=first["core_destination_name"],
+                agency_name_traveler1=first["agency_name"],
+                agency_name_traveler2=second["agency_name"],
+                overlap_days=overlap_days(first, second),
+            )
+            for first, second in overlapping_pairs(records)
+        ]
+        # Fewest overlap days first, then by date_in
+        overlaps.sort(
+            key=lambda overlap: (
+                overlap.overlap_days,
+                -overlap.date_in_traveler1.toordinal(),
             )
-            async with con.transaction():
-                records = await con.fetch(query, start_date, end_date)
-                overlaps = [Overlap(**record) for record in records]
-                return overlaps
+        )
+        return overlaps
 
     # Property
+    @replica_read
     async def get_property(
         self,
         name: str,
@@ -367,9 +545,9 @@ class PostgresSummaryRepository(PostgresMixin, SummaryRepository):
         """Returns a single Property model in the repository by name."""
         raise NotImplementedError
 
+    @replica_read
     async def get_all_properties(self) -> Sequence[PropertySummary]:
         """Gets all Property models in the repository, joined with their foreign keys."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT
@@ -398,22 +576,15 @@ class PostgresSummaryRepository(PostgresMixin, SummaryRepository):
             ORDER BY p.name ASC
         """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(
-                    query
-                )  # Use fetch to retrieve all matching rows
-                property_summaries = [PropertySummary(**record) for record in records]
-                return property_summaries
+        records = await self._fetch(query)  # Use fetch to retrieve all matching rows
+        property_summaries = [PropertySummary(**record) for record in records]
+        return property_summaries
 
+    @replica_read
     async def get_property_details(
         self, entered_only: bool = True, by_id: UUID = None
     ) -> Sequence[PropertyDetailSummary]:
         """Gets all PropertyDetail models in the repository, joined with their foreign keys."""
-        pool = await self._get_pool()
         base_query = dedent(
             """
             SELECT
@@ -464,30 +635,24 @@ class PostgresSummaryRepository(PostgresMixin, SummaryRepository):
 
         query = f"{base_query} {filter_clause} {order_by_clause}"
 
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(
-                    query
-                )  # Use fetch to retrieve all matching rows
-                property_detail_summaries = [
-                    PropertyDetailSummary(**record) for record in records
-                ]
-                return property_detail_summaries
+        records = await self._fetch(query)  # Use fetch to retrieve all matching rows
+        property_detail_summaries = [
+            PropertyDetailSummary(**record) for record in records
+        ]
+        return property_detail_summaries
         # raise NotImplementedError
 
+    @replica_read
     async def get_property_details_by_id(self) -> PropertyDetailSummary:
         """Gets a PropertyDetail models in the repository by ID, joined with foreign keys."""
         raise NotImplementedError
 
+    @replica_read
     async def get_properties_by_portfolio_name(
         self,
         portfolio_name: str,
     ) -> Sequence[Property]:
         """Gets all Property models by a portfolio name."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT
@@ -497,14 +662,13 @@ class PostgresSummaryRepository(PostgresMixin, SummaryRepository):
             WHERE pf.name = $1
             """
         )
-        async with pool.acquire() as con:
-            records = await con.fetch(query, portfolio_name)
-            properties = [Property(**record) for record in records]
-            return properties
+        records = await self._fetch(query, portfolio_name)
+        properties = [Property(**record) for record in records]
+        return properties
 
+    @replica_read
     async def get_all_countries(self) -> Sequence[CountrySummary]:
         """Gets all Country models."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT
@@ -519,20 +683,15 @@ class PostgresSummaryRepository(PostgresMixin, SummaryRepository):
             ORDER BY c.name ASC
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(query)
-                country_summaries = [CountrySummary(**record) for record in records]
-                return country_summaries
+        records = await self._fetch(query)
+        country_summaries = [CountrySummary(**record) for record in records]
+        return country_summaries
 
+    @replica_read
     async def get_country_by_id(
         self, country_id: UUID = None
     ) -> Sequence[CountrySummary]:
         """Gets a CountrySummary model by ID, joined with its foreign keys."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT
@@ -548,18 +707,13 @@ class PostgresSummaryRepository(PostgresMixin, SummaryRepository):
             """
         )
 
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                res = await con.fetchrow(query, country_id)
-                if res:
-                    return CountrySummary(**res)
+        res = await self._fetchrow(query, country_id)
+        if res:
+            return CountrySummary(**res)
 
+    @replica_read
     async def get_all_booking_channels(self) -> Sequence[BookingChannelSummary]:
         """Gets all BookingChannel models in the repository, joined with their foreign keys."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT
@@ -571,20 +725,13 @@ class PostgresSummaryRepository(PostgresMixin, SummaryRepository):
             ORDER BY bc.name ASC;
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(query)
-                property_summaries = [
-                    BookingChannelSummary(**record) for record in records
-                ]
-                return property_summaries
+        records = await self._fetch(query)
+        property_summaries = [BookingChannelSummary(**record) for record in records]
+        return property_summaries
 
+    @replica_read
     async def get_all_agencies(self) -> Sequence[AgencySummary]:
         """Gets all Agency models joined with their foreign keys."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT
@@ -596,18 +743,13 @@ class PostgresSummaryRepository(PostgresMixin, SummaryRepository):
             ORDER BY a.name ASC;
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(query)
-                property_summaries = [AgencySummary(**record) for record in records]
-                return property_summaries
+        records = await self._fetch(query)
+        property_summaries = [AgencySummary(**record) for record in records]
+        return property_summaries
 
+    @replica_read
     async def get_all_portfolios(self) -> Sequence[PortfolioSummary]:
         """Gets all Portfolio models joined with their foreign keys."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT
@@ -621,18 +763,13 @@ class PostgresSummaryRepository(PostgresMixin, SummaryRepository):
             ORDER BY p.name ASC;
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(query)
-                property_summaries = [PortfolioSummary(**record) for record in records]
-                return property_summaries
+        records = await self._fetch(query)
+        property_summaries = [PortfolioSummary(**record) for record in records]
+        return property_summaries
 
+    @replica_read
     async def get_all_trips(self) -> Sequence[TripSummary]:
         """Gets all TripSummary models, including detailed accommodation logs."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT
@@ -675,55 +812,50 @@ class PostgresSummaryRepository(PostgresMixin, SummaryRepository):
             ORDER BY al.date_in ASC, al.primary_traveler ASC
         """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+        records = await self._fetch(query)
+        # Transform fetched records into structured TripSummary
+        trip_summaries = {}
+        for record in records:
+            trip_id = record["trip_id"]
+            if trip_id not in trip_summaries:
+                trip_summaries[trip_id] = TripSummary(
+                    id=trip_id,
+                    trip_name=record["trip_name"],
+                    created_at=record["trip_created_at"],
+                    updated_at=record["trip_updated_at"],
+                    updated_by=record["trip_updated_by"],
+                    accommodation_logs=[],
+                )
+            trip_summaries[trip_id].accommodation_logs.append(
+                AccommodationLogSummary(
+                    id=record["log_id"],
+                    primary_traveler=record["primary_traveler"],
+                    country_name=record["country_name"],
+                    core_destination_name=record["core_destination_name"],
+                    property_name=record["property_name"],
+                    property_id=record["property_id"],
+                    property_portfolio_id=record["property_portfolio_id"],
+                    property_portfolio=record["property_portfolio"],
+                    booking_channel_name=record["booking_channel_name"],
+                    agency_name=record["agency_name"],
+                    consultant_id=record["consultant_id"],
+                    consultant_first_name=record["consultant_first_name"],
+                    consultant_last_name=record["consultant_last_name"],
+                    consultant_is_active=record["consultant_is_active"],
+                    date_in=record["date_in"],
+                    date_out=record["date_out"],
+                    num_pax=record["num_pax"],
+                    created_at=record["created_at"],
+                    updated_at=record["updated_at"],
+                    updated_by=record["updated_by"],
+                )
             )
-            async with con.transaction():
-                records = await con.fetch(query)
-                # Transform fetched records into structured TripSummary
-                trip_summaries = {}
-                for record in records:
-                    trip_id = record["trip_id"]
-                    if trip_id not in trip_summaries:
-                        trip_summaries[trip_id] = TripSummary(
-                            id=trip_id,
-                            trip_name=record["trip_name"],
-                            created_at=record["trip_created_at"],
-                            updated_at=record["trip_updated_at"],
-                            updated_by=record["trip_updated_by"],
-                            accommodation_logs=[],
-                        )
-                    trip_summaries[trip_id].accommodation_logs.append(
-                        AccommodationLogSummary(
-                            id=record["log_id"],
-                            primary_traveler=record["primary_traveler"],
-                            country_name=record["country_name"],
-                            core_destination_name=record["core_destination_name"],
-                            property_name=record["property_name"],
-                            property_id=record["property_id"],
-                            property_portfolio_id=record["property_portfolio_id"],
-                            property_portfolio=record["property_portfolio"],
-                            booking_channel_name=record["booking_channel_name"],
-                            agency_name=record["agency_name"],
-                            consultant_id=record["consultant_id"],
-                            consultant_first_name=record["consultant_first_name"],
-                            consultant_last_name=record["consultant_last_name"],
-                            consultant_is_active=record["consultant_is_active"],
-                            date_in=record["date_in"],
-                            date_out=record["date_out"],
-                            num_pax=record["num_pax"],
-                            created_at=record["created_at"],
-                            updated_at=record["updated_at"],
-                            updated_by=record["updated_by"],
-                        )
-                    )
-
-                return list(trip_summaries.values())
 
+        return list(trip_summaries.values())
+
+    @replica_read
     async def get_trip_summary_by_id(self, trip_id: UUID) -> TripSummary:
         """Gets a TripSummary model by its ID."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT
@@ -767,48 +899,43 @@ class PostgresSummaryRepository(PostgresMixin, SummaryRepository):
             """
         )
 
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(query, trip_id)  # fetch, not fetchrow
-                if not records:
-                    return None
-
-                trip_summary = TripSummary(
-                    id=records[0]["trip_id"],
-                    trip_name=records[0]["trip_name"],
-                    created_at=records[0]["trip_created_at"],
-                    updated_at=records[0]["trip_updated_at"],
-                    updated_by=records[0]["trip_updated_by"],
-                    accommodation_logs=[],
+        records = await self._fetch(query, trip_id)  # fetch, not fetchrow
+        if not records:
+            return None
+
+        trip_summary = TripSummary(
+            id=records[0]["trip_id"],
+            trip_name=records[0]["trip_name"],
+            created_at=records[0]["trip_created_at"],
+            updated_at=records[0]["trip_updated_at"],
+            updated_by=records[0]["trip_updated_by"],
+            accommodation_logs=[],
+        )
+
+        for record in records:
+            trip_summary.accommodation_logs.append(
+                AccommodationLogSummary(
+                    id=record["log_id"],
+                    primary_traveler=record["primary_traveler"],
+                    country_name=record["country_name"],
+                    core_destination_name=record["core_destination_name"],
+                    property_name=record["property_name"],
+                    property_id=record["property_id"],
+                    property_portfolio_id=record["property_portfolio_id"],
+                    property_portfolio=record["property_portfolio"],
+                    booking_channel_name=record["booking_channel_name"],
+                    agency_name=record["agency_name"],
+                    consultant_id=record["consultant_id"],
+                    consultant_first_name=record["consultant_first_name"],
+                    consultant_last_name=record["consultant_last_name"],
+                    consultant_is_active=record["consultant_is_active"],
+                    date_in=record["date_in"],
+                    date_out=record["date_out"],
+                    num_pax=record["num_pax"],
+                    created_at=record["created_at"],
+                    updated_at=record["updated_at"],
+                    updated_by=record["updated_by"],
                 )
+            )
 
-                for record in records:
-                    trip_summary.accommodation_logs.append(
-                        AccommodationLogSummary(
-                            id=record["log_id"],
-                            primary_traveler=record["primary_traveler"],
-                            country_name=record["country_name"],
-                            core_destination_name=record["core_destination_name"],
-                            property_name=record["property_name"],
-                            property_id=record["property_id"],
-                            property_portfolio_id=record["property_portfolio_id"],
-                            property_portfolio=record["property_portfolio"],
-                            booking_channel_name=record["booking_channel_name"],
-                            agency_name=record["agency_name"],
-                            consultant_id=record["consultant_id"],
-                            consultant_first_name=record["consultant_first_name"],
-                            consultant_last_name=record["consultant_last_name"],
-                            consultant_is_active=record["consultant_is_active"],
-                            date_in=record["date_in"],
-                            date_out=record["date_out"],
-                            num_pax=record["num_pax"],
-                            created_at=record["created_at"],
-                            updated_at=record["updated_at"],
-                            updated_by=record["updated_by"],
-                        )
-                    )
-
-                return trip_summary
+        return trip_summary
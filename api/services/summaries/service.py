@@ -13,19 +13,21 @@
 # limitations under the License.
 
 """Services for interacting with travel entries."""
+import asyncio
+import multiprocessing
+import os
 from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date, datetime
 from itertools import groupby
 from operator import attrgetter
-from typing import Sequence, List, Optional, Set
+from typing import Iterator, Sequence, List, Optional, Set
 from uuid import UUID
 from io import BytesIO
 from xml.etree.ElementInclude import include
 import pandas as pd
-from openpyxl.styles import Alignment, Font, Border, Side, PatternFill
-from openpyxl.utils import get_column_letter
-from openpyxl.cell.cell import MergedCell
 
+from api.adapters.cache import TTLCache
 from api.services.summaries.models import (
     AccommodationLogSummary,
     AgencySummary,
@@ -39,27 +41,89 @@ from api.services.summaries.models import (
     ReportAggregations,
     ReportInput,
     Overlap,
+    PotentialDuplicate,
     TripSummary,
 )
+from api.services.summaries.excel import build_workbook
+from api.services.summaries.overlaps import find_duplicate_stays
 from api.services.summaries.repository.postgres import PostgresSummaryRepository
 
-FONT_NAME = "Brandon Grotesque"
+# Related logs are counted up to the cap and only a sample is returned
+RELATED_LOGS_COUNT_CAP = 1000
+RELATED_LOGS_SAMPLE_SIZE = 25
+
+
+def canonical_filters(filters: dict) -> tuple:
+    """Returns a hashable form of report filters, ignoring key and list order."""
+    return tuple(
+        sorted(
+            (
+                key,
+                (
+                    tuple(sorted(set(value)))
+                    if isinstance(value, (list, tuple, set))
+                    else value
+                ),
+            )
+            for key, value in filters.items()
+        )
+    )
 
 
 class SummaryService:
     """Service for interfacing with the travel repository."""
 
+    # Building a workbook is CPU bound pandas and openpyxl work, so it runs in
+    # a shared pool of processes instead of on the event loop
+    EXCEL_WORKERS = int(os.getenv("EXCEL_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+    _excel_pool: Optional[ProcessPoolExecutor] = None
+
+    # Reports are cached under their filters and the data version, which
+    # TravelService bumps on every change to the data reports read. The TTL
+    # bounds staleness from writes made by other processes.
+    REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "256"))
+    EXPORT_CACHE_SIZE = int(os.getenv("EXPORT_CACHE_SIZE", "32"))
+    REPORT_CACHE_TTL = float(os.getenv("REPORT_CACHE_TTL_SECONDS", "900"))
+
+    _data_version = 0
+
     def __init__(self):
         """Initializes with a configured repository."""
         self._repo = PostgresSummaryRepository()
+        self._report_cache = TTLCache(self.REPORT_CACHE_SIZE, self.REPORT_CACHE_TTL)
+        # Workbooks are kept as bytes, so a hit only wraps them in a new stream
+        self._export_cache = TTLCache(self.EXPORT_CACHE_SIZE, self.REPORT_CACHE_TTL)
+
+    @classmethod
+    def invalidate_reports(cls) -> None:
+        """Bumps the data version so reports cached before a change are not served."""
+        cls._data_version += 1
+
+    @classmethod
+    def _excel_executor(cls) -> ProcessPoolExecutor:
+        if cls._excel_pool is None:
+            # Spawned rather than forked, since the parent runs threads
+            cls._excel_pool = ProcessPoolExecutor(
+                max_workers=cls.EXCEL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return cls._excel_pool
 
     # BedNightReport
     async def get_bed_night_report(self, labels: dict) -> BedNightReport:
         """Generates a BedNightReport based on input criteria."""
+        # Keyed before reading, so a change made mid-read bumps past this entry
+        key = (self._data_version, canonical_filters(labels))
+        report = self._report_cache.get(key)
+        if report is not None:
+            # Equivalent filters may be ordered differently, so echo these ones
+            return report.model_copy(update={"report_inputs": ReportInput(**labels)})
         accommodation_logs = await self._repo.get_accommodation_logs_by_filter(
             labels, exclude_fam=True
         )
         report = self.generate_report(accommodation_logs, labels)
+        self._report_cache.set(key, report)
         return report
 
     def generate_report(
@@ -151,6 +215,18 @@ class SummaryService:
         exclude_columns: Optional[List[str]] = None,
     ) -> BytesIO:
         """Generates an excel file with accommodation logs for reporting."""
+        # The subtitle carries today's date, so a workbook is only reused today
+        key = (
+            "bed_nights",
+            self._data_version,
+            date.today(),
+            canonical_filters(labels),
+            report_title,
+            tuple(sorted(set(exclude_columns or ()))),
+        )
+        content = self._export_cache.get(key)
+        if content is not None:
+            return BytesIO(content)
         accommodation_logs = await self._repo.get_accommodation_logs_by_filter(
             labels, exclude_fam=True
         )
@@ -204,13 +280,26 @@ class SummaryService:
                 f"{log['consultant_last_name']}/{log['consultant_first_name']}"
             )
 
-        df = pd.DataFrame(data, columns=columns_to_include)
-        df.rename(columns=column_name_mapping, inplace=True)
-
-        return await self.write_excel(df, report_title)
+        columns = {
+            column_name_mapping[column]: [log[column] for log in data]
+            for column in columns_to_include
+        }
+        excel_stream = await self._write_workbook(columns, report_title)
+        self._export_cache.set(key, excel_stream.getvalue())
+        return excel_stream
 
     async def generate_custom_excel_file(self, query_params: dict, report_title: str):
         """Generates an excel file with custom calculations for reporting."""
+        key = (
+            "custom",
+            self._data_version,
+            date.today(),
+            canonical_filters(query_params),
+            report_title,
+        )
+        content = self._export_cache.get(key)
+        if content is not None:
+            return BytesIO(content)
         calculation_type = query_params.pop("calculation_type", None)
         property_granularity = query_params.pop("property_granularity", None)
         time_granularity = query_params.pop("time_granularity", None)
@@ -254,7 +343,11 @@ class SummaryService:
             property_granularity,
         )
 
-        return await self.write_excel(df, report_title, include_total_column=True)
+        excel_stream = await self.write_excel(
+            df, report_title, include_total_column=True
+        )
+        self._export_cache.set(key, excel_stream.getvalue())
+        return excel_stream
 
     def results_to_dataframe(self, results, time_granularity, property_granularity):
         """Create a pandas DataFrame from the results."""
@@ -303,283 +396,28 @@ class SummaryService:
 
         return pivot_df
 
-    def is_numeric(self, value):
-        """
-        Determines if a given value is numeric.
-        Returns True if value is an integer or float, or a string that can be converted to a float.
-        """
-        if isinstance(value, (int, float)):
-            return True
-        if isinstance(value, str):
-            value = value.strip()
-            if value.isdigit():
-                return True
-            try:
-                float(value)
-                return True
-            except ValueError:
-                return False
-        return False
-
     async def write_excel(
         self,
         df: pd.DataFrame,
         report_title: str = "Bed Night Report",
         include_total_column: bool = False,
-    ):
-        """Writes a dataframe into an Excel stream with enhanced formatting based on stakeholder requests."""
-        excel_stream = BytesIO()
-        header_row = 3
-        tb_teal_fill = PatternFill(
-            start_color="0E9BAC", end_color="0E9BAC", fill_type="solid"
-        )
-        tb_white_font = "F2F0E7"
-
-        with pd.ExcelWriter(excel_stream, engine="openpyxl") as writer:
-            # Write the DataFrame starting from row 3 to leave space for title and subtitle
-            df.to_excel(
-                writer, index=False, startrow=header_row - 1, sheet_name="Sheet1"
-            )
-            numeric_columns = df.select_dtypes(include=["number"]).columns.tolist()
-
-            sheet = writer.sheets["Sheet1"]
-
-            # Define the number of columns in the DataFrame
-            df_width = len(df.columns)
-            num_columns = df_width + 1 if include_total_column else df_width
-
-            # ----------------------------
-            # 1. Add Title (Row 1)
-            # ----------------------------
-            title_font = Font(name=FONT_NAME, bold=True, size=18, color=tb_white_font)
-            sheet.merge_cells(
-                start_row=1,
-                start_column=1,
-                end_row=1,
-                end_column=num_columns,
-            )
-            title_cell = sheet.cell(row=1, column=1, value=report_title)
-            title_cell.font = title_font
-            title_cell.fill = tb_teal_fill
-            title_cell.alignment = Alignment(horizontal="center", vertical="center")
-
-            # ----------------------------
-            # 2. Add Subtitle (Row 2)
-            # ----------------------------
-            subtitle_font = Font(name=FONT_NAME, size=14, color=tb_white_font)
-            current_datetime = datetime.now()
-            subtitle_text = f"Bed Nights as of {current_datetime.strftime('%B')} {current_datetime.day}, {current_datetime.year}"
-            sheet.merge_cells(
-                start_row=2, start_column=1, end_row=2, end_column=num_columns
-            )
-            subtitle_cell = sheet.cell(row=2, column=1, value=subtitle_text)
-            subtitle_cell.font = subtitle_font
-            subtitle_cell.fill = tb_teal_fill
-            subtitle_cell.alignment = Alignment(horizontal="center", vertical="center")
-
-            # ----------------------------
-            # 3. Format Headers (Row 4)
-            # ----------------------------
-
-            header_font = Font(name=FONT_NAME, bold=True, size=11)
-            if include_total_column:
-                max_col = num_columns  # Include an extra column for 'TOTAL'
-            else:
-                max_col = num_columns  # Only include existing columns
-
-            for col_num in range(1, max_col + 1):
-                if col_num <= num_columns:
-                    # Zero-based indexing in pandas
-                    if col_num == num_columns and include_total_column:
-                        header_value = "TOTAL"
-                    else:
-                        header_value = df.columns[col_num - 1]
-                elif col_num == (num_columns - 1) and include_total_column:
-                    # Last column when include_total_column is True
-                    header_value = "TOTAL"
-
-                cell = sheet.cell(row=header_row, column=col_num)
-
-                if self.is_numeric(header_value):
-                    # Convert to appropriate numeric type
-                    if isinstance(header_value, float) or (
-                        isinstance(header_value, str) and "." in header_value
-                    ):
-                        numeric_header = float(header_value)
-                        cell.value = numeric_header
-                        cell.number_format = "0.00"
-                    else:
-                        numeric_header = int(float(header_value))
-                        cell.value = numeric_header
-                        cell.number_format = "0"
-
-                    # Set alignment for numeric headers
-                    cell.alignment = Alignment(horizontal="center", vertical="center")
-                else:
-                    # For non-numeric headers, set as uppercase string
-                    cell.value = str(header_value).upper()
-                    cell.number_format = "General"
-
-                    # Set alignment based on header content
-                    if cell.value == "PROPERTY" and include_total_column:
-                        cell.alignment = Alignment(horizontal="left", vertical="center")
-                    else:
-                        cell.alignment = Alignment(
-                            horizontal="center", vertical="center"
-                        )
-
-                # Apply font styling
-                cell.font = header_font
-
-            # ----------------------------
-            # 4. Add TOTAL Column
-            # ----------------------------
-            total_col = num_columns
-            if include_total_column:
-                # total_col = num_columns + 1
-                sheet.cell(row=header_row, column=total_col, value="TOTAL").font = (
-                    header_font
-                )
-                sheet.cell(row=header_row, column=total_col).alignment = Alignment(
-                    horizontal="center", vertical="center"
-                )
-
-                # Populate TOTAL column with formulas
-                for row in range(header_row + 1, header_row + 1 + len(df)):
-                    # Assuming numerical data starts from column 2 to (total_col -1)
-                    sum_range = f"${get_column_letter(2)}${row}:${get_column_letter(num_columns-1)}${row}"
-                    total_cell = sheet.cell(row=row, column=total_col)
-                    total_cell.value = f"=SUM({sum_range})"
-                    total_cell.font = Font(name=FONT_NAME, bold=True, size=11)
-                    total_cell.alignment = Alignment(
-                        horizontal="center", vertical="center"
-                    )
-
-            # ----------------------------
-            # 5. Add TOTAL Row
-            # ----------------------------
-            total_row = header_row + 1 + len(df)
-            sheet.cell(row=total_row, column=1, value="TOTAL").font = Font(
-                name=FONT_NAME, bold=True, size=11
-            )
-            sheet.cell(row=total_row, column=1).alignment = Alignment(
-                horizontal="right", vertical="center"
-            )
-            for col_num in range(2, total_col + 1):
-                if include_total_column and col_num == total_col:
-                    # Grand total for TOTAL column
-                    sum_range = f"${get_column_letter(col_num)}${header_row + 1}:${get_column_letter(col_num)}${total_row - 1}"
-                    total_cell = sheet.cell(row=total_row, column=col_num)
-                    total_cell.value = f"=SUM({sum_range})"
-                    total_cell.font = Font(name=FONT_NAME, bold=True, size=11)
-                else:
-                    column_name = df.columns[col_num - 1]
-                    if column_name in numeric_columns:
-                        sum_range = f"${get_column_letter(col_num)}${header_row + 1}:${get_column_letter(col_num)}${total_row - 1}"
-                        total_cell = sheet.cell(row=total_row, column=col_num)
-                        total_cell.value = f"=SUM({sum_range})"
-                        total_cell.font = Font(name=FONT_NAME, bold=True, size=11)
-                    else:
-                        total_cell = sheet.cell(row=total_row, column=col_num)
-                        total_cell.value = ""
-                        total_cell.font = Font(name=FONT_NAME, bold=False, size=11)
-                # Set alignment for all cells in TOTAL row
-                total_cell.alignment = Alignment(horizontal="center", vertical="center")
-
-            # ----------------------------
-            # 6. Apply Gridlines (Borders) to the Table
-            # ----------------------------
-            thin_border = Border(
-                left=Side(style="thin", color="000000"),
-                right=Side(style="thin", color="000000"),
-                top=Side(style="thin", color="000000"),
-                bottom=Side(style="thin", color="000000"),
-            )
-
-            for row in range(header_row, total_row + 2):
-                for col in range(1, num_columns + 1):
-                    cell = sheet.cell(row=row, column=col)
-                    cell.border = thin_border
-                    if row == header_row:
-                        # Header cells already styled
-                        pass
-                    elif row == total_row:
-                        # Total cells already styled
-                        pass
-                    elif row >= header_row + 1 and row < total_row and col != total_col:
-                        # Table data cells
-                        cell.font = Font(name=FONT_NAME, size=11)
-                        column_name = df.columns[col - 1]
-                        if column_name in numeric_columns:
-                            cell.alignment = Alignment(
-                                horizontal="center", vertical="center"
-                            )
-                            cell.number_format = "General"
-                    elif include_total_column and col == total_col:
-                        # TOTAL column cells
-                        cell.font = Font(name=FONT_NAME, bold=True, size=11)
-
-            # ----------------------------
-            # 7. Set Column Widths
-            # ----------------------------
-            for col in sheet.columns:
-                max_length = 0
-                column = None  # Initialize the column variable
-
-                # Find the first non-merged cell in the column to get the column letter
-                for cell in col:
-                    if not isinstance(cell, MergedCell):
-                        column = cell.column_letter
-                        break
-
-                if column is None:
-                    # All cells in the column are merged; skip adjusting this column
-                    continue
-
-                for cell in col:
-                    if isinstance(cell, MergedCell):
-                        # Skip MergedCell objects
-                        continue
-                    try:
-                        cell_value = str(cell.value) if cell.value is not None else ""
-                        cell_length = len(cell_value)
-                        if cell_length > max_length:
-                            max_length = cell_length
-                    except:
-                        pass
-                adjusted_width = max_length + 2  # Adding extra space for readability
-                sheet.column_dimensions[column].width = adjusted_width
-            # ----------------------------
-            # 8. Add Final Footer (Optional)
-            # ----------------------------
-            footer_row = total_row + 1
-            sheet.cell(row=footer_row, column=1, value="Travel Beyond Confidential")
-            footer_font = Font(
-                name=FONT_NAME,
-                bold=True,
-                size=14,
-                color=tb_white_font,
-            )
-            footer_alignment = Alignment(horizontal="center", vertical="center")
-
-            sheet.merge_cells(
-                start_row=footer_row,
-                start_column=1,
-                end_row=footer_row,
-                end_column=total_col,
-            )
-            footer_cell = sheet.cell(row=footer_row, column=1)
-            footer_cell.font = footer_font
-            footer_cell.fill = tb_teal_fill
-            footer_cell.alignment = footer_alignment
-            footer_cell.border = thin_border
-
-            for col_num in range(1, total_col + 1):
-                cell = sheet.cell(row=footer_row, column=col_num)
-                cell.border = thin_border
+    ) -> BytesIO:
+        """Writes a dataframe into a formatted Excel stream on the Excel workers."""
+        columns = {column: df[column].tolist() for column in df.columns}
+        return await self._write_workbook(columns, report_title, include_total_column)
 
-        excel_stream.seek(0)  # Rewind the buffer to the beginning after writing
-        return excel_stream
+    async def _write_workbook(
+        self, columns: dict, report_title: str, include_total_column: bool = False
+    ) -> BytesIO:
+        loop = asyncio.get_running_loop()
+        content = await loop.run_in_executor(
+            self._excel_executor(),
+            build_workbook,
+            columns,
+            report_title,
+            include_total_column,
+        )
+        return BytesIO(content)
 
     def aggregate_custom_report(
         self,
@@ -638,17 +476,21 @@ class SummaryService:
         return await self._repo.get_accommodation_logs_by_filter(filters)
 
     async def get_related_records_summary(
-        self, identifier: UUID, identifier_type: str
-    ) -> Sequence[AccommodationLogSummary] | dict:
+        self,
+        identifier: UUID,
+        identifier_type: str,
+        sample_size: int = RELATED_LOGS_SAMPLE_SIZE,
+    ) -> dict:
         """Checks the impact of a modification on related records."""
-        filters = {identifier_type: identifier}
-        accommodation_logs = await self.get_accommodation_logs_by_filters(filters)
-
-        if not accommodation_logs:
-            return {"can_modify": True, "affected_logs": []}
-
-        accommodation_logs_summary = [log.to_json() for log in accommodation_logs]
-        return {"can_modify": False, "affected_logs": accommodation_logs_summary}
+        impact = await self._repo.get_related_log_impact(
+            identifier, identifier_type, RELATED_LOGS_COUNT_CAP, sample_size
+        )
+        return {
+            "can_modify": impact.affected_count == 0,
+            "affected_count": impact.affected_count,
+            "affected_count_capped": impact.count_capped,
+            "affected_logs": [log.to_json() for log in impact.sample],
+        }
 
     async def get_overlaps(self, start_date: date, end_date: date) -> list[str]:
         """Gets records where clients will be overlapping."""
@@ -656,6 +498,15 @@ class SummaryService:
         overlaps = [overlap.to_json() for overlap in overlap_data]
         return overlaps
 
+    async def get_potential_duplicates(
+        self, start_date: Optional[date] = None, end_date: Optional[date] = None
+    ) -> Iterator[PotentialDuplicate]:
+        """Streams pairs of logs that book the same traveler on the same nights."""
+        logs = await self._repo.get_accommodation_logs_by_date_range(
+            start_date, end_date
+        )
+        return find_duplicate_stays(logs)
+
     # Property
     async def get_all_properties(self) -> Sequence[PropertySummary]:
         """Gets all PropertySummary models."""
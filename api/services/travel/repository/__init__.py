@@ -42,6 +42,13 @@ class TravelRepository(ABC):
         """Adds a sequence of AccommodationLog models to the repository."""
         raise NotImplementedError
 
+    @abstractmethod
+    async def copy_accommodation_logs(
+        self, accommodation_logs: Sequence[AccommodationLog]
+    ) -> int:
+        """Bulk loads AccommodationLog models, returning how many were new."""
+        raise NotImplementedError
+
     @abstractmethod
     async def upsert_accommodation_log(
         self, accommodation_logs: Sequence[AccommodationLog]
@@ -108,40 +108,127 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
                         f"Successfully added {len(args)} new log(s) to the repository."
                     )
 
+    async def copy_accommodation_logs(
+        self, accommodation_logs: Sequence[AccommodationLog]
+    ) -> int:
+        """Bulk loads AccommodationLog models with COPY, returning how many were new.
+
+        Logs are COPYed into a transaction-scoped staging table and merged in
+        one statement, skipping stays that already exist.
+        """
+        pool = await self._get_pool()
+        columns = (
+            "id",
+            "property_id",
+            "consultant_id",
+            "primary_traveler",
+            "num_pax",
+            "date_in",
+            "date_out",
+            "booking_channel_id",
+            "agency_id",
+            "created_at",
+            "updated_at",
+            "updated_by",
+        )
+        column_list = ", ".join(columns)
+        merge = dedent(
+            f"""
+            INSERT INTO public.accommodation_logs ({column_list})
+            SELECT {column_list} FROM accommodation_log_staging
+            ON CONFLICT (primary_traveler, property_id, date_in, date_out) DO NOTHING
+            """
+        )
+        records = [
+            (
+                log.id,
+                log.property_id,
+                log.consultant_id,
+                log.primary_traveler.strip(),
+                log.num_pax,
+                log.date_in,
+                log.date_out,
+                log.booking_channel_id,
+                log.agency_id,
+                log.created_at,
+                log.updated_at,
+                log.updated_by,
+            )
+            for log in accommodation_logs
+        ]
+        async with pool.acquire() as con:
+            async with con.transaction():
+                await con.execute(
+                    "CREATE TEMP TABLE accommodation_log_staging "
+                    "(LIKE public.accommodation_logs INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
+                await con.copy_records_to_table(
+                    "accommodation_log_staging", records=records, columns=columns
+                )
+                status = await con.execute(merge)
+        inserted = int(status.split()[-1])
+        print(f"Copied {len(records)} log(s), {inserted} new, into the repository.")
+        return inserted
+
     async def upsert_accommodation_log(
         self, accommodation_logs: Sequence[AccommodationLog]
     ) -> list[Tuple[UUID, bool, str]]:
         """Upserts a sequence of AccommodationLog models into the repository."""
         pool = await self._get_pool()
+        # accommodation_logs is partitioned by date_in, so id alone has no
+        # unique index for ON CONFLICT; update by id and insert if none matched.
+        # An update that changes date_in moves the row to its new partition.
+        # Nothing stops two upserts of a new id both inserting, so each batch
+        # first takes transaction-scoped advisory locks on its ids, in hash
+        # order to avoid deadlocks, and in a statement of its own so the
+        # upserts' snapshots see another batch's commit.
+        lock = dedent(
+            """
+            SELECT pg_advisory_xact_lock(key)
+            FROM (
+                SELECT DISTINCT hashtext(id::text) AS key
+                FROM unnest($1::uuid[]) AS id
+                ORDER BY key
+            ) AS keys
+            """
+        )
         query = dedent(
             """
-        INSERT INTO public.accommodation_logs (
-            id,
-            property_id,
-            consultant_id,
-            primary_traveler,
-            num_pax,
-            date_in,
-            date_out,
-            booking_channel_id,
-            agency_id,
-            updated_at,
-            updated_by
-        ) VALUES (
-            $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11
+        WITH updated AS (
+            UPDATE public.accommodation_logs SET
+                property_id = $2,
+                consultant_id = $3,
+                primary_traveler = $4,
+                num_pax = $5,
+                date_in = $6,
+                date_out = $7,
+                booking_channel_id = $8,
+                agency_id = $9,
+                updated_at = $10,
+                updated_by = $11
+            WHERE id = $1
+            RETURNING id
+        ), inserted AS (
+            INSERT INTO public.accommodation_logs (
+                id,
+                property_id,
+                consultant_id,
+                primary_traveler,
+                num_pax,
+                date_in,
+                date_out,
+                booking_channel_id,
+                agency_id,
+                updated_at,
+                updated_by
+            )
+            SELECT $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11
+            WHERE NOT EXISTS (SELECT 1 FROM updated)
+            RETURNING id
         )
-        ON CONFLICT (id) DO UPDATE SET
-            property_id = EXCLUDED.property_id,
-            consultant_id = EXCLUDED.consultant_id,
-            primary_traveler = EXCLUDED.primary_traveler,
-            num_pax = EXCLUDED.num_pax,
-            date_in = EXCLUDED.date_in,
-            date_out = EXCLUDED.date_out,
-            booking_channel_id = EXCLUDED.booking_channel_id,
-            agency_id = EXCLUDED.agency_id,
-            updated_at = EXCLUDED.updated_at,
-            updated_by = EXCLUDED.updated_by
-        RETURNING id, (xmax = 0) AS was_inserted;
+        SELECT id, FALSE AS was_inserted FROM updated
+        UNION ALL
+        SELECT id, TRUE AS was_inserted FROM inserted;
     """
         )
         results = []
@@ -150,6 +237,7 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
                 "jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
             )
             async with con.transaction():
+                await con.execute(lock, [log.id for log in accommodation_logs])
                 for log in accommodation_logs:
                     try:
                         args = (
@@ -218,20 +306,14 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
 
     async def get_all_accommodation_logs(self) -> Sequence[AccommodationLog]:
         """Gets all AccommodationLog models."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.accommodation_logs
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(query)
-                consultants = [AccommodationLog(**record) for record in records]
-                return consultants
+        records = await self._fetch(query)
+        consultants = [AccommodationLog(**record) for record in records]
+        return consultants
 
     async def get_accommodation_log(
         self,
@@ -241,7 +323,6 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
         date_out: datetime.date,
     ) -> AccommodationLog:
         """Gets a single AccommodationLog model in the repository by name."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.accommodation_logs
@@ -251,40 +332,34 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
             AND date_out = $4
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+        res = await self._fetchrow(
+            query,
+            primary_traveler.strip().upper(),
+            property_id,
+            date_in,
+            date_out,
+        )
+        if res:
+            return AccommodationLog(
+                id=res["id"],
+                property_id=res["property_id"],
+                consultant_id=res["consultant_id"],
+                primary_traveler=res["primary_traveler"],
+                num_pax=res["num_pax"],
+                date_in=res["date_in"],
+                date_out=res["date_out"],
+                booking_channel_id=res["booking_channel_id"],
+                agency_id=res["agency_id"],
+                created_at=res["created_at"],
+                updated_at=res["updated_at"],
+                updated_by=res["updated_by"],
             )
-            async with con.transaction():
-                res = await con.fetchrow(
-                    query,
-                    primary_traveler.strip().upper(),
-                    property_id,
-                    date_in,
-                    date_out,
-                )
-                if res:
-                    return AccommodationLog(
-                        id=res["id"],
-                        property_id=res["property_id"],
-                        consultant_id=res["consultant_id"],
-                        primary_traveler=res["primary_traveler"],
-                        num_pax=res["num_pax"],
-                        date_in=res["date_in"],
-                        date_out=res["date_out"],
-                        booking_channel_id=res["booking_channel_id"],
-                        agency_id=res["agency_id"],
-                        created_at=res["created_at"],
-                        updated_at=res["updated_at"],
-                        updated_by=res["updated_by"],
-                    )
 
     async def get_accommodation_log_by_ids(
         self,
         log_ids: Sequence[UUID],
     ) -> Sequence[AccommodationLog]:
         """Gets a single AccommodationLog model in the repository by ID."""
-        pool = await self._get_pool()
         # query = dedent(
         #     """
         #     SELECT * FROM public.accommodation_logs
@@ -296,14 +371,9 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
             SELECT * FROM public.accommodation_logs
             WHERE id IN ({placeholders})
         """
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                # res = await con.fetchrow(query, log_id)
-                res = await con.fetch(query, *log_ids)
-                return [AccommodationLog(**record) for record in res]
+        # res = await self._fetchrow(query, log_id)
+        res = await self._fetch(query, *log_ids)
+        return [AccommodationLog(**record) for record in res]
 
     async def update_accommodation_log(
         self, accommodation_logs: Sequence[AccommodationLog]
@@ -469,7 +539,6 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
             portfolio_id_uuid = portfolio_id
 
         # Pass the UUID conversions to the function
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.properties
@@ -479,41 +548,30 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
             AND core_destination_id IS NOT DISTINCT FROM $4
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                res = await con.fetchrow(
-                    query,
-                    name.strip().upper(),
-                    portfolio_id_uuid,
-                    country_id_uuid,
-                    core_destination_id_uuid,
-                )
-                if res:
-                    return Property(**res)
+        res = await self._fetchrow(
+            query,
+            name.strip().upper(),
+            portfolio_id_uuid,
+            country_id_uuid,
+            core_destination_id_uuid,
+        )
+        if res:
+            return Property(**res)
 
     async def get_property_by_id(
         self,
         property_id: UUID,
     ) -> Property:
         """Returns a single Property model in the repository by id."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.properties
             WHERE id = $1
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                res = await con.fetchrow(query, property_id)
-                if res:
-                    return Property(**res)
+        res = await self._fetchrow(query, property_id)
+        if res:
+            return Property(**res)
 
     async def update_property(self, properties: Sequence[Property]) -> None:
         """Updates a sequence of Property models in the repository."""
@@ -547,20 +605,14 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
 
     async def get_all_properties(self) -> Sequence[Property]:
         """Gets all Property models."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.properties
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(query)
-                properties = [Property(**record) for record in records]
-                return properties
+        records = await self._fetch(query)
+        properties = [Property(**record) for record in records]
+        return properties
 
     # PropertyDetail
     async def get_property_detail_by_id(
@@ -568,21 +620,15 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
         property_id: UUID,
     ) -> PropertyDetail:
         """Returns a single PropertyDetail model in the repository by id."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.property_details
             WHERE property_id = $1
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                res = await con.fetchrow(query, property_id)
-                if res:
-                    return PropertyDetail(**res)
+        res = await self._fetchrow(query, property_id)
+        if res:
+            return PropertyDetail(**res)
 
     async def upsert_property_detail(
         self, property_data: PropertyDetail
@@ -716,26 +762,19 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
 
     async def get_all_consultants(self) -> Sequence[Consultant]:
         """Gets all Consultant models."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.consultants
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(query)
-                consultants = [Consultant(**record) for record in records]
-                return consultants
+        records = await self._fetch(query)
+        consultants = [Consultant(**record) for record in records]
+        return consultants
 
     async def get_consultant_by_name(
         self, first_name: str, last_name: str
     ) -> Consultant:
         """Returns a single Consultant model in the repository by name."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.consultants
@@ -743,16 +782,11 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
             AND UPPER(last_name) = $2
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                res = await con.fetchrow(
-                    query, first_name.strip().upper(), last_name.strip().upper()
-                )
-                if res:
-                    return Consultant(**res)
+        res = await self._fetchrow(
+            query, first_name.strip().upper(), last_name.strip().upper()
+        )
+        if res:
+            return Consultant(**res)
 
     async def update_consultant(self, consultants: Sequence[Consultant]) -> None:
         """Updates a sequence of Consultant models in the repository."""
@@ -822,21 +856,15 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
 
     async def get_consultant_by_id(self, consultant_id: UUID) -> Consultant:
         """Gets a single Consultant model based on id."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.consultants
             WHERE id = $1
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                res = await con.fetchrow(query, consultant_id)
-                if res:
-                    return Consultant(**res)
+        res = await self._fetchrow(query, consultant_id)
+        if res:
+            return Consultant(**res)
 
     async def delete_consultant(self, consultant_id: UUID) -> Optional[dict]:
         """Deletes a sequence of Consultant models from the repository."""
@@ -970,69 +998,50 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
 
     async def get_core_destination_by_name(self, name: str) -> CoreDestination:
         """Returns a single CoreDestination model in the repository by name."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.core_destinations
             WHERE UPPER(name) = $1
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+        res = await self._fetchrow(query, name.strip().upper())
+        if res:
+            return CoreDestination(
+                id=res["id"],
+                name=res["name"],
+                created_at=res["created_at"],
+                updated_at=res["updated_at"],
+                updated_by=res["updated_by"],
             )
-            async with con.transaction():
-                res = await con.fetchrow(query, name.strip().upper())
-                if res:
-                    return CoreDestination(
-                        id=res["id"],
-                        name=res["name"],
-                        created_at=res["created_at"],
-                        updated_at=res["updated_at"],
-                        updated_by=res["updated_by"],
-                    )
 
     async def get_core_destination_by_id(
         self, core_destination_id: UUID
     ) -> CoreDestination:
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.core_destinations
             WHERE id = $1
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                res = await con.fetchrow(query, core_destination_id)
-                if res:
-                    return CoreDestination(**res)
+        res = await self._fetchrow(query, core_destination_id)
+        if res:
+            return CoreDestination(**res)
 
     async def get_all_core_destinations(self) -> Sequence[CoreDestination]:
         """Gets all of CoreDestination models from the repository."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.core_destinations
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(query)
-                agencies = [CoreDestination(**record) for record in records]
-                return agencies
+        records = await self._fetch(query)
+        agencies = [CoreDestination(**record) for record in records]
+        return agencies
 
     async def get_core_destinations_by_name(
         self, names: Sequence[str]
     ) -> Sequence[CoreDestination]:
         """Returns the list of CoreDestination models in the repository by name."""
-        pool = await self._get_pool()
         upper_names = [name.strip().upper() for name in names]
         query = dedent(
             """
@@ -1040,22 +1049,17 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
             WHERE UPPER(name) = ANY($1::text[])
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                rows = await con.fetch(query, upper_names)
-                return [
-                    CoreDestination(
-                        id=row["id"],
-                        name=row["name"],
-                        created_at=row["created_at"],
-                        updated_at=row["updated_at"],
-                        updated_by=row["updated_by"],
-                    )
-                    for row in rows
-                ]
+        rows = await self._fetch(query, upper_names)
+        return [
+            CoreDestination(
+                id=row["id"],
+                name=row["name"],
+                created_at=row["created_at"],
+                updated_at=row["updated_at"],
+                updated_by=row["updated_by"],
+            )
+            for row in rows
+        ]
 
     async def update_core_destination(
         self, core_destinations: Sequence[CoreDestination]
@@ -1198,24 +1202,17 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
 
     async def get_all_countries(self) -> Sequence[Country]:
         """Gets all Country models."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.countries
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(query)
-                countries = [Country(**record) for record in records]
-                return countries
+        records = await self._fetch(query)
+        countries = [Country(**record) for record in records]
+        return countries
 
     async def get_countries_by_name(self, names: Sequence[str]) -> Sequence[Country]:
         """Returns the list of Country models in the repository by name."""
-        pool = await self._get_pool()
         upper_names = [name.strip().upper() for name in names]
         query = dedent(
             """
@@ -1223,65 +1220,48 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
             WHERE UPPER(name) = ANY($1::text[])
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                rows = await con.fetch(query, upper_names)
-                return [
-                    Country(
-                        id=row["id"],
-                        name=row["name"],
-                        created_at=row["created_at"],
-                        updated_at=row["updated_at"],
-                        updated_by=row["updated_by"],
-                    )
-                    for row in rows
-                ]
+        rows = await self._fetch(query, upper_names)
+        return [
+            Country(
+                id=row["id"],
+                name=row["name"],
+                created_at=row["created_at"],
+                updated_at=row["updated_at"],
+                updated_by=row["updated_by"],
+            )
+            for row in rows
+        ]
 
     async def get_country_by_name(self, name: str) -> Country:
         """Returns a single Country model in the repository by name."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.countries
             WHERE UPPER(name) = $1
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+        res = await self._fetchrow(query, name.upper())
+        if res:
+            return Country(
+                id=res["id"],
+                name=res["name"],
+                core_destination_id=res["core_destination_id"],
+                created_at=res["created_at"],
+                updated_at=res["updated_at"],
+                updated_by=res["updated_by"],
             )
-            async with con.transaction():
-                res = await con.fetchrow(query, name.upper())
-                if res:
-                    return Country(
-                        id=res["id"],
-                        name=res["name"],
-                        core_destination_id=res["core_destination_id"],
-                        created_at=res["created_at"],
-                        updated_at=res["updated_at"],
-                        updated_by=res["updated_by"],
-                    )
 
     async def get_country_by_id(self, country_id: UUID) -> None:
         """Gets a single Country model based on ID."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.countries
             WHERE id = $1
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                res = await con.fetchrow(query, country_id)
-                if res:
-                    return Country(**res)
+        res = await self._fetchrow(query, country_id)
+        if res:
+            return Country(**res)
 
     # Agency
     async def add_agency(self, agencies: Sequence[Agency]) -> None:
@@ -1322,62 +1302,44 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
 
     async def get_agency_by_name(self, name: str) -> Agency:
         """Returns a single Agency model in the repository by name."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.agencies
             WHERE UPPER(name) = $1
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+        res = await self._fetchrow(query, name.strip().upper())
+        if res:
+            return Agency(
+                id=res["id"],
+                name=res["name"],
+                created_at=res["created_at"],
+                updated_at=res["updated_at"],
+                updated_by=res["updated_by"],
             )
-            async with con.transaction():
-                res = await con.fetchrow(query, name.strip().upper())
-                if res:
-                    return Agency(
-                        id=res["id"],
-                        name=res["name"],
-                        created_at=res["created_at"],
-                        updated_at=res["updated_at"],
-                        updated_by=res["updated_by"],
-                    )
 
     async def get_agency_by_id(self, agency_id: UUID) -> Agency:
         """Gets a single Agency model based on id."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.agencies
             WHERE id = $1
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                res = await con.fetchrow(query, agency_id)
-                if res:
-                    return Agency(**res)
+        res = await self._fetchrow(query, agency_id)
+        if res:
+            return Agency(**res)
 
     async def get_all_agencies(self) -> Sequence[Agency]:
         """Gets all Agency models from the repository."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.agencies
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(query)
-                agencies = [Agency(**record) for record in records]
-                return agencies
+        records = await self._fetch(query)
+        agencies = [Agency(**record) for record in records]
+        return agencies
 
     async def upsert_agency(self, agency_data: Agency) -> list[Tuple[UUID, bool]]:
         """Updates or inserts an agency into the repository."""
@@ -1509,64 +1471,46 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
 
     async def get_booking_channel_by_name(self, name: str) -> BookingChannel:
         """Gets a single BookingChannel model from the repository by name."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.booking_channels
             WHERE UPPER(name) = $1
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+        res = await self._fetchrow(query, name.strip().upper())
+        if res:
+            return BookingChannel(
+                id=res["id"],
+                name=res["name"],
+                created_at=res["created_at"],
+                updated_at=res["updated_at"],
+                updated_by=res["updated_by"],
             )
-            async with con.transaction():
-                res = await con.fetchrow(query, name.strip().upper())
-                if res:
-                    return BookingChannel(
-                        id=res["id"],
-                        name=res["name"],
-                        created_at=res["created_at"],
-                        updated_at=res["updated_at"],
-                        updated_by=res["updated_by"],
-                    )
 
     async def get_booking_channel_by_id(
         self, booking_channel_id: UUID
     ) -> BookingChannel:
         """Gets a single BookingChannel model based on id."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.booking_channels
             WHERE id = $1
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                res = await con.fetchrow(query, booking_channel_id)
-                if res:
-                    return BookingChannel(**res)
+        res = await self._fetchrow(query, booking_channel_id)
+        if res:
+            return BookingChannel(**res)
 
     async def get_all_booking_channels(self) -> Sequence[BookingChannel]:
         """Gets all BookingChannel models from the repository."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.booking_channels
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(query)
-                agencies = [BookingChannel(**record) for record in records]
-                return agencies
+        records = await self._fetch(query)
+        agencies = [BookingChannel(**record) for record in records]
+        return agencies
 
     async def upsert_booking_channel(
         self, booking_channel_data: BookingChannel
@@ -1759,21 +1703,15 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
 
     async def get_portfolio_by_id(self, portfolio_id: UUID) -> Portfolio:
         """Gets a single Portfolio model based on id."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.portfolios
             WHERE id = $1
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                res = await con.fetchrow(query, portfolio_id)
-                if res:
-                    return BookingChannel(**res)
+        res = await self._fetchrow(query, portfolio_id)
+        if res:
+            return BookingChannel(**res)
 
     async def delete_portfolio(self, portfolio_id: UUID) -> Optional[UUID]:
         """Deletes a sequence of Portfolio models from the repository."""
@@ -1808,44 +1746,32 @@ class PostgresTravelRepository(PostgresMixin, TravelRepository):
 
     async def get_portfolio_by_name(self, name: str) -> Portfolio:
         """Gets a single Portfolio model based on name."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.portfolios
             WHERE UPPER(name) = $1
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+        res = await self._fetchrow(query, name.strip().upper())
+        if res:
+            return Portfolio(
+                id=res["id"],
+                name=res["name"],
+                created_at=res["created_at"],
+                updated_at=res["updated_at"],
+                updated_by=res["updated_by"],
             )
-            async with con.transaction():
-                res = await con.fetchrow(query, name.strip().upper())
-                if res:
-                    return Portfolio(
-                        id=res["id"],
-                        name=res["name"],
-                        created_at=res["created_at"],
-                        updated_at=res["updated_at"],
-                        updated_by=res["updated_by"],
-                    )
 
     async def get_all_portfolios(self) -> Sequence[Portfolio]:
         """Gets all Portfolio models."""
-        pool = await self._get_pool()
         query = dedent(
             """
             SELECT * FROM public.portfolios
             """
         )
-        async with pool.acquire() as con:
-            await con.set_type_codec(
-                "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
-            )
-            async with con.transaction():
-                records = await con.fetch(query)
-                agencies = [Portfolio(**record) for record in records]
-                return agencies
+        records = await self._fetch(query)
+        agencies = [Portfolio(**record) for record in records]
+        return agencies
 
     async def add_trip(self, trips: Sequence[Trip]) -> None:
         """Adds a sequence of Trip models to the repository."""
@@ -14,6 +14,7 @@
 
 """Services for interacting with travel entries."""
 import datetime
+import functools
 from collections import defaultdict
 from re import S
 from typing import Optional, Sequence, Union, Tuple, Dict, List, Any
@@ -46,6 +47,20 @@ from api.services.travel.models import (
 from api.services.travel.repository.postgres import PostgresTravelRepository
 
 
+def changes_report_data(method):
+    """Bumps the report data version once a method that writes report data ends."""
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            # Also after a failure, since it may have written part of a batch
+            SummaryService.invalidate_reports()
+
+    return wrapper
+
+
 class TravelService:
     """Service for interfacing with the travel repository."""
 
@@ -56,6 +71,7 @@ class TravelService:
         self._summary_svc = SummaryService()
 
     # AccommodationLog
+    @changes_report_data
     async def add_accommodation_log(self, models: Sequence[AccommodationLog]) -> None:
         """Adds accommodation log model to the repository."""
         existing_records = await self._repo.get_all_accommodation_logs()
@@ -76,6 +92,13 @@ class TravelService:
         ]
         await self._repo.add_accommodation_log(to_be_added)
 
+    @changes_report_data
+    async def bulk_add_accommodation_logs(
+        self, models: Sequence[AccommodationLog]
+    ) -> int:
+        """Bulk loads accommodation logs, skipping stays that already exist."""
+        return await self._repo.copy_accommodation_logs(models)
+
     async def get_accommodation_log(
         self,
         primary_traveler: str,
@@ -92,6 +115,7 @@ class TravelService:
             date_out,
         )
 
+    @changes_report_data
     async def delete_accommodation_log(self, log_id: UUID, user_email: str):
         """Deletes an AccommodationLog."""
         filters = {
@@ -143,6 +167,7 @@ class TravelService:
         logs = await self._repo.get_accommodation_log_by_ids([log_id])
         return logs[0]
 
+    @changes_report_data
     async def process_accommodation_log_requests(
         self, log_requests: Sequence[PatchAccommodationLogRequest]
     ) -> dict:
@@ -503,6 +528,7 @@ class TravelService:
             return property_created.id, audit_log
 
     # Country
+    @changes_report_data
     async def add_country(self, models: Sequence[Country]) -> None:
         """Adds country model to the repository."""
         # Only add countries that don't already exist
@@ -551,6 +577,7 @@ class TravelService:
         """Gets a sequence of Country models by country name."""
         return await self._repo.get_countries_by_name(names)
 
+    @changes_report_data
     async def process_country_request(
         self, country_request: PatchCountryRequest
     ) -> dict:
@@ -660,6 +687,7 @@ class TravelService:
 
             return new_country, audit_log
 
+    @changes_report_data
     async def delete_country(self, country_id: UUID, user_email: str):
         """Deletes a Country."""
         impact_info = await self._summary_svc.get_related_records_summary(
@@ -697,6 +725,7 @@ class TravelService:
         return deleted
 
     # CoreDestination
+    @changes_report_data
     async def add_core_destination(self, models: Sequence[CoreDestination]) -> None:
         """Adds core destination model to the repository."""
         # Only add countries that don't already exist
@@ -742,6 +771,7 @@ class TravelService:
         """Gets a sequence of CoreDestination models by core destination name"""
         return await self._repo.get_core_destination_by_name(name)
 
+    @changes_report_data
     async def process_core_destination_request(
         self, core_dest_request: PatchCoreDestinationRequest
     ) -> dict:
@@ -838,6 +868,7 @@ class TravelService:
             return new_core_dest, audit_log
 
     # Property
+    @changes_report_data
     async def add_property(self, models: Sequence[Property]) -> None:
         """Adds Property models to the repository."""
         # Only add records that don't already exist
@@ -887,6 +918,7 @@ class TravelService:
         """Gets all Property models."""
         return await self._repo.get_all_properties()
 
+    @changes_report_data
     async def process_property_request(
         self, property_request: PatchPropertyRequest
     ) -> dict:
@@ -1045,6 +1077,7 @@ class TravelService:
         """Gets a single Property model by id."""
         return await self._repo.get_property_by_id(property_id)
 
+    @changes_report_data
     async def delete_property(
         self, property_id: UUID, user_email: str
     ) -> Union[bool, dict]:
@@ -1090,6 +1123,7 @@ class TravelService:
         """Gets a single PropertyDetail model by id."""
         return await self._repo.get_property_detail_by_id(property_id)
 
+    @changes_report_data
     async def process_property_detail_request(
         self, property_detail_request: PatchPropertyDetailRequest
     ) -> dict:
@@ -1187,6 +1221,7 @@ class TravelService:
             return new_property_detail, audit_log
 
     # Agency
+    @changes_report_data
     async def add_agency(self, models: Sequence[Agency]) -> None:
         """Adds Agency models to the repository."""
         # Only add records that don't already exist
@@ -1224,6 +1259,7 @@ class TravelService:
         """Gets a single Agency model by id."""
         return await self._repo.get_agency_by_id(agency_id)
 
+    @changes_report_data
     async def process_agency_request(self, agency_request: PatchAgencyRequest) -> dict:
         """Adds or edits agency models in the repository."""
         prepared_data_or_error = await self.prepare_agency_data(agency_request)
@@ -1313,6 +1349,7 @@ class TravelService:
             )
             return new_agency, audit_log
 
+    @changes_report_data
     async def delete_agency(self, agency_id: UUID, user_email: str):
         """Deletes an Agency."""
         impact_info = await self._summary_svc.get_related_records_summary(
@@ -1340,6 +1377,7 @@ class TravelService:
         return True
 
     # BookingChannel
+    @changes_report_data
     async def add_booking_channel(self, models: Sequence[BookingChannel]) -> None:
         """Adds BookingChannel models to the repository."""
         # Only add records that don't already exist
@@ -1379,6 +1417,7 @@ class TravelService:
         """Gets a single BookingChannel model by id."""
         return await self._repo.get_booking_channel_by_id(booking_channel_id)
 
+    @changes_report_data
     async def process_booking_channel_request(
         self, booking_channel_request: PatchBookingChannelRequest
     ) -> dict:
@@ -1474,6 +1513,7 @@ class TravelService:
             )
             return new_booking_channel, audit_log
 
+    @changes_report_data
     async def delete_booking_channel(self, booking_channel_id: UUID, user_email: str):
         """Deletes a BookingChannel."""
         impact_info = await self._summary_svc.get_related_records_summary(
@@ -1500,6 +1540,7 @@ class TravelService:
         return True
 
     # Portfolio
+    @changes_report_data
     async def add_portfolio(self, models: Sequence[Portfolio]) -> None:
         """Adds Portfolio models to the repository."""
         # Only add records that don't already exist
@@ -1526,6 +1567,7 @@ class TravelService:
         # await self.process_audit_logs(audit_logs)
         await self._repo.add_portfolio(to_be_added)
 
+    @changes_report_data
     async def process_portfolio_request(
         self, portfolio_request: PatchPortfolioRequest
     ) -> dict:
@@ -1631,6 +1673,7 @@ class TravelService:
         """Gets all Agency models."""
         return await self._repo.get_all_portfolios()
 
+    @changes_report_data
     async def delete_portfolio(self, portfolio_id: UUID, user_email: str):
         """Deletes a Portfolio."""
         impact_info = await self._summary_svc.get_related_records_summary(
@@ -1657,6 +1700,7 @@ class TravelService:
         return True
 
     # Consultant
+    @changes_report_data
     async def add_consultant(self, models: Sequence[Consultant]) -> None:
         """Adds BookingChannel models to the repository."""
         # Only add records that don't already exist
@@ -1712,6 +1756,7 @@ class TravelService:
         """Gets a single Consultant model by id."""
         return await self._repo.get_consultant_by_id(consultant_id)
 
+    @changes_report_data
     async def process_consultant_request(
         self, consultant_request: PatchConsultantRequest
     ) -> dict:
@@ -1814,6 +1859,7 @@ class TravelService:
             )
             return new_consultant, audit_log
 
+    @changes_report_data
     async def delete_consultant(self, consultant_id: UUID, user_email: str):
         """Deletes a Consultant."""
         impact_info = await self._summary_svc.get_related_records_summary(
@@ -1891,6 +1937,7 @@ class TravelService:
         await self.process_audit_logs(audit_log)
         return deleted
 
+    @changes_report_data
     async def update_trip_id(
         self, log_ids: Sequence[UUID], trip_id: UUID | None, updated_by: str
     ) -> None:
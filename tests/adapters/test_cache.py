@@ -0,0 +1,41 @@
+# Copyright 2024 SH
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Cache adapter tests."""
+
+from api.adapters.cache import TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    lru = TTLCache(maxsize=2, ttl=60)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+    assert lru.get("b") is None
+    assert (lru.get("a"), lru.get("c"), len(lru)) == (1, 3, 2)
+
+
+def test_ttl_cache_expires_entries():
+    now = [1000.0]
+    ttl = TTLCache(maxsize=10, ttl=30, clock=lambda: now[0])
+    ttl.set("short", 1, ttl=5)
+    ttl.set("capped", 2, ttl=300)
+    ttl.set("expired", 3, ttl=-1)
+    now[0] += 10
+    assert ttl.get("short") is None
+    assert ttl.get("capped") == 2
+    assert ttl.get("expired") is None
+    now[0] += 30
+    assert ttl.get("capped") is None
+    assert len(ttl) == 0
@@ -0,0 +1,101 @@
+# Copyright 2024 SH
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Job runner adapter tests."""
+
+import asyncio
+import os
+
+import pytest
+
+from api.adapters.jobs import DONE, FAILED, JobLimitError, JobResult, JobRunner
+
+
+async def wait_for(runner: JobRunner, job_id: str, owner: str):
+    for _ in range(100):
+        job = runner.get(job_id, owner)
+        if job.status in (DONE, FAILED):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+async def test_job_runner_writes_result_to_disk(tmp_path):
+    runner = JobRunner(directory=str(tmp_path), workers=1, per_owner=1, ttl=60)
+
+    async def work():
+        return JobResult(b"report", "text/plain", "report.txt")
+
+    job = runner.submit("a@abc.com", "report", work)
+    job = await wait_for(runner, job.id, "a@abc.com")
+    assert job.status == DONE
+    with open(job.path, "rb") as f:
+        assert f.read() == b"report"
+    assert runner.get(job.id, "b@abc.com") is None
+
+
+async def test_job_runner_limits_unfinished_jobs_per_owner(tmp_path):
+    runner = JobRunner(directory=str(tmp_path), workers=2, per_owner=1, ttl=60)
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        return JobResult(b"", "text/plain", "empty.txt")
+
+    job = runner.submit("a@abc.com", "report", work)
+    with pytest.raises(JobLimitError):
+        runner.submit("a@abc.com", "report", work)
+    other = runner.submit("b@abc.com", "report", work)
+    release.set()
+    await wait_for(runner, job.id, "a@abc.com")
+    await wait_for(runner, other.id, "b@abc.com")
+    runner.submit("a@abc.com", "report", work)
+    await runner.shutdown()
+
+
+async def test_job_runner_records_failures_and_expires_results(tmp_path):
+    now = [1000.0]
+    runner = JobRunner(
+        directory=str(tmp_path), workers=1, per_owner=2, ttl=60, clock=lambda: now[0]
+    )
+
+    async def work():
+        return JobResult(b"report", "text/plain", "report.txt")
+
+    async def broken():
+        raise ValueError("No data")
+
+    done = await wait_for(runner, runner.submit("a", "report", work).id, "a")
+    failed = await wait_for(runner, runner.submit("a", "report", broken).id, "a")
+    assert (failed.status, failed.error) == (FAILED, "No data")
+
+    now[0] += 61
+    assert runner.get(done.id, "a") is None
+    assert runner.get(failed.id, "a") is None
+    assert not os.path.exists(done.path)
+
+
+async def test_job_runner_shutdown_cancels_jobs_without_leaving_files(tmp_path):
+    runner = JobRunner(directory=str(tmp_path), workers=1, per_owner=2, ttl=60)
+    started = asyncio.Event()
+
+    async def work():
+        started.set()
+        await asyncio.Event().wait()
+
+    job = runner.submit("a", "report", work)
+    queued = runner.submit("a", "report", work)
+    await started.wait()
+    await runner.shutdown()
+    assert (job.status, queued.status) == (FAILED, FAILED)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,71 @@
+# Copyright 2024 SH
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Repository adapter tests."""
+
+import asyncpg
+import pytest
+
+from api.adapters.repository import (
+    ConnectionPoolManager,
+    PostgresMixin,
+    connection_configuration,
+    read_your_writes,
+    replica_read,
+)
+
+
+class ApplicationNameProbe(PostgresMixin):
+    """Reports which pool served a read via the connection's application name."""
+
+    query = "SELECT current_setting('application_name') AS name"
+
+    @replica_read
+    async def replica_name(self) -> str:
+        return (await self._fetchrow(self.query))["name"]
+
+    async def primary_name(self) -> str:
+        return (await self._fetchrow(self.query))["name"]
+
+
+@pytest.fixture
+async def replica_pool(monkeypatch):
+    """Stands in for a replica with a second pool tagged by application name."""
+    configuration = connection_configuration()
+    configuration.update(min_size=1, max_size=2)
+    pool = await asyncpg.create_pool(
+        **configuration, server_settings={"application_name": "replica"}
+    )
+    monkeypatch.setattr(ConnectionPoolManager, "_replica_pool", pool)
+    yield pool
+    await pool.close()
+
+
+async def test_replica_reads_are_routed(replica_pool):
+    probe = ApplicationNameProbe()
+    assert await probe.replica_name() == "replica"
+    assert await probe.primary_name() != "replica"
+
+
+async def test_read_your_writes_uses_primary(replica_pool):
+    probe = ApplicationNameProbe()
+    with read_your_writes():
+        assert await probe.replica_name() != "replica"
+    assert await probe.replica_name() == "replica"
+
+
+async def test_replica_falls_back_to_primary(monkeypatch):
+    monkeypatch.delenv("POSTGRES_REPLICA_DSN", raising=False)
+    assert (
+        await ConnectionPoolManager.get_replica() is await ConnectionPoolManager.get()
+    )
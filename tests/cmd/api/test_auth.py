@@ -1,5 +1,6 @@
+import asyncio
 from httpx import AsyncClient
-from api.cmd.api.main import get_current_user
+from api.cmd.api.main import decode_token, get_current_user
 from api.services.auth.models import User
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
@@ -27,7 +28,7 @@ async def get_test_user(ac: AsyncClient, auth_service, pw: str):
         "password": pw,
         "role": "sales_support",
     }
-    hashed_password = auth_service.hash_password(user_data["password"])
+    hashed_password = await auth_service.hash_password(user_data["password"])
     return User(
         email=user_data["email"],
         hashed_password=hashed_password,
@@ -121,3 +122,61 @@ async def test_get_current_user_jwterror(mock_auth_service):
         assert exc_info.value.status_code == 401
         assert exc_info.value.detail == "Could not validate credentials"
         assert exc_info.value.headers == {"WWW-Authenticate": "Bearer"}
+
+
+async def test_token_endpoint_throttles_concurrent_logins(
+    ac: AsyncClient, auth_service
+):
+    test_pw = "throttledpassword"
+    auth_user = await get_test_user(ac, auth_service, test_pw)
+    auth_user.email = "throttled@example.com"
+    await auth_service.add_user([auth_user])
+    auth_service.LOGINS_PER_ACCOUNT = 1
+
+    data = {"email": auth_user.email, "password": test_pw}
+    first = asyncio.create_task(ac.post(url="/token", data=data))
+    # Ticks keep running while bcrypt verifies on the hashing threads
+    ticks = 0
+    while not first.done() and not auth_service._logins_in_flight:
+        await asyncio.sleep(0)
+    second = await ac.post(url="/token", data=data)
+    while not first.done():
+        ticks += 1
+        await asyncio.sleep(0.001)
+    assert second.status_code == 429
+    assert (await first).status_code == 200
+    assert ticks > 1
+    assert not auth_service._logins_in_flight
+
+
+async def test_get_user_is_cached_until_invalidated(auth_service, monkeypatch):
+    calls = []
+    repo_get_user = auth_service._repo.get_user
+
+    async def counting_get_user(email):
+        calls.append(email)
+        return await repo_get_user(email)
+
+    monkeypatch.setattr(auth_service._repo, "get_user", counting_get_user)
+    auth_user = await get_test_user(None, auth_service, "cachedpassword")
+    auth_user.email = "cached@example.com"
+    await auth_service.add_user([auth_user])
+    calls.clear()
+
+    assert (await auth_service.get_user(auth_user.email)).email == auth_user.email
+    assert (await auth_service.get_user(auth_user.email)).email == auth_user.email
+    assert calls == [auth_user.email]
+    auth_service.invalidate_user(auth_user.email)
+    await auth_service.get_user(auth_user.email)
+    assert len(calls) == 2
+
+
+def test_decode_token_reuses_verified_payload(auth_service):
+    token = create_test_token(
+        "testuser@example.com", auth_service.SECRET_KEY, auth_service.ALGORITHM
+    )
+    assert decode_token(token, auth_service)["sub"] == "testuser@example.com"
+    with patch("api.cmd.api.main.jwt.decode", side_effect=JWTError("not called")):
+        assert decode_token(token, auth_service)["sub"] == "testuser@example.com"
+        with pytest.raises(JWTError):
+            decode_token(token + "x", auth_service)
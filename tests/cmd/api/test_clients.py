@@ -13,8 +13,11 @@
 # limitations under the License.
 """API tests."""
 
+from datetime import date, datetime
 from httpx import AsyncClient
 from uuid import uuid4
+from api.adapters.repository import ConnectionPoolManager
+from api.services.reservations.models import Reservation
 import logging
 import pytest
 
@@ -114,6 +117,70 @@ async def test_add_client_referrals(ac: AsyncClient):
     assert updated_new_client["referred_by_id"] == original_client["id"]
 
 
+async def test_client_referrals_use_reservation_stats(
+    ac: AsyncClient, reservation_service
+):
+    clients = await get_clients(ac)
+    new_client = next(client for client in clients if client["first_name"] == "New")
+    # Referral matches are keyed on the ClientBase name
+    pool = await ConnectionPoolManager.get()
+    await pool.execute(
+        "UPDATE public.clients SET cb_name = last_name || '/' || first_name"
+    )
+    now = datetime.now()
+    await reservation_service.add(
+        [
+            Reservation(
+                id=uuid4(),
+                client_id=client["id"],
+                cost=cost,
+                start_date=start_date,
+                created_at=now,
+                updated_at=now,
+                updated_by="test",
+            )
+            for client in clients
+            for cost, start_date in ((1000, date(2022, 5, 1)), (3000, date(2023, 7, 1)))
+        ]
+    )
+
+    res = await ac.get(url="/v1/client_referrals")
+    assert res.status_code == 200
+    match = next(
+        match for match in res.json() if match["new_client_id"] == new_client["id"]
+    )
+    assert match["new_client_num_trips"] == 2
+    assert match["new_client_total_trip_spend"] == 4000
+    assert match["new_client_avg_trip_spend"] == 2000
+    assert match["new_client_latest_trip"] == "2023-07-01"
+
+
+async def test_get_client_referral_lineage(ac: AsyncClient):
+    clients = await get_clients(ac)
+    original_client = next(c for c in clients if c["first_name"] == "Original")
+    new_client = next(c for c in clients if c["first_name"] == "New")
+
+    res = await ac.get(url=f"/v1/clients/{original_client['id']}/referrals")
+    assert res.status_code == 200
+    lineage = res.json()
+    assert lineage["ancestors"] == []
+    assert [node["id"] for node in lineage["descendants"]] == [
+        original_client["id"],
+        new_client["id"],
+    ]
+    assert lineage["descendants"][0]["subtree_spend"] == 8000
+
+    res = await ac.get(
+        url=f"/v1/clients/{new_client['id']}/referrals", params={"max_depth": 1}
+    )
+    lineage = res.json()
+    assert [node["id"] for node in lineage["ancestors"]] == [original_client["id"]]
+    assert lineage["descendants"][0]["subtree_spend"] == 4000
+
+    res = await ac.get(url=f"/v1/clients/{uuid4()}/referrals")
+    assert res.status_code == 404
+
+
 async def test_get_clients(ac: AsyncClient):
     res = await ac.get(url="/v1/clients")
     assert res.status_code == 200
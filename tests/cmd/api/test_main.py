@@ -13,11 +13,16 @@
 # limitations under the License.
 """API tests."""
 
+import asyncio
 from httpx import AsyncClient
+import json
 from uuid import uuid4
 import logging
 import pytest
 
+from api.adapters.jobs import JobRunner
+from api.cmd.api.main import make_app
+
 
 log = logging.getLogger("rr")
 
@@ -388,6 +393,27 @@ async def test_get_related_entries(ac: AsyncClient):
     related_entries = res.json()
     assert related_entries["can_modify"] == False
     assert len(related_entries["affected_logs"]) == 1
+    assert related_entries["affected_count"] == 1
+
+
+async def test_get_related_entries_count_only(ac: AsyncClient):
+    property_res = await ac.get(url="/v1/properties")
+    property = property_res.json()[0]
+    data = {
+        "identifier": property["id"],
+        "identifier_type": "property_id",
+        "sample_size": 0,
+    }
+    res = await ac.get(url="/v1/related_entries", params=data)
+    assert res.status_code == 200
+    related_entries = res.json()
+    assert related_entries["affected_count"] == 1
+    assert related_entries["affected_count_capped"] == False
+    assert related_entries["affected_logs"] == []
+
+    data["identifier_type"] = "property_name"
+    res = await ac.get(url="/v1/related_entries", params=data)
+    assert res.status_code == 400
 
 
 async def test_get_overlaps(ac: AsyncClient):
@@ -395,6 +421,15 @@ async def test_get_overlaps(ac: AsyncClient):
     assert res.status_code == 200
 
 
+async def test_get_potential_duplicates(ac: AsyncClient):
+    params = {"start_date": "2017-01-01", "end_date": "2028-01-01"}
+    res = await ac.get(url="/v1/potential_duplicates", params=params)
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+    for line in res.text.splitlines():
+        assert json.loads(line)["overlap_days"] > 0
+
+
 async def test_get_bed_night_report(ac: AsyncClient):
     res = await ac.get(url="/v1/bed_night_report")
     assert res.status_code == 200
@@ -752,3 +787,57 @@ async def test_delete_portfolio_no_related_entries(ac: AsyncClient):
 async def test_delete_portfolio_not_found(ac: AsyncClient):
     res = await ac.delete(url=f"/v1/portfolios/{uuid4()}")
     assert res.status_code == 404
+
+
+async def test_export_bed_night_report_job(ac: AsyncClient):
+    params = {"report_title": "Test Report"}
+    res = await ac.post(url="/v1/jobs/export_bed_night_report", params=params)
+    assert res.status_code == 202
+    job_id = res.json()["job_id"]
+    for _ in range(200):
+        job = (await ac.get(url=f"/v1/jobs/{job_id}")).json()
+        if job["status"] in ("done", "failed"):
+            break
+        await asyncio.sleep(0.05)
+    assert job["status"] == "done"
+    res = await ac.get(url=f"/v1/jobs/{job_id}/download")
+    assert res.status_code == 200
+    assert res.content[:2] == b"PK"
+
+
+async def test_job_endpoints_missing_job(ac: AsyncClient):
+    res = await ac.get(url="/v1/jobs/missing")
+    assert res.status_code == 404
+    res = await ac.get(url="/v1/jobs/missing/download")
+    assert res.status_code == 404
+
+
+async def test_app_shutdown_stops_jobs(
+    tmp_path,
+    travel_service,
+    summary_service,
+    auth_service,
+    audit_service,
+    quality_service,
+    client_service,
+    reservation_service,
+    currency_service,
+):
+    job_runner = JobRunner(directory=str(tmp_path))
+    app = make_app(
+        travel_service,
+        summary_service,
+        auth_service,
+        audit_service,
+        quality_service,
+        client_service,
+        reservation_service,
+        currency_service,
+        job_runner=job_runner,
+    )
+    async with app.router.lifespan_context(app):
+        job = job_runner.submit("test@abc.com", "report", asyncio.Event().wait)
+        await asyncio.sleep(0)
+        assert job.status == "running"
+    assert job.status == "failed"
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,69 @@
+from api.cmd.benchmarks.query_plans import (
+    build_workload,
+    find_regressions,
+    run_workload,
+    summarize_plan,
+)
+
+EXPLAINED = {
+    "Plan": {
+        "Node Type": "Hash Join",
+        "Total Cost": 120.0,
+        "Plans": [
+            {
+                "Node Type": "Seq Scan",
+                "Relation Name": "accommodation_logs",
+                "Actual Rows": 10,
+                "Rows Removed by Filter": 19990,
+                "Actual Loops": 1,
+                "Total Cost": 100.0,
+            },
+            {
+                "Node Type": "Index Scan",
+                "Relation Name": "properties",
+                "Index Name": "properties_pkey",
+                "Total Cost": 8.0,
+            },
+        ],
+    },
+    "Execution Time": 3.5,
+}
+
+
+def test_summarize_plan_counts_rows_read_by_seq_scans():
+    report = summarize_plan("case#1", "SELECT\n  1", EXPLAINED)
+    assert report.nodes == [
+        "Hash Join",
+        "Seq Scan accommodation_logs",
+        "Index Scan properties_pkey",
+    ]
+    assert report.seq_scans == {"accommodation_logs": 20000}
+    assert report.sql == "SELECT 1"
+
+
+def test_find_regressions():
+    baseline = {
+        "case#1": {"seq_scans": {}, "total_cost": 100.0, "execution_ms": 2.0},
+        "case#2": {"seq_scans": {}, "total_cost": 100.0, "execution_ms": 2.0},
+    }
+    current = {
+        "case#1": summarize_plan("case#1", "SELECT 1", EXPLAINED).to_dict(),
+        "case#2": {"seq_scans": {}, "total_cost": 110.0, "execution_ms": 30.0},
+        "case#3": {"seq_scans": {"t": 1e6}, "total_cost": 1.0, "execution_ms": 1.0},
+    }
+    assert find_regressions(baseline, current, seq_scan_rows=10000) == [
+        "case#1: new sequential scan on accommodation_logs (20000 rows)",
+        "case#2: time 2.0ms -> 30.0ms",
+    ]
+    assert find_regressions(baseline, current, seq_scan_rows=50000) == [
+        "case#2: time 2.0ms -> 30.0ms"
+    ]
+
+
+async def test_run_workload_explains_repository_reads():
+    cases = [case for case in build_workload() if not case.needs]
+    reports, problems = await run_workload(cases)
+    assert not [p for p in problems if "failed" in p]
+    assert "summaries.accommodation_logs_by_filter.start_date#1" not in reports
+    assert "summaries.all_accommodation_logs#1" in reports
+    assert "quality.flagged_trips#1" in reports
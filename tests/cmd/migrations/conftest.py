@@ -0,0 +1,20 @@
+from dataclasses import replace
+
+import pytest
+
+from api.adapters.repository import ConnectionPoolManager
+from api.config.postgres import make_pool
+
+
+@pytest.fixture
+async def scratch_pool(conn_cfg):
+    """A pool on an empty database that is dropped after the test."""
+    main_pool = await ConnectionPoolManager.get()
+    async with main_pool.acquire() as conn:
+        await conn.execute("DROP DATABASE IF EXISTS rr_scratch_test")
+        await conn.execute("CREATE DATABASE rr_scratch_test")
+    pool = await make_pool(replace(conn_cfg, dbname="rr_scratch_test", min_pool_size=1))
+    yield pool
+    await pool.close()
+    async with main_pool.acquire() as conn:
+        await conn.execute("DROP DATABASE rr_scratch_test")
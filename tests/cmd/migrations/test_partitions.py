@@ -0,0 +1,115 @@
+import asyncio
+from datetime import date
+from uuid import uuid4
+
+from api.adapters.repository import ConnectionPoolManager
+from api.cmd.benchmarks.query_plans import QueryCase, run_workload
+from api.cmd.migrations.partitions import archive_partitions, ensure_partitions
+from api.services.summaries.repository.postgres import PostgresSummaryRepository
+from api.services.travel.models import AccommodationLog
+from api.services.travel.repository.postgres import PostgresTravelRepository
+
+
+async def test_ensure_partitions_moves_default_rows_then_archives_them():
+    pool = await ConnectionPoolManager.get()
+    async with pool.acquire() as conn:
+        audit_id = uuid4()
+        await conn.execute(
+            "INSERT INTO public.audit_logs (id, table_name, record_id, user_name, "
+            "before_value, after_value, action, action_timestamp) "
+            "VALUES ($1, 'test', $1, 'test', '{}', '{}', 'insert', '2001-06-01')",
+            audit_id,
+        )
+        partition_of = (
+            "SELECT tableoid::regclass::text FROM public.audit_logs WHERE id = $1"
+        )
+        assert await conn.fetchval(partition_of, audit_id) == "audit_logs_default"
+
+        assert "audit_logs_2001" in await ensure_partitions(conn)
+        assert await conn.fetchval(partition_of, audit_id) == "audit_logs_2001"
+        assert await ensure_partitions(conn) == []
+
+        assert await archive_partitions(conn, 2002) == ["archive.audit_logs_2001"]
+        assert await conn.fetchval(partition_of, audit_id) is None
+        await conn.execute("DROP TABLE archive.audit_logs_2001")
+
+
+async def test_summary_date_reads_prune_later_partitions():
+    summaries = PostgresSummaryRepository()
+    start, end = date(2020, 1, 1), date(2020, 12, 31)
+    cases = [
+        QueryCase(
+            "date_range",
+            lambda s: summaries.get_accommodation_logs_by_date_range(start, end),
+        ),
+        QueryCase("overlaps", lambda s: summaries.get_overlaps(start, end)),
+        QueryCase(
+            "end_date",
+            lambda s: summaries.get_accommodation_logs_by_filter({"end_date": end}),
+        ),
+    ]
+    reports, problems = await run_workload(cases)
+    assert not problems
+    future = f"accommodation_logs_{date.today().year + 1}"
+    for name in ("date_range#1", "overlaps#1", "end_date#1"):
+        assert not [node for node in reports[name].nodes if future in node]
+
+
+async def test_concurrent_upserts_of_a_new_log_insert_it_once():
+    pool = await ConnectionPoolManager.get()
+    ids = {name: uuid4() for name in ("destination", "portfolio", "property", "agent")}
+    async with pool.acquire() as conn:
+        await conn.execute(
+            "INSERT INTO core_destinations (id, name) VALUES ($1, 'Upsert Destination')",
+            ids["destination"],
+        )
+        await conn.execute(
+            "INSERT INTO portfolios (id, name) VALUES ($1, 'Upsert Portfolio')",
+            ids["portfolio"],
+        )
+        await conn.execute(
+            "INSERT INTO properties (id, name, portfolio_id, core_destination_id) "
+            "VALUES ($1, 'Upsert Camp', $2, $3)",
+            ids["property"],
+            ids["portfolio"],
+            ids["destination"],
+        )
+        await conn.execute(
+            "INSERT INTO consultants (id, first_name, last_name) "
+            "VALUES ($1, 'Upsert', 'Agent')",
+            ids["agent"],
+        )
+    log_id = uuid4()
+
+    def stay(year: int) -> AccommodationLog:
+        return AccommodationLog(
+            id=log_id,
+            property_id=ids["property"],
+            consultant_id=ids["agent"],
+            primary_traveler=f"Upsert Traveler {year}",
+            num_pax=2,
+            date_in=date(year, 3, 1),
+            date_out=date(year, 3, 4),
+            updated_by="Test Package Runner",
+        )
+
+    travel = PostgresTravelRepository()
+    results = await asyncio.gather(
+        travel.upsert_accommodation_log([stay(2020)]),
+        travel.upsert_accommodation_log([stay(2021)]),
+    )
+    assert sorted(result[0][1] for result in results) == [False, True]
+    async with pool.acquire() as conn:
+        assert (
+            await conn.fetchval(
+                "SELECT COUNT(*) FROM accommodation_logs WHERE id = $1", log_id
+            )
+            == 1
+        )
+        await conn.execute("DELETE FROM accommodation_logs WHERE id = $1", log_id)
+        await conn.execute("DELETE FROM consultants WHERE id = $1", ids["agent"])
+        await conn.execute("DELETE FROM properties WHERE id = $1", ids["property"])
+        await conn.execute("DELETE FROM portfolios WHERE id = $1", ids["portfolio"])
+        await conn.execute(
+            "DELETE FROM core_destinations WHERE id = $1", ids["destination"]
+        )
@@ -0,0 +1,72 @@
+import asyncpg
+import pytest
+
+from api.cmd.migrations.runner import load_migrations, migrate
+
+LICENSE = "-- Copyright 2024 SH\n\n"
+
+
+def write_migrations(directory, files):
+    for filename, sql in files.items():
+        (directory / filename).write_text(LICENSE + sql, encoding="utf-8")
+
+
+def test_shipped_migrations_load_in_order():
+    versions = [migration.version for migration in load_migrations()]
+    assert versions == sorted(versions)
+    concurrent = [m.filename for m in load_migrations() if not m.transactional]
+    assert "4_index.sql" in concurrent
+
+
+async def test_migrate_applies_only_pending_files(scratch_pool, tmp_path):
+    write_migrations(
+        tmp_path,
+        {
+            "1_init.sql": "CREATE TABLE t (id INT PRIMARY KEY, v INT);",
+            "2_index.sql": "-- migrate:no-transaction\n"
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_t_v ON t(v);\n"
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_t_id_v ON t(id, v);\n",
+        },
+    )
+    async with scratch_pool.acquire() as conn:
+        applied = await migrate(conn, load_migrations(str(tmp_path)))
+        assert [m.filename for m in applied] == ["1_init.sql", "2_index.sql"]
+        assert (
+            await conn.fetchval("SELECT COUNT(*) FROM pg_indexes WHERE tablename = 't'")
+            == 3
+        )
+
+        # Reruns skip applied files, which would fail as the table exists
+        write_migrations(tmp_path, {"3_more.sql": "ALTER TABLE t ADD COLUMN w INT;"})
+        applied = await migrate(conn, load_migrations(str(tmp_path)))
+        assert [m.filename for m in applied] == ["3_more.sql"]
+        assert await conn.fetchval("SELECT COUNT(*) FROM schema_migrations") == 3
+
+
+async def test_migrate_rejects_edited_files(scratch_pool, tmp_path):
+    write_migrations(tmp_path, {"1_init.sql": "CREATE TABLE t (id INT);"})
+    async with scratch_pool.acquire() as conn:
+        await migrate(conn, load_migrations(str(tmp_path)))
+        write_migrations(tmp_path, {"1_init.sql": "CREATE TABLE t (id BIGINT);"})
+        with pytest.raises(RuntimeError, match="1_init.sql"):
+            await migrate(conn, load_migrations(str(tmp_path)))
+
+
+async def test_migrate_drops_invalid_index_before_retry(scratch_pool, tmp_path):
+    write_migrations(
+        tmp_path,
+        {
+            "1_init.sql": "CREATE TABLE t (v INT); INSERT INTO t VALUES (1), (1);",
+            "2_index.sql": "-- migrate:no-transaction\n"
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_t_v ON t(v);\n",
+        },
+    )
+    async with scratch_pool.acquire() as conn:
+        with pytest.raises(asyncpg.UniqueViolationError):
+            await migrate(conn, load_migrations(str(tmp_path)))
+        await conn.execute("DELETE FROM t WHERE ctid = (SELECT MIN(ctid) FROM t)")
+        applied = await migrate(conn, load_migrations(str(tmp_path)))
+        assert [m.filename for m in applied] == ["2_index.sql"]
+        assert await conn.fetchval(
+            "SELECT indisvalid FROM pg_index WHERE indexrelid = 'idx_t_v'::regclass"
+        )
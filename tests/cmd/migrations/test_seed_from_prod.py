@@ -0,0 +1,32 @@
+import pytest
+
+from api.cmd.migrations.seed_from_prod import env_error, select_tables
+
+
+@pytest.fixture
+def clean_env(monkeypatch):
+    for var in ("HOST", "USER", "PASSWORD", "DB", "PORT"):
+        for suffix in ("SOURCE", "TARGET", "UAT", "PROD"):
+            monkeypatch.delenv(f"POSTGRES_{var}_{suffix}", raising=False)
+    return monkeypatch
+
+
+def test_env_error_refuses_legacy_variables(clean_env):
+    clean_env.setenv("POSTGRES_HOST_UAT", "uat")
+    clean_env.setenv("POSTGRES_HOST_PROD", "prod")
+    assert "no longer read" in env_error()
+
+    clean_env.setenv("POSTGRES_HOST_SOURCE", "prod")
+    clean_env.setenv("POSTGRES_HOST_TARGET", "prod")
+    assert "same database" in env_error()
+
+    clean_env.setenv("POSTGRES_HOST_TARGET", "uat")
+    assert env_error() is None
+
+
+def test_select_tables_syncs_users_only_on_request():
+    assert "public.users" not in [t.name for t in select_tables([], False)]
+    assert "public.users" in [t.name for t in select_tables([], True)]
+    assert [t.name for t in select_tables(["public.users"], False)] == ["public.users"]
+    with pytest.raises(ValueError):
+        select_tables(["public.nope"], False)
@@ -0,0 +1,33 @@
+import pytest
+
+from api.cmd.migrations.seed_pipeline import SeedCheckpoint, stream_csv
+
+
+async def test_checkpoint_resumes_after_failed_stage(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    ran = []
+
+    async def step(name):
+        ran.append(name)
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    checkpoint = SeedCheckpoint(path)
+    await checkpoint.run("first", lambda: step("first"))
+    with pytest.raises(RuntimeError):
+        await checkpoint.run("second", fail)
+
+    resumed = SeedCheckpoint(path)
+    await resumed.run("first", lambda: step("first again"))
+    await resumed.run("second", lambda: step("second"))
+    assert ran == ["first", "second"]
+
+    resumed.reset()
+    assert not (tmp_path / "checkpoint.json").exists()
+
+
+def test_stream_csv_strips_bom(tmp_path):
+    path = tmp_path / "rows.csv"
+    path.write_text("\ufeffname\nA\nB\n", encoding="utf-8")
+    assert list(stream_csv(str(path))) == [{"name": "A"}, {"name": "B"}]
@@ -0,0 +1,131 @@
+from uuid import uuid4
+
+import pytest
+
+from api.adapters.repository import ConnectionPoolManager
+from api.cmd.migrations.table_sync import SyncTable, sync_tables
+
+TARGET_DDL = """
+CREATE TABLE public.core_destinations (
+    id UUID NOT NULL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL UNIQUE,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_by VARCHAR(255) NULL
+);
+CREATE TABLE public.countries (
+    id UUID NOT NULL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL UNIQUE,
+    core_destination_id UUID NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_by VARCHAR(255) NULL,
+    FOREIGN KEY (core_destination_id) REFERENCES public.core_destinations(id)
+);
+"""
+
+
+@pytest.fixture
+async def target_pool(scratch_pool):
+    async with scratch_pool.acquire() as conn:
+        await conn.execute(TARGET_DDL)
+    return scratch_pool
+
+
+async def test_sync_tables_copies_and_merges_incrementally(target_pool):
+    source_pool = await ConnectionPoolManager.get()
+    destination_id, country_id, older_country_id = uuid4(), uuid4(), uuid4()
+    async with source_pool.acquire() as conn:
+        await conn.execute(
+            "INSERT INTO core_destinations (id, name, updated_at) "
+            "VALUES ($1, 'Sync Destination', now() - interval '1 day')",
+            destination_id,
+        )
+        await conn.execute(
+            "INSERT INTO countries (id, name, core_destination_id, updated_at) "
+            "VALUES ($1, 'Sync Country', $2, now() - interval '1 day')",
+            country_id,
+            destination_id,
+        )
+        await conn.execute(
+            "INSERT INTO countries (id, name, core_destination_id, updated_at) "
+            "VALUES ($1, 'Sync Older Country', $2, now() - interval '2 days')",
+            older_country_id,
+            destination_id,
+        )
+    # Parents are listed last to check the tables are reordered by foreign key
+    tables = [SyncTable("public.countries"), SyncTable("public.core_destinations")]
+
+    results = await sync_tables(source_pool, target_pool, tables)
+    assert [r.table for r in results] == [
+        "public.core_destinations",
+        "public.countries",
+    ]
+    assert all(r.verified and r.copied == r.source_rows for r in results)
+
+    async with source_pool.acquire() as conn:
+        await conn.execute(
+            "UPDATE countries SET name = 'Sync Country Renamed', updated_at = now() "
+            "WHERE id = $1",
+            country_id,
+        )
+    results = await sync_tables(source_pool, target_pool, tables)
+    assert [r.copied for r in results] == [0, 1]
+    assert all(r.verified for r in results)
+    async with target_pool.acquire() as conn:
+        name = await conn.fetchval(
+            "SELECT name FROM countries WHERE id = $1", country_id
+        )
+    assert name == "Sync Country Renamed"
+
+    async with target_pool.acquire() as conn:
+        await conn.execute("DELETE FROM countries WHERE id = $1", older_country_id)
+    results = await sync_tables(source_pool, target_pool, tables)
+    assert not results[1].verified
+    results = await sync_tables(source_pool, target_pool, tables, incremental=False)
+    assert all(r.verified for r in results)
+
+
+STAYS_DDL = """
+CREATE TABLE public.sync_stays (
+    id UUID NOT NULL,
+    date_in DATE NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, date_in)
+) PARTITION BY RANGE (date_in);
+CREATE TABLE public.sync_stays_2023 PARTITION OF public.sync_stays
+    FOR VALUES FROM ('2023-01-01') TO ('2024-01-01');
+CREATE TABLE public.sync_stays_default PARTITION OF public.sync_stays DEFAULT;
+"""
+
+
+async def test_sync_tables_moves_rows_whose_partition_key_changed(scratch_pool):
+    source_pool = await ConnectionPoolManager.get()
+    stay_id = uuid4()
+    async with source_pool.acquire() as conn, scratch_pool.acquire() as target:
+        await conn.execute(STAYS_DDL)
+        await target.execute(STAYS_DDL)
+        try:
+            await conn.execute(
+                "INSERT INTO sync_stays (id, date_in, name, updated_at) "
+                "VALUES ($1, '2023-06-01', 'Stay', now() - interval '1 day')",
+                stay_id,
+            )
+            tables = [SyncTable("public.sync_stays")]
+            results = await sync_tables(source_pool, scratch_pool, tables)
+            assert results[0].verified
+
+            await conn.execute(
+                "UPDATE sync_stays SET date_in = '2024-06-01', updated_at = now() "
+                "WHERE id = $1",
+                stay_id,
+            )
+            results = await sync_tables(source_pool, scratch_pool, tables)
+            assert results[0].copied == 1 and results[0].verified
+            dates = await target.fetch(
+                "SELECT date_in::text FROM sync_stays WHERE id = $1", stay_id
+            )
+            assert [row["date_in"] for row in dates] == ["2024-06-01"]
+        finally:
+            await conn.execute("DROP TABLE sync_stays")
@@ -41,7 +41,7 @@ from api.services.travel.service import TravelService
 from api.services.quality.service import QualityService
 from api.adapters.repository import ConnectionPoolManager
 from api.cmd.api.main import make_app
-from api.cmd.api.main import get_current_user
+from api.cmd.api.main import get_current_user, token_cache
 from datetime import datetime
 
 log = logging.getLogger("rr")
@@ -58,6 +58,12 @@ def monkeysession():
         yield monkeypatch
 
 
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    """Tests mint identical tokens, so decode each one afresh."""
+    token_cache.clear()
+
+
 @pytest.fixture
 async def mock_auth_service():
     mock_service = Mock(spec=AuthService)
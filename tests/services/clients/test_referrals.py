@@ -0,0 +1,80 @@
+from uuid import uuid4
+
+from api.services.clients.models import ReferralMatch
+from api.services.clients.referrals import build_referral_forest
+
+
+def make_clients(*names):
+    return {name: uuid4() for name in names}
+
+
+def match(clients, source, new):
+    return ReferralMatch(
+        source_client_id=clients[source],
+        source_client_cb_name=source,
+        source_client_avg_trip_spend=100,
+        source_client_total_trip_spend=200,
+        source_client_num_trips=2,
+        new_client_id=clients[new],
+        new_client_cb_name=new,
+        new_client_avg_trip_spend=100,
+        new_client_total_trip_spend=200,
+        new_client_num_trips=2,
+    )
+
+
+def names(tree):
+    children = sorted(tree["children"], key=lambda child: child["name"])
+    return {tree["name"]: [names(child) for child in children]}
+
+
+def test_forest_has_one_tree_per_root():
+    clients = make_clients("Ann", "Bob", "Cal", "Dee", "Eve")
+    referrals = [
+        match(clients, "Ann", "Bob"),
+        match(clients, "Bob", "Cal"),
+        match(clients, "Bob", "Dee"),
+        match(clients, "Dee", "Eve"),
+    ]
+    forest = build_referral_forest(referrals)
+    assert forest.cycles == []
+    assert [names(tree) for tree in forest.trees] == [
+        {"Ann": [{"Bob": [{"Cal": []}, {"Dee": [{"Eve": []}]}]}]}
+    ]
+
+
+def test_forest_reports_mutual_referrals():
+    clients = make_clients("Zed", "Amy", "Ben")
+    referrals = [
+        match(clients, "Zed", "Amy"),
+        match(clients, "Amy", "Zed"),
+        match(clients, "Zed", "Ben"),
+    ]
+    forest = build_referral_forest(referrals)
+    assert [set(cycle) for cycle in forest.cycles] == [{clients["Zed"], clients["Amy"]}]
+    assert [names(tree) for tree in forest.trees] == [{"Amy": [{"Zed": [{"Ben": []}]}]}]
+
+
+def test_forest_subtree_for_one_client():
+    clients = make_clients("Ann", "Bob", "Cal")
+    referrals = [match(clients, "Ann", "Bob"), match(clients, "Bob", "Cal")]
+    forest = build_referral_forest(referrals, root_id=clients["Bob"])
+    assert [names(tree) for tree in forest.trees] == [{"Bob": [{"Cal": []}]}]
+    assert build_referral_forest(referrals, root_id=uuid4()).trees == []
+
+
+def test_forest_lists_every_referrer_with_their_subtree():
+    clients = make_clients("Ann", "Bob", "Cal", "Dee", "Eve")
+    referrals = [
+        match(clients, "Ann", "Bob"),
+        match(clients, "Bob", "Cal"),
+        match(clients, "Bob", "Dee"),
+        match(clients, "Dee", "Eve"),
+    ]
+    forest = build_referral_forest(referrals)
+    assert [names(tree) for tree in forest.referrers] == [
+        {"Ann": [{"Bob": [{"Cal": []}, {"Dee": [{"Eve": []}]}]}]},
+        {"Bob": [{"Cal": []}, {"Dee": [{"Eve": []}]}]},
+        {"Dee": [{"Eve": []}]},
+    ]
+    assert forest.referrers[1] is forest.trees[0]["children"][0]
@@ -0,0 +1,34 @@
+from uuid import uuid4
+
+
+async def test_import_clients_reports_each_batch(client_service):
+    existing_id = str(uuid4())
+    rows = [
+        {"id": existing_id, "first_name": "Import", "last_name": "One"},
+        {"first_name": "Import", "last_name": "Two", "birth_date": "1970-02-30"},
+        {"first_name": "Import", "last_name": ""},
+        {"first_name": " Import ", "last_name": "Three", "cb_name": "Three/Import"},
+    ]
+    report = await client_service.import_clients(
+        iter(rows), updated_by="Test Package Runner", batch_size=2
+    )
+    assert [batch.rows for batch in report.batches] == [2, 2]
+    assert (report.inserted, report.updated, report.rejected) == (2, 0, 2)
+    assert report.batches[0].errors[0].startswith("row 2: birth_date")
+    assert report.batches[1].errors == ["row 3: first and last name required"]
+
+    rows = [{"id": existing_id, "first_name": "Import", "last_name": "Uno"}]
+    report = await client_service.import_clients(rows, updated_by="Test")
+    assert (report.inserted, report.updated, report.rejected) == (0, 1, 0)
+    client = await client_service.get_by_id(existing_id)
+    assert client.last_name == "Uno"
+
+
+async def test_import_clients_rejects_values_too_long_for_their_column(client_service):
+    rows = [
+        {"first_name": "Import", "last_name": "Long", "cb_profile_type": "x" * 21},
+        {"first_name": "Import", "last_name": "Short", "cb_profile_type": "x" * 20},
+    ]
+    report = await client_service.import_clients(iter(rows), updated_by="Test")
+    assert (report.inserted, report.rejected) == (1, 1)
+    assert report.batches[0].errors == ["row 1: cb_profile_type: at most 20 characters"]
@@ -0,0 +1,65 @@
+from datetime import date, time
+from decimal import Decimal
+import math
+
+from api.services.currency.models import PatchDailyRateRequest
+from api.services.currency.rates import RateTable
+
+QUOTES = [
+    ("USD", "ZAR", date(2024, 1, 1), Decimal("18.0")),
+    ("USD", "ZAR", date(2024, 1, 5), Decimal("20.0")),
+    ("USD", "EUR", date(2024, 1, 2), Decimal("0.5")),
+    # Inverse quote, superseded on the same day by the USD-based one
+    ("ZAR", "USD", date(2024, 1, 5), Decimal("0.04")),
+    ("GBP", "USD", date(2024, 1, 3), Decimal("1.25")),
+    # Neither side is USD, so it is skipped
+    ("EUR", "GBP", date(2024, 1, 3), Decimal("0.9")),
+]
+
+
+def test_convert_uses_nearest_prior_rate_through_usd():
+    table = RateTable.from_quotes(QUOTES)
+    converted = table.convert(
+        [180, 180, 200, 10, 100, 5, 1, 1],
+        ["ZAR", "ZAR", "ZAR", "EUR", "ZAR", "XYZ", "EUR", "USD"],
+        [
+            date(2024, 1, 1),
+            date(2024, 1, 4),
+            date(2024, 1, 9),
+            date(2024, 1, 2),
+            date(2023, 12, 31),
+            date(2024, 1, 2),
+            date(2024, 1, 1),
+            date(2020, 1, 1),
+        ],
+    )
+    assert converted[:4].tolist() == [10.0, 10.0, 10.0, 20.0]
+    assert all(math.isnan(value) for value in converted[4:7])
+    assert converted[7] == 1
+
+
+def test_convert_cross_rates():
+    table = RateTable.from_quotes(QUOTES)
+    # 1 GBP = 1.25 USD = 25 ZAR on the 5th
+    assert table.convert([2], ["GBP"], [date(2024, 1, 5)], "ZAR").tolist() == [50.0]
+    assert table.convert([50], ["ZAR"], [date(2024, 1, 5)], "GBP").tolist() == [2.0]
+
+
+async def test_convert_reloads_after_rate_changes(currency_service):
+    request = PatchDailyRateRequest(
+        base_currency="USD",
+        target_currency="KES",
+        currency_name="Kenyan Shilling",
+        conversion_rate=Decimal("100"),
+        rate_date=date(2024, 3, 1),
+        rate_time=time(8, 0),
+        updated_by="Test Package Runner",
+    )
+    await currency_service.process_daily_rate_requests([request])
+    converted = await currency_service.convert([500], ["KES"], [date(2024, 3, 2)])
+    assert converted.tolist() == [5.0]
+
+    request.conversion_rate = Decimal("125")
+    await currency_service.process_daily_rate_requests([request])
+    converted = await currency_service.convert([500], ["KES"], [date(2024, 3, 2)])
+    assert converted.tolist() == [4.0]
@@ -0,0 +1,137 @@
+from datetime import date, time
+from decimal import Decimal
+from time import sleep
+
+from api.services.currency.models import PatchDailyRateRequest
+
+
+def rate_request(target: str, rate: str) -> PatchDailyRateRequest:
+    return PatchDailyRateRequest(
+        base_currency="USD",
+        target_currency=target,
+        currency_name=target,
+        conversion_rate=Decimal(rate),
+        rate_date=date(2024, 4, 1),
+        rate_time=time(8, 0),
+        updated_by="Test Package Runner",
+    )
+
+
+async def test_process_daily_rate_requests_diffs_in_batch(currency_service):
+    results = await currency_service.process_daily_rate_requests(
+        [rate_request("AAA", "1.5"), rate_request("BBB", "2"), rate_request("CCC", "3")]
+    )
+    assert results["summarized_audit_logs"] == {"daily_rates": {"insert": 3}}
+
+    results = await currency_service.process_daily_rate_requests(
+        [
+            rate_request("AAA", "1.5"),
+            rate_request("BBB", "2.5"),
+            # Only the last request for a rate counts
+            rate_request("DDD", "4"),
+            rate_request("DDD", "5"),
+        ]
+    )
+    assert results["summarized_audit_logs"] == {
+        "daily_rates": {"update": 1, "insert": 1}
+    }
+    assert results["messages"] == ["No changes were detected."]
+
+    stored = {
+        rate.target_currency: rate.conversion_rate
+        for rate in await currency_service.get_rates_date(date(2024, 4, 1))
+    }
+    assert stored == {
+        "AAA": Decimal("1.5"),
+        "BBB": Decimal("2.5"),
+        "CCC": Decimal("3"),
+        "DDD": Decimal("5"),
+    }
+
+
+def csv_row(target: str, rate: str, rate_date: str = "2023-06-01") -> dict:
+    return {
+        "base_currency": "USD",
+        "target_currency": target,
+        "currency_name": f"{target} name",
+        "conversion_rate": rate,
+        "rate_date": rate_date,
+        "rate_time": "",
+    }
+
+
+async def test_import_rates_merges_batches(currency_service):
+    rows = [
+        csv_row("EEE", "1.1"),
+        csv_row("FFF", "2.2"),
+        csv_row("GGGG", "3.3"),
+        csv_row("HHH", "not a rate"),
+        csv_row("EEE", "1.1", "2023-06-02"),
+    ]
+    report = await currency_service.import_rates(
+        iter(rows), updated_by="Test Package Runner", batch_size=2
+    )
+    assert (report.rows, report.inserted, report.updated) == (5, 3, 0)
+    assert report.rejected == 2
+    assert [len(batch.errors) for batch in report.batches] == [0, 2, 0]
+    assert report.batches[1].errors[0].startswith("row 3: target_currency")
+
+    rows = [csv_row("EEE", "1.1"), csv_row("FFF", "2.5"), csv_row("III", "4.4")]
+    report = await currency_service.import_rates(
+        iter(rows), updated_by="Test Package Runner"
+    )
+    assert (report.inserted, report.updated, report.rejected) == (1, 1, 0)
+    stored = {
+        rate.target_currency: rate.conversion_rate
+        for rate in await currency_service.get_rates_date(date(2023, 6, 1))
+    }
+    assert stored == {
+        "EEE": Decimal("1.1"),
+        "FFF": Decimal("2.5"),
+        "III": Decimal("4.4"),
+    }
+
+
+async def test_import_rates_merges_while_validating_next_batch(currency_service):
+    events = []
+    validate, merge = (
+        currency_service._validate_rate_rows,
+        currency_service._merge_rates,
+    )
+
+    def recording_validate(batch, *args):
+        if batch:
+            sleep(0.05)
+            events.append(f"validated {batch[0][0]}")
+        return validate(batch, *args)
+
+    async def recording_merge(daily_rates):
+        events.append(f"merging {daily_rates[0].target_currency}")
+        return await merge(daily_rates)
+
+    currency_service._validate_rate_rows = recording_validate
+    currency_service._merge_rates = recording_merge
+    rows = [csv_row(target, "1.5", "2023-07-01") for target in ("JJJ", "KKK", "LLL")]
+    report = await currency_service.import_rates(
+        iter(rows), updated_by="Test Package Runner", batch_size=1
+    )
+    assert report.inserted == 3
+    # Each merge starts before the following batch finishes validating
+    assert events.index("merging JJJ") < events.index("validated 2")
+    assert events.index("merging KKK") < events.index("validated 3")
+
+
+async def test_import_rates_rejects_rates_the_column_cannot_hold(currency_service):
+    rows = [
+        csv_row("VND", "24500.5", "2023-08-01"),
+        csv_row("MMM", "9999.9999995", "2023-08-01"),
+        csv_row("NNN", "9999.999999", "2023-08-01"),
+    ]
+    report = await currency_service.import_rates(
+        iter(rows), updated_by="Test Package Runner"
+    )
+    assert (report.inserted, report.rejected) == (1, 2)
+    assert report.batches[0].errors == [
+        "row 1: conversion_rate: at most 9999.999999",
+        "row 2: conversion_rate: at most 9999.999999",
+    ]
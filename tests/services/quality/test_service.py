@@ -0,0 +1,166 @@
+from collections import Counter
+from datetime import date, timedelta
+from uuid import uuid4
+
+from api.services.travel.models import (
+    AccommodationLog,
+    Consultant,
+    CoreDestination,
+    Country,
+    PatchTripRequest,
+    Portfolio,
+    Property,
+)
+
+
+async def expected_counts(quality_service) -> Counter:
+    """Counts trips the way get_progress did, from fully loaded trips."""
+    counts = Counter()
+    trips = [
+        ("potential", trip) for trip in await quality_service.find_potential_trips()
+    ]
+    trips += [
+        ("confirmed", trip)
+        for trip in await quality_service._summary_svc.get_all_trips()
+    ]
+    for status, trip in trips:
+        counts[(status, trip.start_date.year, trip.core_destination)] += 1
+    return counts
+
+
+async def seed_logs(travel_service) -> list[AccommodationLog]:
+    africa = CoreDestination(name="Africa", updated_by="Test Package Runner")
+    asia = CoreDestination(name="Asia", updated_by="Test Package Runner")
+    # The service lists existing records first, which fails on rows other
+    # tests wrote without updated_by, so write through the repository
+    await travel_service._repo.add_core_destination([africa, asia])
+    portfolio = Portfolio(name="Progress Portfolio", updated_by="Test Package Runner")
+    await travel_service._repo.add_portfolio([portfolio])
+    consultant = Consultant(
+        first_name="Progress", last_name="Consultant", updated_by="Test Package Runner"
+    )
+    await travel_service._repo.add_consultant([consultant])
+    properties = {}
+    for destination in (africa, asia):
+        country = Country(
+            name=f"{destination.name} Progress Country",
+            core_destination_id=destination.id,
+            updated_by="Test Package Runner",
+        )
+        await travel_service._repo.add_country([country])
+        properties[destination.name] = Property(
+            name=f"{destination.name} Progress Lodge",
+            portfolio_id=portfolio.id,
+            country_id=country.id,
+            core_destination_id=destination.id,
+            updated_by="Test Package Runner",
+        )
+        await travel_service._repo.add_property([properties[destination.name]])
+
+    stays = [
+        # One trip, then a second after a gap longer than 3 days
+        ("Progress/Ann", "Africa", date(2022, 12, 30), 3),
+        ("progress/ann ", "Asia", date(2023, 1, 4), 2),
+        ("Progress/Ann", "Asia", date(2023, 1, 7), 2),
+        ("Progress/Ann", "Africa", date(2023, 3, 1), 4),
+        ("Progress/Bo", "Asia", date(2024, 5, 1), 5),
+        ("Progress/Bo", "Africa", date(2024, 5, 6), 5),
+        ("Progress/Cy", "Africa", date(2025, 2, 1), 3),
+        ("Progress/Cy", "Africa", date(2025, 2, 4), 3),
+    ]
+    logs = [
+        AccommodationLog(
+            property_id=properties[destination].id,
+            consultant_id=consultant.id,
+            primary_traveler=traveler,
+            num_pax=2,
+            date_in=date_in,
+            date_out=date_in + timedelta(days=nights),
+            updated_by="Test Package Runner",
+        )
+        for traveler, destination, date_in, nights in stays
+    ]
+    await travel_service._repo.copy_accommodation_logs(logs)
+    return logs
+
+
+async def test_progress_counts_match_loaded_trips(travel_service, quality_service):
+    logs = await seed_logs(travel_service)
+    await quality_service.confirm_trip(
+        PatchTripRequest(
+            trip_name="Progress Bo",
+            accommodation_log_ids=[logs[4].id, logs[5].id],
+            updated_by="Test Package Runner",
+        )
+    )
+    await quality_service.flag_trip(
+        PatchTripRequest(
+            trip_name="Progress Cy",
+            accommodation_log_ids=[logs[6].id],
+            updated_by="Test Package Runner",
+        )
+    )
+
+    counts = Counter()
+    for (
+        status,
+        year,
+        destination,
+        trips,
+    ) in await quality_service._repo.get_progress_counts():
+        counts[(status, year, destination)] += trips
+    assert counts == await expected_counts(quality_service)
+    # Two Asia stays outweigh the Africa stay the trip started with
+    assert counts[("potential", 2022, "Asia")] == 1
+    assert counts[("potential", 2023, "Africa")] == 1
+    # The flagged stay and its unflagged neighbour are separate trips
+    assert counts[("potential", 2025, "Africa")] == 2
+    # Tied destinations go to the one stayed at first
+    assert counts[("confirmed", 2024, "Asia")] == 1
+
+
+async def test_progress_recounts_after_flagging(quality_service):
+    before = await quality_service.get_progress()
+    assert await quality_service.get_progress() is before
+
+    unmatched = await quality_service._repo.get_unmatched_accommodation_logs()
+    await quality_service.flag_trip(
+        PatchTripRequest(
+            trip_name="Progress flagged",
+            accommodation_log_ids=[unmatched[0].id],
+            updated_by="Test Package Runner",
+        )
+    )
+    assert await quality_service.get_progress() is not before
+
+
+async def test_flagged_trips_store_log_ids_as_array(quality_service):
+    log_ids = [uuid4(), uuid4()]
+    trip_id = await quality_service.add_potential_trip(
+        PatchTripRequest(
+            trip_name="Progress stored ids",
+            accommodation_log_ids=log_ids,
+            updated_by="Test Package Runner",
+        )
+    )
+    flagged = {
+        trip.id: trip for trip in await quality_service._repo.get_flagged_trips()
+    }
+    assert flagged[trip_id].accommodation_log_ids == log_ids
+
+    await quality_service._repo.delete_related_potential_trips([log_ids[1], uuid4()])
+    flagged = await quality_service._repo.get_flagged_trips()
+    assert trip_id not in {trip.id for trip in flagged}
+
+
+async def test_unmatched_logs_page_by_keyset(quality_service):
+    everything = await quality_service._repo.get_unmatched_accommodation_logs()
+    assert len(everything) >= 3
+    paged = [log async for log in quality_service.iter_unmatched_accommodation_logs(2)]
+    assert [log.id for log in paged] == [log.id for log in everything]
+    flagged = {
+        log_id
+        for trip in await quality_service._repo.get_flagged_trips()
+        for log_id in trip.accommodation_log_ids
+    }
+    assert not flagged & {log.id for log in paged}
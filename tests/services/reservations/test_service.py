@@ -0,0 +1,46 @@
+import asyncio
+from datetime import date, datetime
+from uuid import uuid4
+
+from api.adapters.repository import ConnectionPoolManager
+from api.services.reservations.models import Reservation
+
+
+def reservation(client_id, cost: float) -> Reservation:
+    return Reservation(
+        id=uuid4(),
+        client_id=client_id,
+        cost=cost,
+        start_date=date(2023, 5, 1),
+        created_at=datetime.now(),
+        updated_at=datetime.now(),
+        updated_by="Test Package Runner",
+    )
+
+
+async def test_concurrent_adds_keep_client_stats_current(reservation_service):
+    pool = await ConnectionPoolManager.get()
+    client_id = uuid4()
+    stats = (
+        "SELECT num_trips, total_trip_spend FROM client_reservation_stats "
+        "WHERE client_id = $1"
+    )
+    async with pool.acquire() as conn:
+        await conn.execute(
+            "INSERT INTO clients (id, first_name, last_name, updated_by) "
+            "VALUES ($1, 'Stats', 'Client', 'Test Package Runner')",
+            client_id,
+        )
+        await asyncio.gather(
+            reservation_service.add(reservation(client_id, 100)),
+            reservation_service.add(reservation(client_id, 250)),
+        )
+        assert tuple(await conn.fetchrow(stats, client_id)) == (2, 350)
+
+        # Rows loaded around the repository are picked up by a refresh
+        await conn.execute(
+            "UPDATE reservations SET cost = 50 WHERE client_id = $1 AND cost = 100",
+            client_id,
+        )
+        assert await reservation_service.refresh_client_stats() >= 1
+        assert tuple(await conn.fetchrow(stats, client_id)) == (2, 300)
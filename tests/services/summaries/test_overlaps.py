@@ -0,0 +1,48 @@
+import random
+import uuid
+from datetime import date, timedelta
+
+from api.services.summaries.overlaps import (
+    normalize_traveler,
+    overlap_days,
+    overlapping_pairs,
+)
+
+
+def test_overlapping_pairs_matches_pairwise_check():
+    rng = random.Random(11)
+    property_ids = [uuid.uuid4() for _ in range(4)]
+    stays = []
+    for _ in range(300):
+        date_in = date(2023, 1, 1) + timedelta(days=rng.randrange(120))
+        stays.append(
+            {
+                "id": uuid.uuid4(),
+                "property_id": rng.choice(property_ids),
+                "date_in": date_in,
+                "date_out": date_in + timedelta(days=rng.randint(0, 6)),
+            }
+        )
+    expected = {
+        (first["id"], second["id"])
+        for first in stays
+        for second in stays
+        if first["property_id"] == second["property_id"]
+        and first["id"] < second["id"]
+        and first["date_out"] > second["date_in"]
+        and second["date_out"] > first["date_in"]
+    }
+    found = [(first["id"], second["id"]) for first, second in overlapping_pairs(stays)]
+    assert len(found) == len(set(found))
+    assert set(found) == expected
+
+
+def test_overlap_days():
+    first = {"date_in": date(2024, 3, 1), "date_out": date(2024, 3, 5)}
+    second = {"date_in": date(2024, 3, 3), "date_out": date(2024, 3, 9)}
+    assert overlap_days(first, second) == 2
+
+
+def test_normalize_traveler():
+    assert normalize_traveler("  Müller / Anna-Lena ") == "muller/anna lena"
+    assert normalize_traveler("MULLER/Anna Lena") == "muller/anna lena"
@@ -2,6 +2,7 @@ import pytest
 import pytest_asyncio
 import pandas as pd
 from api.services.travel.service import SummaryService
+from api.services.summaries.service import canonical_filters
 from io import BytesIO
 from openpyxl import load_workbook
 from openpyxl.utils import get_column_letter
@@ -660,3 +661,34 @@ async def test_write_excel_bed_night_all_columns(
         assert (
             cell_total.value == expected_sum_formula
         ), f"Cell {get_column_letter(col_num)}{total_row} should have formula '{expected_sum_formula}'"
+
+
+def test_canonical_filters_ignore_key_and_list_order():
+    assert canonical_filters(
+        {"start_date": "2024-01-01", "property_names": ["B", "A", "A"]}
+    ) == canonical_filters({"property_names": ["A", "B"], "start_date": "2024-01-01"})
+    assert canonical_filters({"agency": "A"}) != canonical_filters({"agency": "B"})
+
+
+@pytest.mark.asyncio
+async def test_bed_night_report_is_cached_until_data_changes(summary_service):
+    reads = []
+    read_logs = summary_service._repo.get_accommodation_logs_by_filter
+
+    async def counted_read(filters, exclude_fam=False):
+        reads.append(filters)
+        return await read_logs(filters, exclude_fam)
+
+    summary_service._repo.get_accommodation_logs_by_filter = counted_read
+    labels = {"start_date": "2020-01-01", "property_names": ["B", "A"]}
+    first = await summary_service.get_bed_night_report(labels)
+    again = await summary_service.get_bed_night_report(
+        {"property_names": ["A", "B"], "start_date": "2020-01-01"}
+    )
+    assert len(reads) == 1
+    assert again.calculations == first.calculations
+    assert again.report_inputs.property_names == ["A", "B"]
+
+    SummaryService.invalidate_reports()
+    await summary_service.get_bed_night_report(labels)
+    assert len(reads) == 2